@@ -1,9 +1,13 @@
 import abc
 import torch
 import logging
+import numpy as np
 import torch.nn as nn
 
 from . import _constants as const
+from .utils import cascade
+from .utils import dataloader
+from .utils import vectorize
 
 
 def torchensemble_model_doc(header, item):
@@ -21,13 +25,23 @@ def torchensemble_model_doc(header, item):
     def get_doc(item):
         """Return the selected item."""
         __doc = {"model": const.__model_doc,
-                 "fit": const.__fit_doc,
+                 "fit": const.__fit_doc + const.__batch_size_doc,
+                 "parallel_fit": (const.__parallel_fit_doc
+                                  + const.__batch_size_doc),
                  "set_optimizer": const.__set_optimizer_doc,
                  "set_scheduler": const.__set_scheduler_doc,
                  "classifier_forward": const.__classification_forward_doc,
                  "classifier_predict": const.__classification_predict_doc,
                  "regressor_forward": const.__regression_forward_doc,
-                 "regressor_predict": const.__regression_predict_doc}
+                 "regressor_predict": const.__regression_predict_doc,
+                 "classifier_predict_proba":
+                     const.__classification_predict_proba_doc,
+                 "regressor_predict_output":
+                     const.__regression_predict_output_doc,
+                 "classifier_forward_cascade":
+                     const.__classification_forward_cascade_doc,
+                 "classifier_calibrate_cascade":
+                     const.__classification_calibrate_cascade_doc}
         return __doc[item]
 
     def adddoc(cls):
@@ -45,6 +59,13 @@ class BaseModule(abc.ABC, nn.Module):
     WARNING: This class cannot be used directly.
     Please use the derived classes instead.
     """
+
+    # Fitted attributes that are not parameters or buffers, which are kept in
+    # the extra state of the state dict.
+    _fitted_attributes = ("n_outputs",
+                          "cascade_order_",
+                          "cascade_threshold_",
+                          "cascade_criterion_")
     def __init__(self,
                  estimator,
                  n_estimators,
@@ -68,8 +89,20 @@ class BaseModule(abc.ABC, nn.Module):
         self.logger = logging.getLogger()
 
         self.estimators_ = nn.ModuleList()
+        self.stacked_estimators_ = None
         self.use_scheduler_ = False
 
+    def get_extra_state(self):
+        """Return the fitted attributes saved along with the state dict."""
+        return {name: getattr(self, name)
+                for name in self._fitted_attributes
+                if hasattr(self, name)}
+
+    def set_extra_state(self, state):
+        """Restore the fitted attributes returned by `get_extra_state`."""
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __len__(self):
         """
         Return the number of base estimators in the ensemble. The real number
@@ -82,6 +115,137 @@ class BaseModule(abc.ABC, nn.Module):
         """Return the `index`-th base estimator in the ensemble."""
         return self.estimators_[index]
 
+    def stack_estimators(self):
+        """
+        Stack the parameters of all fitted base estimators. After then, the
+        ensemble evaluates all base estimators in one vectorized call instead
+        of a loop over base estimators in the evaluating mode, which reduces
+        the overhead on dispatching many small base estimators.
+
+        The stacked parameters are copies of the parameters of base
+        estimators. Please call this method again after the parameters of
+        base estimators change, and call :meth:`unstack_estimators` to
+        switch back to the default forwarding.
+        """
+        self.stacked_estimators_ = vectorize.StackedEstimators(
+            self.estimators_
+        )
+        self.stacked_estimators_.eval()
+
+        return self
+
+    def unstack_estimators(self):
+        """Drop the stacked parameters created by :meth:`stack_estimators`."""
+        self.stacked_estimators_ = None
+
+        return self
+
+    def _forward_estimators(self, x):
+        """
+        Return the outputs of all base estimators stacked along a new leading
+        dimension, i.e., a tensor of shape (n_estimators, batch_size, ...).
+        The stacked parameters are used in the evaluating mode if available.
+        """
+        if self.stacked_estimators_ is not None and not self.training:
+            return self.stacked_estimators_(x)
+
+        return torch.stack([estimator(x) for estimator in self.estimators_])
+
+    def _calibrate_cascade(self,
+                           test_loader,
+                           tolerance,
+                           criterion,
+                           average_logits):
+        """
+        Calibrate the order of base estimators and the confidence threshold
+        on the confidence cascade in classification.
+        """
+        self.eval()
+        order, threshold, acc, n_used = cascade.calibrate(self.estimators_,
+                                                          test_loader,
+                                                          self.device,
+                                                          tolerance,
+                                                          criterion,
+                                                          average_logits)
+        self.cascade_order_ = order
+        self.cascade_threshold_ = threshold
+        self.cascade_criterion_ = criterion
+
+        msg = ("Cascade threshold: {:.3f} | Testing Acc: {:.3f} % | Average"
+               " number of base estimators: {:.3f}")
+        self.logger.info(msg.format(threshold, acc, n_used))
+
+        return acc
+
+    def _forward_cascade(self, x, threshold, average_logits):
+        """
+        Implementation on the data forwarding with the confidence cascade in
+        classification.
+        """
+        order = getattr(self, "cascade_order_", None)
+        criterion = getattr(self, "cascade_criterion_", "max_proba")
+        if threshold is None:
+            if not hasattr(self, "cascade_threshold_"):
+                msg = ("Please call `calibrate_cascade` first, or specify the"
+                       " confidence threshold.")
+                self.logger.error(msg)
+                raise RuntimeError(msg)
+            threshold = self.cascade_threshold_
+
+        self.eval()
+        with torch.no_grad():
+            proba, _ = cascade.cascade_forward(self.estimators_,
+                                               x,
+                                               threshold,
+                                               order,
+                                               criterion,
+                                               average_logits)
+
+        return proba
+
+    def _predict_output(self, X, batch_size=256, out=None):
+        """
+        Return the outputs of the ensemble on all samples in `X`, which are
+        written into the preallocated buffer `out` batch by batch.
+        """
+        if not batch_size > 0:
+            msg = ("The number of samples in each batch should be strictly"
+                   " positive, but got {} instead.")
+            self.logger.error(msg.format(batch_size))
+            raise ValueError(msg.format(batch_size))
+
+        # `torch.inference_mode` is only available in PyTorch >= 1.9
+        inference_mode = getattr(torch, "inference_mode", torch.no_grad)
+
+        self.eval()
+        n_samples = dataloader.n_samples(X)
+        outputs = []  # used when the number of samples is unknown
+        offset = 0
+        with inference_mode():
+            for data in dataloader.iter_inputs(X, batch_size):
+                output = self.forward(data.to(self.device))
+
+                if out is None and n_samples is not None:
+                    out = torch.empty((n_samples,) + output.size()[1:],
+                                      dtype=output.dtype)
+
+                if out is None:
+                    outputs.append(output.cpu())
+                elif isinstance(out, np.ndarray):
+                    out[offset:offset+output.size(0)] = output.cpu().numpy()
+                else:
+                    out[offset:offset+output.size(0)].copy_(output)
+                offset += output.size(0)
+
+        if out is None:
+            return torch.cat(outputs)
+
+        # Fewer samples are returned by data loaders that drop the last batch
+        if offset < out.shape[0]:
+            out = out[:offset]
+
+        return out
+
     def _decide_n_outputs(self, train_loader, is_classification=True):
         """
         Decide the number of outputs according to the `train_loader`.
@@ -90,26 +254,41 @@ class BaseModule(abc.ABC, nn.Module):
           number of distinct classes.
         - If `is_classification` is False, the number of outputs equals the
           number of target variables (e.g., `1` in univariate regression).
+
+        Please refer to :func:`utils.dataloader.n_outputs` on how to avoid
+        iterating over `train_loader`.
         """
-        if is_classification:
-            if hasattr(train_loader.dataset, "classes"):
-                n_outputs = len(train_loader.dataset.classes)
-            # Infer `n_outputs` from the dataloader
-            else:
-                labels = []
-                for _, (_, target) in enumerate(train_loader):
-                    labels.append(target)
-                labels = torch.unique(torch.cat(labels))
-                n_outputs = labels.size(0)
-        else:
-            for _, (_, target) in enumerate(train_loader):
-                if len(target.size()) == 1:
-                    n_outputs = 1
-                else:
-                    n_outputs = target.size(1)
-                break
+        return dataloader.n_outputs(train_loader, is_classification)
+
+    def _make_loader(self, data, batch_size, shuffle=False):
+        """
+        Return a :class:`utils.dataloader.TensorLoader` on the device if
+        `data` is a tuple ``(X, y)`` of tensors or arrays, otherwise return
+        `data` unchanged.
+        """
+        if not (isinstance(data, (tuple, list))
+                and len(data) == 2
+                and all(dataloader.is_array(elem) for elem in data)):
+            return data
+
+        if not batch_size > 0:
+            msg = ("The number of samples in each batch should be strictly"
+                   " positive, but got {} instead.")
+            self.logger.error(msg.format(batch_size))
+            raise ValueError(msg.format(batch_size))
+
+        X, y = (dataloader.to_tensor(elem) for elem in data)
+        if X.size(0) != y.size(0):
+            msg = ("The number of samples in X and y should be the same, but"
+                   " got {} and {} instead.")
+            self.logger.error(msg.format(X.size(0), y.size(0)))
+            raise ValueError(msg.format(X.size(0), y.size(0)))
 
-        return n_outputs
+        return dataloader.TensorLoader(X,
+                                       y,
+                                       batch_size=batch_size,
+                                       shuffle=shuffle,
+                                       device=self.device)
 
     def _make_estimator(self):
         """Make and configure a copy of the `self.base_estimator_`."""
@@ -163,13 +342,14 @@ class BaseModule(abc.ABC, nn.Module):
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            batch_size=256):
         """
         Implementation on the training stage of the ensemble.
         """
 
     @abc.abstractmethod
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
         """
         Implementation on the evaluating stage of the ensemble.
         """
@@ -56,16 +56,16 @@ __set_scheduler_doc = """
 __fit_doc = """
     Parameters
     ----------
-    train_loader : torch.utils.data.DataLoader
+    train_loader : torch.utils.data.DataLoader or tuple
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        training data.
+        training data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
     epochs : int, default=100
         The number of training epochs.
     log_interval : int, default=100
         The number of batches to wait before logging the training status.
-    test_loader : torch.utils.data.DataLoader, default=None
+    test_loader : torch.utils.data.DataLoader or tuple, default=None
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        evaluating data.
+        evaluating data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
 
         - If ``None``, no validation is conducted during the training
           stage.
@@ -87,6 +87,59 @@ __fit_doc = """
 """
 
 
+__shared_batches_doc = """    shared_batches : bool, default=False
+        Specify whether to fit all base estimators with a single pass over
+        ``train_loader`` in each epoch, where each batch is fed to all base
+        estimators one after another, instead of letting each base estimator
+        iterate over ``train_loader`` independently. It is recommended when
+        loading the training data is the bottleneck, and ``n_jobs`` is
+        ignored when it is ``True``, unless ``persistent_workers`` is also
+        ``True``.
+"""
+
+
+__vectorize_doc = """    vectorize : bool, default=False
+        Specify whether to fit all base estimators in a single process with
+        the vectorized forwarding and backwarding on their stacked
+        parameters, and a single step of the optimizer on all base
+        estimators. It is recommended for small base estimators, and
+        ``n_jobs``, ``shared_batches`` and ``persistent_workers`` are ignored
+        when it is ``True``. Base estimators with running statistics, such
+        as batch normalization layers, are not supported.
+"""
+
+
+__persistent_workers_doc = """    persistent_workers : bool, default=False
+        Specify whether to fit base estimators with ``n_jobs`` worker
+        processes that persist over the whole training stage. Each worker
+        owns a subset of base estimators and their optimizers, and base
+        estimators are placed in the shared memory, so that they are not
+        serialized on each epoch. Tensors in :class:`TensorDataset` of
+        ``train_loader`` are also placed in the shared memory, and workers
+        attach to them without copying. If ``shared_batches`` is also
+        ``True``, ``train_loader`` is only iterated in the main process, and
+        each batch is broadcast to all workers via a ring buffer in the
+        shared memory.
+"""
+
+
+__parallel_fit_doc = (__fit_doc
+                      + __shared_batches_doc
+                      + __vectorize_doc
+                      + __persistent_workers_doc)
+
+
+__batch_size_doc = """    batch_size : int, default=256
+        The number of samples in each batch when ``train_loader`` or
+        ``test_loader`` is a tuple ``(X, y)``, which is loaded by
+        :class:`utils.dataloader.TensorLoader` on the device without
+        collating samples one by one. ``X`` can also be a sparse tensor or a
+        SciPy sparse matrix, and its batches are sparse CSR tensors, which
+        are accepted by :class:`torch.nn.Linear` as the input. It is ignored
+        for data loaders.
+"""
+
+
 __classification_forward_doc = """
     Parameters
     ----------
@@ -104,9 +157,12 @@ __classification_forward_doc = """
 __classification_predict_doc = """
     Parameters
     ----------
-    test_loader : torch.utils.data.DataLoader
+    test_loader : torch.utils.data.DataLoader or tuple
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        evaluating data.
+        evaluating data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
+    batch_size : int, default=256
+        The number of samples in each batch when ``test_loader`` is a tuple
+        ``(X, y)``. It is ignored for data loaders.
 
     Returns
     -------
@@ -132,9 +188,12 @@ __regression_forward_doc = """
 __regression_predict_doc = """
     Parameters
     ----------
-    test_loader : torch.utils.data.DataLoader
+    test_loader : torch.utils.data.DataLoader or tuple
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        evaluating data.
+        evaluating data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
+    batch_size : int, default=256
+        The number of samples in each batch when ``test_loader`` is a tuple
+        ``(X, y)``. It is ignored for data loaders.
 
     Returns
     -------
@@ -142,3 +201,95 @@ __regression_predict_doc = """
         The testing mean squared error (MSE) of the fitted ensemble on
         ``test_loader``.
 """
+
+
+__classification_forward_cascade_doc = """
+    Base estimators are evaluated one by one in the calibrated order, and a
+    sample stops being forwarded to remaining base estimators once the
+    confidence on its averaged class distribution reaches the threshold.
+    Please call :meth:`calibrate_cascade` first, or specify ``threshold``.
+
+    Parameters
+    ----------
+    X : tensor
+        An input batch of data, which should be a valid input data batch
+        for base estimators in the ensemble.
+    threshold : float, default=None
+        The confidence threshold on early stopping the evaluation on each
+        sample. If ``None``, the threshold from :meth:`calibrate_cascade`
+        will be used.
+
+    Returns
+    -------
+    proba : tensor of shape (batch_size, n_classes)
+        The predicted class distribution from the base estimators evaluated
+        on each sample.
+"""
+
+
+__classification_calibrate_cascade_doc = """
+    Base estimators are ordered by their accuracy on ``test_loader``, and
+    the confidence threshold is the smallest one with which the accuracy of
+    the cascade is at most ``tolerance`` lower than the accuracy of the
+    full ensemble on ``test_loader``.
+
+    Parameters
+    ----------
+    test_loader : torch.utils.data.DataLoader
+        A :mod:`torch.utils.data.DataLoader` container that contains the
+        evaluating data.
+    tolerance : float, default=0.5
+        The largest drop on the testing accuracy (in percentage) allowed,
+        which should be non-negative.
+    criterion : {"max_proba", "margin"}, default="max_proba"
+        The confidence on each averaged class distribution, that is, the
+        largest class probability, or the difference between the two
+        largest class probabilities.
+
+    Returns
+    -------
+    accuracy : float
+        The testing accuracy of the calibrated cascade on ``test_loader``.
+"""
+
+
+__classification_predict_proba_doc = """
+    Parameters
+    ----------
+    X : tensor, numpy.ndarray or torch.utils.data.DataLoader
+        The testing data. For data loaders, the first element in each batch
+        is taken as the input data.
+    batch_size : int, default=256
+        The number of samples in each batch when ``X`` is a tensor or a
+        NumPy array.
+    out : tensor or numpy.ndarray, default=None
+        A preallocated buffer of shape (n_samples, n_classes) that stores the
+        predicted class distributions, e.g., a :class:`numpy.memmap` on a
+        file. If ``None``, a new tensor will be allocated.
+
+    Returns
+    -------
+    proba : tensor or numpy.ndarray of shape (n_samples, n_classes)
+        The predicted class distributions, which is ``out`` if specified.
+"""
+
+
+__regression_predict_output_doc = """
+    Parameters
+    ----------
+    X : tensor, numpy.ndarray or torch.utils.data.DataLoader
+        The testing data. For data loaders, the first element in each batch
+        is taken as the input data.
+    batch_size : int, default=256
+        The number of samples in each batch when ``X`` is a tensor or a
+        NumPy array.
+    out : tensor or numpy.ndarray, default=None
+        A preallocated buffer of shape (n_samples, n_outputs) that stores the
+        predicted values, e.g., a :class:`numpy.memmap` on a file. If
+        ``None``, a new tensor will be allocated.
+
+    Returns
+    -------
+    pred : tensor or numpy.ndarray of shape (n_samples, n_outputs)
+        The predicted values, which is ``out`` if specified.
+"""
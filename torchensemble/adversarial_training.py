@@ -14,10 +14,14 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 import warnings
+import contextlib
+from functools import partial
 from joblib import Parallel, delayed
 
 from ._base import BaseModule, torchensemble_model_doc
+from . import _constants as const
 from .utils import io
+from .utils import parallel as par
 from .utils import set_module
 from .utils import operator as op
 
@@ -30,9 +34,9 @@ __all__ = ["_BaseAdversarialTraining",
 __fit_doc = """
     Parameters
     ----------
-    train_loader : torch.utils.data.DataLoader
+    train_loader : torch.utils.data.DataLoader or tuple
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        training data.
+        training data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
     epochs : int, default=100
         The number of training epochs.
     epsilon : float, default=0.01
@@ -40,9 +44,9 @@ __fit_doc = """
         sign method (FGSM), which should be in the range [0, 1].
     log_interval : int, default=100
         The number of batches to wait before logging the training status.
-    test_loader : torch.utils.data.DataLoader, default=None
+    test_loader : torch.utils.data.DataLoader or tuple, default=None
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        evaluating data.
+        evaluating data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
 
         - If ``None``, no validation is conducted after each training
           epoch.
@@ -61,7 +65,9 @@ __fit_doc = """
         - If ``None``, the model will be saved in the current directory.
         - If not ``None``, the model will be saved in the specified
           directory: ``save_dir``.
-"""
+""" + (const.__shared_batches_doc
+       + const.__persistent_workers_doc
+       + const.__batch_size_doc)
 
 
 def _adversarial_training_model_doc(header, item="fit"):
@@ -82,6 +88,65 @@ def _adversarial_training_model_doc(header, item="fit"):
     return adddoc
 
 
+def _fit_per_batch(data,
+                   target,
+                   epsilon,
+                   estimator,
+                   optimizer,
+                   criterion,
+                   idx,
+                   epoch,
+                   batch_idx,
+                   log_interval,
+                   is_classification):
+    """
+    Private function used to fit a base estimator on a batch of data and the
+    adversarial samples generated from it.
+    """
+
+    batch_size = data.size()[0]
+
+    # A new leaf tensor so that the batch can be shared by base estimators
+    data = data.detach()
+    data.requires_grad = True
+
+    # Get adversarial samples
+    _output = estimator(data)
+    _loss = criterion(_output, target)
+    _loss.backward()
+    data_grad = data.grad.data
+    adv_data = _get_fgsm_samples(data, epsilon, data_grad)
+
+    # Compute the training loss
+    optimizer.zero_grad()
+    org_output = estimator(data)
+    adv_output = estimator(adv_data)
+    loss = criterion(org_output, target) + criterion(adv_output, target)
+    loss.backward()
+    optimizer.step()
+
+    # Print training status
+    if batch_idx % log_interval == 0:
+
+        # Classification
+        if is_classification:
+            _, predicted = torch.max(org_output.data, 1)
+            correct = (predicted == target).sum().item()
+
+            msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
+                   " | Loss: {:.5f} | Correct: {:d}/{:d}")
+            print(
+                msg.format(
+                    idx, epoch, batch_idx, loss, correct, batch_size
+                )
+            )
+        # Regression
+        else:
+            msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
+                   " | Loss: {:.5f}")
+            print(msg.format(idx, epoch, batch_idx, loss))
+
+
 def _parallel_fit_per_epoch(train_loader,
                             epsilon,
                             estimator,
@@ -106,49 +171,80 @@ def _parallel_fit_per_epoch(train_loader,
 
     for batch_idx, (data, target) in enumerate(train_loader):
 
-        batch_size = data.size()[0]
         data, target = data.to(device), target.to(device)
-        data.requires_grad = True
-
-        # Get adversarial samples
-        _output = estimator(data)
-        _loss = criterion(_output, target)
-        _loss.backward()
-        data_grad = data.grad.data
-        adv_data = _get_fgsm_samples(data, epsilon, data_grad)
-
-        # Compute the training loss
-        optimizer.zero_grad()
-        org_output = estimator(data)
-        adv_output = estimator(adv_data)
-        loss = criterion(org_output, target) + criterion(adv_output, target)
-        loss.backward()
-        optimizer.step()
-
-        # Print training status
-        if batch_idx % log_interval == 0:
-
-            # Classification
-            if is_classification:
-                _, predicted = torch.max(org_output.data, 1)
-                correct = (predicted == target).sum().item()
-
-                msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
-                       " | Loss: {:.5f} | Correct: {:d}/{:d}")
-                print(
-                    msg.format(
-                        idx, epoch, batch_idx, loss, correct, batch_size
-                    )
-                )
-            # Regression
-            else:
-                msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
-                       " | Loss: {:.5f}")
-                print(msg.format(idx, epoch, batch_idx, loss))
+        _fit_per_batch(data, target, epsilon, estimator, optimizer,
+                       criterion, idx, epoch, batch_idx, log_interval,
+                       is_classification)
 
     return estimator, optimizer
 
 
+def _shared_fit_per_epoch(train_loader,
+                          epsilon,
+                          estimators,
+                          cur_lr,
+                          optimizers,
+                          criterion,
+                          epoch,
+                          log_interval,
+                          device,
+                          is_classification,
+                          indices=None):
+    """
+    Private function used to fit all base estimators with a single pass over
+    the training data, where each batch is fed to all base estimators.
+    """
+
+    if cur_lr:
+        for optimizer in optimizers:
+            set_module.update_lr(optimizer, cur_lr)
+
+    if indices is None:
+        indices = range(len(estimators))
+
+    for batch_idx, (data, target) in enumerate(train_loader):
+
+        data, target = data.to(device), target.to(device)
+        for idx, estimator, optimizer in zip(indices,
+                                             estimators,
+                                             optimizers):
+            _fit_per_batch(data, target, epsilon, estimator, optimizer,
+                           criterion, idx, epoch, batch_idx, log_interval,
+                           is_classification)
+
+    return estimators, optimizers
+
+
+def _persistent_fit_per_epoch(estimators,
+                              optimizers,
+                              indices,
+                              cur_lr,
+                              epoch,
+                              train_loader,
+                              epsilon,
+                              criterion,
+                              log_interval,
+                              device,
+                              is_classification,
+                              shared_batches):
+    """
+    Private function used to fit base estimators owned by a persistent
+    worker process for one epoch.
+    """
+
+    if shared_batches:
+        _shared_fit_per_epoch(train_loader, epsilon, estimators, cur_lr,
+                              optimizers, criterion, epoch, log_interval,
+                              device, is_classification, indices)
+    else:
+        for idx, estimator, optimizer in zip(indices,
+                                             estimators,
+                                             optimizers):
+            _parallel_fit_per_epoch(train_loader, epsilon, estimator, cur_lr,
+                                    optimizer, criterion, idx, epoch,
+                                    log_interval, device, is_classification)
+
+
 def _get_fgsm_samples(sample, epsilon, sample_grad):
     """
     Private functions used to generate adversarial samples with fast gradient
@@ -208,8 +304,7 @@ class AdversarialTrainingClassifier(_BaseAdversarialTraining):
         "classifier_forward")
     def forward(self, x):
         # Take the average over class distributions from all base estimators.
-        outputs = [F.softmax(estimator(x), dim=1)
-                   for estimator in self.estimators_]
+        outputs = F.softmax(self._forward_estimators(x), dim=2)
         proba = op.average(outputs)
 
         return proba
@@ -240,8 +335,15 @@ class AdversarialTrainingClassifier(_BaseAdversarialTraining):
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            shared_batches=False,
+            persistent_workers=False,
+            batch_size=256):
+
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
 
+        self.unstack_estimators()
         self._validate_parameters(epochs, epsilon, log_interval)
         self.n_outputs = self._decide_n_outputs(train_loader, True)
 
@@ -273,8 +375,26 @@ class AdversarialTrainingClassifier(_BaseAdversarialTraining):
 
             return proba
 
+        if persistent_workers:
+            workers = par.WorkerPool(
+                estimators,
+                optimizers,
+                partial(_persistent_fit_per_epoch,
+                        epsilon=epsilon,
+                        criterion=criterion,
+                        log_interval=log_interval,
+                        device=self.device,
+                        is_classification=False,
+                        shared_batches=shared_batches),
+                train_loader,
+                self.n_jobs,
+                broadcast=shared_batches
+            )
+        else:
+            workers = contextlib.nullcontext()
+
         # Maintain a pool of workers
-        with Parallel(n_jobs=self.n_jobs) as parallel:
+        with Parallel(n_jobs=self.n_jobs) as parallel, workers:
 
             # Training loop
             for epoch in range(epochs):
@@ -285,34 +405,52 @@ class AdversarialTrainingClassifier(_BaseAdversarialTraining):
                 else:
                     cur_lr = None
 
-                if self.n_jobs and self.n_jobs > 1:
+                if (self.n_jobs and self.n_jobs > 1
+                        and not persistent_workers
+                        and not shared_batches):
                     msg = "Parallelization on the training epoch: {:03d}"
                     self.logger.info(msg.format(epoch))
 
-                rets = parallel(delayed(_parallel_fit_per_epoch)(
+                if persistent_workers:
+                    workers.fit(epoch, cur_lr)
+                elif shared_batches:
+                    estimators, optimizers = _shared_fit_per_epoch(
                         train_loader,
                         epsilon,
-                        estimator,
+                        estimators,
                         cur_lr,
-                        optimizer,
+                        optimizers,
                         criterion,
-                        idx,
                         epoch,
                         log_interval,
                         self.device,
                         False
                     )
-                    for idx, (estimator, optimizer) in enumerate(
-                            zip(estimators, optimizers))
-                )
+                else:
+                    rets = parallel(delayed(_parallel_fit_per_epoch)(
+                            train_loader,
+                            epsilon,
+                            estimator,
+                            cur_lr,
+                            optimizer,
+                            criterion,
+                            idx,
+                            epoch,
+                            log_interval,
+                            self.device,
+                            False
+                        )
+                        for idx, (estimator, optimizer) in enumerate(
+                                zip(estimators, optimizers))
+                    )
 
-                estimators, optimizers = [], []
-                for estimator, optimizer in rets:
-                    estimators.append(estimator)
-                    optimizers.append(optimizer)
+                    estimators, optimizers = [], []
+                    for estimator, optimizer in rets:
+                        estimators.append(estimator)
+                        optimizers.append(optimizer)
 
                 # Validation
-                if test_loader:
+                if test_loader is not None:
                     self.eval()
                     with torch.no_grad():
                         correct = 0
@@ -349,28 +487,36 @@ class AdversarialTrainingClassifier(_BaseAdversarialTraining):
 
         self.estimators_ = nn.ModuleList()
         self.estimators_.extend(estimators)
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of AdversarialTrainingClassifier.""",  # noqa: E501
         "classifier_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         correct = 0
         total = 0
 
-        for _, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            _, predicted = torch.max(output.data, 1)
-            correct += (predicted == target).sum().item()
-            total += target.size(0)
+        with torch.no_grad():
+            for _, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                _, predicted = torch.max(output.data, 1)
+                correct += (predicted == target).sum()
+                total += target.size(0)
 
-        acc = 100 * correct / total
+        acc = 100 * float(correct) / total
 
         return acc
 
+    @torchensemble_model_doc(
+        """Return the predicted class distributions of AdversarialTrainingClassifier.""",  # noqa: E501
+        "classifier_predict_proba")
+    def predict_proba(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
+
 
 @torchensemble_model_doc("""Implementation on the AdversarialTrainingRegressor.""",  # noqa: E501
                          "model")
@@ -385,7 +531,7 @@ class AdversarialTrainingRegressor(_BaseAdversarialTraining):
         "regressor_forward")
     def forward(self, x):
         # Take the average over predictions from all base estimators.
-        outputs = [estimator(x) for estimator in self.estimators_]
+        outputs = self._forward_estimators(x)
         pred = op.average(outputs)
 
         return pred
@@ -416,8 +562,15 @@ class AdversarialTrainingRegressor(_BaseAdversarialTraining):
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            shared_batches=False,
+            persistent_workers=False,
+            batch_size=256):
+
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
 
+        self.unstack_estimators()
         self._validate_parameters(epochs, epsilon, log_interval)
         self.n_outputs = self._decide_n_outputs(train_loader, True)
 
@@ -448,8 +601,26 @@ class AdversarialTrainingRegressor(_BaseAdversarialTraining):
 
             return pred
 
+        if persistent_workers:
+            workers = par.WorkerPool(
+                estimators,
+                optimizers,
+                partial(_persistent_fit_per_epoch,
+                        epsilon=epsilon,
+                        criterion=criterion,
+                        log_interval=log_interval,
+                        device=self.device,
+                        is_classification=True,
+                        shared_batches=shared_batches),
+                train_loader,
+                self.n_jobs,
+                broadcast=shared_batches
+            )
+        else:
+            workers = contextlib.nullcontext()
+
         # Maintain a pool of workers
-        with Parallel(n_jobs=self.n_jobs) as parallel:
+        with Parallel(n_jobs=self.n_jobs) as parallel, workers:
 
             # Training loop
             for epoch in range(epochs):
@@ -460,43 +631,63 @@ class AdversarialTrainingRegressor(_BaseAdversarialTraining):
                 else:
                     cur_lr = None
 
-                if self.n_jobs and self.n_jobs > 1:
+                if (self.n_jobs and self.n_jobs > 1
+                        and not persistent_workers
+                        and not shared_batches):
                     msg = "Parallelization on the training epoch: {:03d}"
                     self.logger.info(msg.format(epoch))
 
-                rets = parallel(delayed(_parallel_fit_per_epoch)(
+                if persistent_workers:
+                    workers.fit(epoch, cur_lr)
+                elif shared_batches:
+                    estimators, optimizers = _shared_fit_per_epoch(
                         train_loader,
                         epsilon,
-                        estimator,
+                        estimators,
                         cur_lr,
-                        optimizer,
+                        optimizers,
                         criterion,
-                        idx,
                         epoch,
                         log_interval,
                         self.device,
                         True
                     )
-                    for idx, (estimator, optimizer) in enumerate(
-                            zip(estimators, optimizers))
-                )
+                else:
+                    rets = parallel(delayed(_parallel_fit_per_epoch)(
+                            train_loader,
+                            epsilon,
+                            estimator,
+                            cur_lr,
+                            optimizer,
+                            criterion,
+                            idx,
+                            epoch,
+                            log_interval,
+                            self.device,
+                            True
+                        )
+                        for idx, (estimator, optimizer) in enumerate(
+                                zip(estimators, optimizers))
+                    )
 
-                estimators, optimizers = [], []
-                for estimator, optimizer in rets:
-                    estimators.append(estimator)
-                    optimizers.append(optimizer)
+                    estimators, optimizers = [], []
+                    for estimator, optimizer in rets:
+                        estimators.append(estimator)
+                        optimizers.append(optimizer)
 
                 # Validation
-                if test_loader:
+                if test_loader is not None:
                     self.eval()
                     with torch.no_grad():
                         mse = 0
+                        n_batches = 0
                         for _, (data, target) in enumerate(test_loader):
                             data = data.to(self.device)
                             target = target.to(self.device)
                             output = _forward(estimators, data)
                             mse += criterion(output, target)
-                        mse /= len(test_loader)
+                            n_batches += 1
+                        mse /= n_batches
 
                         if mse < best_mse:
                             best_mse = mse
@@ -518,20 +709,30 @@ class AdversarialTrainingRegressor(_BaseAdversarialTraining):
 
         self.estimators_ = nn.ModuleList()
         self.estimators_.extend(estimators)
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of AdversarialTrainingRegressor.""",  # noqa: E501
         "regressor_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         mse = 0
+        n_batches = 0
         criterion = nn.MSELoss()
 
-        for batch_idx, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            mse += criterion(output, target)
+        with torch.no_grad():
+            for batch_idx, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                mse += criterion(output, target)
+                n_batches += 1
+
+        return mse / n_batches
 
-        return mse / len(test_loader)
+    @torchensemble_model_doc(
+        """Return the predicted values of AdversarialTrainingRegressor.""",  # noqa: E501
+        "regressor_predict_output")
+    def predict_output(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
@@ -1,7 +1,7 @@
 """
   In bagging-based ensemble, each base estimator is trained independently.
   In addition, sampling with replacement is conducted on the training data
-  batch to encourage the diversity between different base estimators in the
+  to encourage the diversity between different base estimators in the
   ensemble.
 """
 
@@ -9,20 +9,252 @@
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.utils.data import IterableDataset
 
 import warnings
+import contextlib
+from functools import partial
 from joblib import Parallel, delayed
 
 from ._base import BaseModule, torchensemble_model_doc
+from . import _constants as const
 from .utils import io
+from .utils import dataloader
+from .utils import parallel as par
 from .utils import set_module
+from .utils import vectorize as vec
 from .utils import operator as op
 
 
-__all__ = ["BaggingClassifier",
+__all__ = ["_BaseBagging",
+           "BaggingClassifier",
            "BaggingRegressor"]
 
 
+__model_doc = """
+    Parameters
+    ----------
+    estimator : torch.nn.Module
+        The class of base estimator inherited from :mod:`torch.nn.Module`.
+    n_estimators : int
+        The number of base estimators in the ensemble.
+    estimator_args : dict, default=None
+        The dictionary of hyper-parameters used to instantiate base
+        estimators (Optional).
+    cuda : bool, default=True
+
+        - If ``True``, use GPU to train and evaluate the ensemble.
+        - If ``False``, use CPU to train and evaluate the ensemble.
+    n_jobs : int, default=None
+        The number of workers for training the ensemble. Setting it to an
+        integer larger than ``1`` enables ``n_jobs`` base estimators to be
+        trained simultaneously.
+    bootstrap : bool, default=True
+        Specify whether samples are drawn with replacement for each base
+        estimator.
+
+        - If ``True``, each base estimator is trained on its own bootstrap
+          sample.
+        - If ``False``, samples are drawn without replacement, known as
+          subagging or pasting. Base estimators are trained on disjoint
+          shards of the training data if ``n_estimators * max_samples`` does
+          not exceed the number of training samples, and shards are drawn
+          cyclically from a random permutation of samples otherwise.
+    max_samples : int or float, default=1.0
+        The number of samples drawn from the training data for each base
+        estimator. If float, it is the fraction of training samples, and if
+        int, it is the number of training samples. For instance, setting
+        ``bootstrap=False`` and ``max_samples=1 / n_estimators`` makes the
+        training cost of the ensemble in each epoch roughly the same as a
+        single base estimator on the full data.
+    max_features : int or float, default=1.0
+        The number of features drawn without replacement for each base
+        estimator, known as the random subspace method. If float, it is the
+        fraction of features, and if int, it is the number of features, e.g.,
+        ``1`` is a single feature. Features are indexed along the second
+        dimension of input data, e.g., columns of tabular data or channels of
+        images. Each base estimator only takes its own subset of features,
+        so ``estimator_args`` should make base estimators accept inputs with
+        the reduced number of features, which also reduces the cost of
+        training and evaluating base estimators. The number of features is
+        taken from the dataset without loading batches, which requires the
+        attribute ``n_features`` on iterable-style datasets. It should be
+        ``1.0`` on sparse input data.
+    oob_score : bool, default=False
+        Specify whether to evaluate the ensemble on out-of-bag training
+        samples, that is, the prediction on each training sample takes the
+        average over base estimators whose bootstrap samples do not contain
+        it. The out-of-bag score is evaluated once after the last training
+        epoch, which costs a single pass over the training data.
+
+    Attributes
+    ----------
+    estimators_ : torch.nn.ModuleList
+        An internal container that stores all fitted base estimators. If
+        ``max_features`` is not ``1.0``, each base estimator is wrapped with
+        the indices of its features in the buffer ``feature_indices``.
+    oob_score_ : float
+        The out-of-bag accuracy (in percentage) in classification, or the
+        out-of-bag mean squared error in regression. Only available when
+        ``oob_score`` is ``True``.
+    oob_prediction_ : tensor of shape (n_samples, n_outputs)
+        The out-of-bag class distributions in classification, or predicted
+        values in regression, on training samples in the order of the
+        training dataset. Predictions on samples that are contained in the
+        bootstrap samples of all base estimators are ``NaN``. Only available
+        when ``oob_score`` is ``True``.
+"""
+
+
+__fit_doc = const.__parallel_fit_doc + """\
+    bootstrap_weight : bool, default=False
+        Specify how to load the bootstrap sample of each base estimator, which
+        is drawn from the training dataset once in the training stage.
+
+        - If ``False``, a sample drawn multiple times is loaded multiple
+          times in each epoch.
+        - If ``True``, a sample drawn multiple times is loaded once in each
+          epoch, and its training loss is weighted by the number of times it
+          is drawn.
+
+        The bootstrap sample on the training dataset requires a map-style
+        dataset in ``train_loader`` with the argument ``batch_size``,
+        otherwise the sampling with replacement is conducted on each batch of
+        data.
+""" + const.__batch_size_doc
+
+
+class _SubspaceEstimator(nn.Module):
+    """
+    Wrap a base estimator to only take the features at `feature_indices`
+    along the second dimension of input data.
+    """
+
+    def __init__(self, estimator, feature_indices):
+        super(_SubspaceEstimator, self).__init__()
+        self.estimator = estimator
+        self.register_buffer("feature_indices", feature_indices)
+
+    def forward(self, x):
+        return self.estimator(torch.index_select(x, 1, self.feature_indices))
+
+
+def _weighted_loss(criterion, output, target, weight=None):
+    """
+    Private function used to compute the training loss from the losses on
+    samples, where each sample is weighted by `weight` if it is not None.
+    """
+    loss = criterion(output, target)
+    loss = loss.view(loss.size(0), -1).mean(dim=1)
+    if weight is None:
+        return loss.mean()
+
+    return (loss * weight).sum() / weight.sum().clamp(min=1.)
+
+
+def _batch_bootstrap_weight(n_estimators, batch_size, device):
+    """
+    Private function used to conduct the sampling with replacement on a batch
+    of data, when the bootstrap sample on the training dataset is
+    unavailable. Return the number of times that each sample in the batch is
+    drawn for each base estimator.
+    """
+    sampling_mask = torch.randint(high=batch_size,
+                                  size=(n_estimators, int(batch_size)),
+                                  dtype=torch.int64)
+    weight = torch.zeros(n_estimators, batch_size)
+    weight.scatter_add_(1, sampling_mask, torch.ones_like(weight))
+
+    return weight.to(device)
+
+
+def _is_full_size(size):
+    """
+    Private function used to return True if `max_samples` or `max_features`
+    is the fraction 1.0, i.e., all samples or features are used. Integers
+    are numbers of samples or features, e.g., ``1`` is a single one.
+    """
+    return isinstance(size, float) and size == 1.
+
+
+def _bootstrap_counts(indices, n_samples):
+    """
+    Private function used to return the number of times that each training
+    sample is drawn for each base estimator, which is a tensor of shape
+    (n_estimators, n_samples), from the indices of the bootstrap sample of
+    each base estimator.
+    """
+    counts = torch.zeros(len(indices), n_samples, dtype=torch.int16)
+    for idx, member_indices in enumerate(indices):
+        counts[idx] = torch.bincount(member_indices, minlength=n_samples)
+
+    return counts
+
+
+def _parse_batch(elem, sample_weight, device):
+    """
+    Private function used to return the data, target and weights on samples
+    in a batch. If `sample_weight` is not None, the batch should come from a
+    data loader returning the indices of samples, and weights are looked up
+    with the indices.
+    """
+    if sample_weight is None:
+        data, target = elem
+        weight = None
+    else:
+        index, (data, target) = elem
+        weight = sample_weight[..., index].to(device, torch.float)
+
+    return data.to(device), target.to(device), weight
+
+
+def _fit_per_batch(data,
+                   target,
+                   weight,
+                   estimator,
+                   optimizer,
+                   criterion,
+                   idx,
+                   epoch,
+                   batch_idx,
+                   log_interval,
+                   is_classification):
+    """
+    Private function used to fit a base estimator on a batch of data, where
+    each sample is weighted by the number of times it is drawn if `weight`
+    is not None.
+    """
+
+    optimizer.zero_grad()
+    output = estimator(data)
+    loss = _weighted_loss(criterion, output, target, weight)
+    loss.backward()
+    optimizer.step()
+
+    # Print training status
+    if batch_idx % log_interval == 0:
+
+        # Classification
+        if is_classification:
+            _, predicted = torch.max(output.data, 1)
+            is_correct = (predicted == target).float()
+            if weight is None:
+                correct = int(is_correct.sum().item())
+                subsample_size = data.size(0)
+            else:
+                correct = int((is_correct * weight).sum().item())
+                subsample_size = int(weight.sum().item())
+
+            msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
+                   " | Loss: {:.5f} | Correct: {:d}/{:d}")
+            print(msg.format(idx, epoch, batch_idx, loss,
+                             correct, subsample_size))
+        else:
+            msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
+                   " | Loss: {:.5f}")
+            print(msg.format(idx, epoch, batch_idx, loss))
+
+
 def _parallel_fit_per_epoch(train_loader,
                             estimator,
                             cur_lr,
@@ -32,10 +264,18 @@ def _parallel_fit_per_epoch(train_loader,
                             epoch,
                             log_interval,
                             device,
-                            is_classification):
+                            is_classification,
+                            sample_weight=None,
+                            batch_bootstrap=False):
     """
     Private function used to fit base estimators in parallel.
 
+    - If `batch_bootstrap` is False, `train_loader` only loads the bootstrap
+      sample of the base estimator, and samples are weighted by
+      `sample_weight` if it is not None.
+    - If `batch_bootstrap` is True, the sampling with replacement is
+      conducted on each batch of data.
+
     WARNING: Parallelization when fitting large base estimators may cause
     out-of-memory error.
     """
@@ -44,89 +284,443 @@ def _parallel_fit_per_epoch(train_loader,
         # Parallelization corrupts the binding between optimizer and scheduler
         set_module.update_lr(optimizer, cur_lr)
 
-    for batch_idx, (data, target) in enumerate(train_loader):
+    for batch_idx, elem in enumerate(train_loader):
 
-        batch_size = data.size(0)
-        data, target = data.to(device), target.to(device)
+        data, target, weight = _parse_batch(elem, sample_weight, device)
+        if batch_bootstrap:
+            weight = _batch_bootstrap_weight(1, data.size(0), device)[0]
+            mask = weight > 0
+            data, target, weight = data[mask], target[mask], weight[mask]
 
-        # Sampling with replacement
-        sampling_mask = torch.randint(high=batch_size,
-                                      size=(int(batch_size),),
-                                      dtype=torch.int64)
-        sampling_mask = torch.unique(sampling_mask)  # remove duplicates
-        sampling_data = data[sampling_mask]
-        sampling_target = target[sampling_mask]
+        _fit_per_batch(data, target, weight, estimator, optimizer,
+                       criterion, idx, epoch, batch_idx, log_interval,
+                       is_classification)
 
-        optimizer.zero_grad()
-        sampling_output = estimator(sampling_data)
-        loss = criterion(sampling_output, sampling_target)
-        loss.backward()
-        optimizer.step()
+    return estimator, optimizer
 
-        # Print training status
-        if batch_idx % log_interval == 0:
 
-            # Classification
-            if is_classification:
-                subsample_size = sampling_data.size(0)
-                _, predicted = torch.max(sampling_output.data, 1)
-                correct = (predicted == sampling_target).sum().item()
-
-                msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
-                       " | Loss: {:.5f} | Correct: {:d}/{:d}")
-                print(msg.format(idx, epoch, batch_idx, loss,
-                                 correct, subsample_size))
-            else:
-                msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
-                       " | Loss: {:.5f}")
-                print(msg.format(idx, epoch, batch_idx, loss))
+def _shared_fit_per_epoch(train_loader,
+                          estimators,
+                          cur_lr,
+                          optimizers,
+                          criterion,
+                          epoch,
+                          log_interval,
+                          device,
+                          is_classification,
+                          indices=None,
+                          sample_weight=None):
+    """
+    Private function used to fit all base estimators with a single pass over
+    the training data, where each base estimator is fed with the samples
+    from its own bootstrap sample in each batch.
+
+    - If `sample_weight` is not None, it is the number of times that each
+      training sample is drawn for each base estimator, and `train_loader`
+      should return the indices of samples.
+    - If `sample_weight` is None, the sampling with replacement is conducted
+      on each batch of data.
+    """
 
-    return estimator, optimizer
+    if cur_lr:
+        for optimizer in optimizers:
+            set_module.update_lr(optimizer, cur_lr)
+
+    if indices is None:
+        indices = range(len(estimators))
+
+    for batch_idx, elem in enumerate(train_loader):
+
+        data, target, weight = _parse_batch(elem, sample_weight, device)
+        if weight is None:
+            weight = _batch_bootstrap_weight(len(estimators),
+                                             data.size(0),
+                                             device)
+
+        for member_weight, idx, estimator, optimizer in zip(weight,
+                                                            indices,
+                                                            estimators,
+                                                            optimizers):
+            mask = member_weight > 0
+            if not mask.any():
+                continue
+            _fit_per_batch(data[mask], target[mask], member_weight[mask],
+                           estimator, optimizer, criterion, idx, epoch,
+                           batch_idx, log_interval, is_classification)
+
+    return estimators, optimizers
+
+
+def _persistent_fit_per_epoch(estimators,
+                              optimizers,
+                              indices,
+                              cur_lr,
+                              epoch,
+                              train_loader,
+                              criterion,
+                              log_interval,
+                              device,
+                              is_classification,
+                              shared_batches,
+                              member_loaders,
+                              member_weights,
+                              sample_weight,
+                              batch_bootstrap):
+    """
+    Private function used to fit base estimators owned by a persistent
+    worker process for one epoch.
+    """
 
+    if shared_batches:
+        if sample_weight is not None:
+            sample_weight = sample_weight[indices]
+        _shared_fit_per_epoch(train_loader, estimators, cur_lr,
+                              optimizers, criterion, epoch, log_interval,
+                              device, is_classification, indices,
+                              sample_weight)
+    else:
+        for idx, estimator, optimizer in zip(indices,
+                                             estimators,
+                                             optimizers):
+            _parallel_fit_per_epoch(member_loaders[idx], estimator, cur_lr,
+                                    optimizer, criterion, idx, epoch,
+                                    log_interval, device, is_classification,
+                                    member_weights[idx], batch_bootstrap)
+
+
+def _vectorized_fit_per_epoch(train_loader,
+                              stacked,
+                              cur_lr,
+                              optimizer,
+                              criterion,
+                              epoch,
+                              log_interval,
+                              device,
+                              is_classification,
+                              sample_weight=None):
+    """
+    Private function used to fit all base estimators in a single process,
+    with the vectorized forwarding and backwarding on their stacked
+    parameters, and a single step of the optimizer on all base estimators.
+    The bootstrap sample of each base estimator is represented by the weights
+    on samples in each batch, see `_shared_fit_per_epoch` on `sample_weight`.
+    """
 
-@torchensemble_model_doc("""Implementation on the BaggingClassifier.""",
-                         "model")
-class BaggingClassifier(BaseModule):
+    if cur_lr:
+        set_module.update_lr(optimizer, cur_lr)
 
-    @torchensemble_model_doc(
-        """Implementation on the data forwarding in BaggingClassifier.""",
-        "classifier_forward")
-    def forward(self, x):
-        # Take the average over class distributions from all base estimators.
-        outputs = [F.softmax(estimator(x), dim=1)
-                   for estimator in self.estimators_]
-        proba = op.average(outputs)
+    n_estimators = len(stacked)
+    for batch_idx, elem in enumerate(train_loader):
 
-        return proba
+        data, target, weight = _parse_batch(elem, sample_weight, device)
+        if weight is None:
+            weight = _batch_bootstrap_weight(n_estimators,
+                                             data.size(0),
+                                             device)
 
-    @torchensemble_model_doc(
-        """Set the attributes on optimizer for BaggingClassifier.""",
-        "set_optimizer")
-    def set_optimizer(self, optimizer_name, **kwargs):
-        self.optimizer_name = optimizer_name
-        self.optimizer_args = kwargs
+        optimizer.zero_grad()
+        outputs = stacked(data)
+        losses = vec.stacked_loss(criterion, outputs, target)
+        loss = (losses * weight).sum(dim=1) / weight.sum(dim=1).clamp(min=1.)
+        loss.sum().backward()
+        optimizer.step()
 
-    @torchensemble_model_doc(
-        """Set the attributes on scheduler for BaggingClassifier.""",
-        "set_scheduler")
-    def set_scheduler(self, scheduler_name, **kwargs):
-        self.scheduler_name = scheduler_name
-        self.scheduler_args = kwargs
-        self.use_scheduler_ = True
+        # Print training status
+        if batch_idx % log_interval == 0:
+            for idx in range(n_estimators):
+
+                # Classification
+                if is_classification:
+                    subsample_size = int(weight[idx].sum().item())
+                    _, predicted = torch.max(outputs.data[idx], 1)
+                    correct = ((predicted == target).float()
+                               * weight[idx]).sum().item()
+
+                    msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch:"
+                           " {:03d} | Loss: {:.5f} | Correct: {:d}/{:d}")
+                    print(msg.format(idx, epoch, batch_idx, loss[idx],
+                                     int(correct), subsample_size))
+                else:
+                    msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch:"
+                           " {:03d} | Loss: {:.5f}")
+                    print(msg.format(idx, epoch, batch_idx, loss[idx]))
 
-    @torchensemble_model_doc(
-        """Implementation on the training stage of BaggingClassifier.""",
-        "fit")
-    def fit(self,
-            train_loader,
-            epochs=100,
-            log_interval=100,
-            test_loader=None,
-            save_model=True,
-            save_dir=None):
+    return stacked, optimizer
 
+
+def _bagging_model_doc(header, item="fit"):
+    """
+    Decorator on obtaining documentation for different bagging models.
+    """
+    def get_doc(item):
+        """Return the selected item"""
+        __doc = {"model": __model_doc,
+                 "fit": __fit_doc}
+        return __doc[item]
+
+    def adddoc(cls):
+        doc = [header + "\n\n"]
+        doc.extend(get_doc(item))
+        cls.__doc__ = "".join(doc)
+        return cls
+    return adddoc
+
+
+class _BaseBagging(BaseModule):
+
+    _fitted_attributes = BaseModule._fitted_attributes + ("n_features_",)
+
+    def __init__(self,
+                 estimator,
+                 n_estimators,
+                 estimator_args=None,
+                 cuda=True,
+                 n_jobs=None,
+                 bootstrap=True,
+                 max_samples=1.,
+                 max_features=1.,
+                 oob_score=False):
+        super(_BaseBagging, self).__init__(estimator,
+                                           n_estimators,
+                                           estimator_args,
+                                           cuda,
+                                           n_jobs)
+        self.bootstrap = bootstrap
+        self.max_samples = max_samples
+        self.max_features = max_features
+        self.oob_score = oob_score
+
+    def _decide_size(self, size, total, name):
+        """
+        Return the number of samples or features used by each base estimator,
+        given `size` as a fraction (float) or a number (int) out of `total`.
+        """
+        if isinstance(size, float) and 0 < size <= 1:
+            return max(1, int(size * total))
+        elif (isinstance(size, int)
+              and not isinstance(size, bool)
+              and 0 < size <= total):
+            return size
+        else:
+            msg = ("The number of {} for each base estimator should be a"
+                   " float in (0, 1] or an int in [1, {}], but got {}"
+                   " instead.")
+            self.logger.error(msg.format(name, total, size))
+            raise ValueError(msg.format(name, total, size))
+
+    def _make_estimator(self):
+        """
+        Make a base estimator, which only takes a random subset of features
+        if `max_features` is not 1.0.
+        """
+        estimator = super(_BaseBagging, self)._make_estimator()
+        if _is_full_size(self.max_features):
+            return estimator
+
+        max_features = self._decide_size(self.max_features,
+                                         self.n_features_,
+                                         "features")
+        feature_indices, _ = torch.sort(
+            torch.randperm(self.n_features_)[:max_features])
+
+        return _SubspaceEstimator(estimator, feature_indices).to(self.device)
+
+    def _bootstrap_indices(self, train_loader):
+        """
+        Return the indices of training samples in the bootstrap sample of
+        each base estimator, which is a list of sorted int64 tensors, where a
+        sample drawn multiple times appears multiple times. Return None if
+        the bootstrap sample on the training dataset is unavailable.
+
+        - If `bootstrap` is True, samples are drawn with replacement.
+        - If `bootstrap` is False, samples are drawn without replacement, by
+          taking consecutive slices of a random permutation of samples for
+          base estimators one after another, so that base estimators are
+          trained on disjoint shards of the training data as long as
+          ``n_estimators * max_samples`` does not exceed the number of
+          training samples.
+        """
+        n_samples = dataloader.n_samples(train_loader)
+        if (n_samples is None
+                or isinstance(train_loader.dataset, IterableDataset)
+                or train_loader.batch_size is None):
+            if not self.bootstrap or not _is_full_size(self.max_samples):
+                msg = ("Setting `bootstrap` or `max_samples` requires a"
+                       " map-style dataset with the argument `batch_size`.")
+                self.logger.error(msg)
+                raise ValueError(msg)
+
+            msg = ("The bootstrap sample on the training dataset requires a"
+                   " map-style dataset with the argument `batch_size`, the"
+                   " sampling with replacement is conducted on each batch"
+                   " of data instead.")
+            self.logger.warning(msg)
+            return None
+
+        max_samples = self._decide_size(self.max_samples,
+                                        n_samples,
+                                        "samples drawn")
+        indices = []
+        if self.bootstrap:
+            for _ in range(self.n_estimators):
+                member_indices = torch.randint(high=n_samples,
+                                               size=(max_samples,))
+                indices.append(torch.sort(member_indices)[0])
+        else:
+            perm = torch.randperm(n_samples)
+            for idx in range(self.n_estimators):
+                start = (idx * max_samples) % n_samples
+                member_indices = perm[start:start + max_samples]
+                if member_indices.size(0) < max_samples:  # wrap around
+                    member_indices = torch.cat(
+                        [member_indices,
+                         perm[:max_samples - member_indices.size(0)]])
+                indices.append(torch.sort(member_indices)[0])
+
+        return indices
+
+    def _make_member_loaders(self, train_loader, indices, bootstrap_weight):
+        """
+        Return the data loader on the bootstrap sample of each base estimator,
+        and the weights on training samples used by each data loader.
+        """
+        n_samples = dataloader.n_samples(train_loader)
+        loaders, weights = [], []
+        for member_indices in indices:
+            if bootstrap_weight:
+                weight = torch.bincount(member_indices, minlength=n_samples)
+                weight = weight.to(torch.int16)
+                member_indices = torch.nonzero(weight).view(-1)
+            else:
+                weight = None
+            loaders.append(dataloader.make_subset_loader(train_loader,
+                                                         member_indices,
+                                                         bootstrap_weight))
+            weights.append(weight)
+
+        return loaders, weights
+
+    def _evaluate(self, estimators, test_loader, is_classification):
+        """
+        Return the validation accuracy in classification, or the validation
+        mean squared error in regression, of `estimators` on `test_loader`.
+        """
+        self.eval()
+        with torch.no_grad():
+            if is_classification:
+                correct = 0
+                total = 0
+                for _, (data, target) in enumerate(test_loader):
+                    data = data.to(self.device)
+                    target = target.to(self.device)
+                    outputs = [F.softmax(estimator(data), dim=1)
+                               for estimator in estimators]
+                    output = op.average(outputs)
+                    _, predicted = torch.max(output.data, 1)
+                    correct += (predicted == target).sum().item()
+                    total += target.size(0)
+                return 100 * correct / total
+            else:
+                criterion = nn.MSELoss()
+                mse = 0
+                n_batches = 0
+                for _, (data, target) in enumerate(test_loader):
+                    data = data.to(self.device)
+                    target = target.to(self.device)
+                    outputs = [estimator(data) for estimator in estimators]
+                    output = op.average(outputs)
+                    mse += criterion(output, target)
+                    n_batches += 1
+                return mse / n_batches
+
+    def _oob_evaluate(self,
+                      estimators,
+                      indexed_loader,
+                      sample_weight,
+                      is_classification):
+        """
+        Set the out-of-bag predictions on training samples and return the
+        out-of-bag score. The prediction on each training sample takes the
+        average over base estimators whose bootstrap samples do not contain
+        it, and samples contained in all bootstrap samples are skipped.
+        """
+        n_samples = sample_weight.size(1)
+        outputs, targets = None, None
+        n_oob = torch.zeros(n_samples, device=self.device)
+
+        self.eval()
+        with torch.no_grad():
+            for index, (data, target) in indexed_loader:
+                data, target = data.to(self.device), target.to(self.device)
+                is_oob = (sample_weight[:, index] == 0).to(self.device)
+                index = index.to(self.device)
+
+                for est_idx, estimator in enumerate(estimators):
+                    mask = is_oob[est_idx]
+                    if not mask.any():
+                        continue
+                    output = estimator(data[mask])
+                    if is_classification:
+                        output = F.softmax(output, dim=1)
+                    if outputs is None:
+                        outputs = torch.zeros(n_samples,
+                                              output.size(1),
+                                              device=self.device)
+                    outputs[index[mask]] += output
+
+                if targets is None:
+                    targets = target.new_zeros((n_samples,)
+                                               + tuple(target.shape[1:]))
+                targets[index] = target
+                n_oob[index] = is_oob.sum(dim=0).float()
+
+        is_valid = n_oob > 0
+        if outputs is None or not is_valid.any():
+            msg = ("All training samples are contained in the bootstrap"
+                   " samples of all base estimators, the out-of-bag score"
+                   " is unavailable.")
+            self.logger.warning(msg)
+            self.oob_score_ = float("nan")
+            return self.oob_score_
+
+        self.oob_prediction_ = outputs / n_oob.unsqueeze(1)
+        pred, target = self.oob_prediction_[is_valid], targets[is_valid]
+        if is_classification:
+            correct = (pred.argmax(dim=1) == target).sum().item()
+            self.oob_score_ = 100 * correct / target.size(0)
+        else:
+            self.oob_score_ = nn.MSELoss()(pred, target).item()
+
+        return self.oob_score_
+
+    def _fit(self,
+             train_loader,
+             epochs,
+             log_interval,
+             test_loader,
+             save_model,
+             save_dir,
+             shared_batches,
+             vectorize,
+             persistent_workers,
+             bootstrap_weight,
+             batch_size,
+             is_classification):
+
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
+
+        self.unstack_estimators()
         self._validate_parameters(epochs, log_interval)
-        self.n_outputs = self._decide_n_outputs(train_loader, True)
+        self.n_outputs = self._decide_n_outputs(train_loader,
+                                                is_classification)
+        if not _is_full_size(self.max_features):
+            if dataloader.is_sparse(train_loader):
+                msg = ("Setting `max_features` is not supported on sparse"
+                       " input data, but got {} instead.")
+                self.logger.error(msg.format(self.max_features))
+                raise ValueError(msg.format(self.max_features))
+            self.n_features_ = dataloader.n_features(train_loader)
 
         # Instantiate a pool of base estimators, optimizers, and schedulers.
         estimators = []
@@ -139,25 +733,75 @@ class BaggingClassifier(BaseModule):
                                                        self.optimizer_name,
                                                        **self.optimizer_args))
 
+        if vectorize:
+            stacked = vec.stack_for_training(estimators)
+            stacked_optimizer = set_module.set_optimizer(
+                stacked, self.optimizer_name, **self.optimizer_args)
+
         if self.use_scheduler_:
             scheduler_ = set_module.set_scheduler(optimizers[0],
                                                   self.scheduler_name,
                                                   **self.scheduler_args)
 
         # Utils
-        criterion = nn.CrossEntropyLoss()
-        best_acc = 0.
-
-        # Internal helper function on pesudo forward
-        def _forward(estimators, data):
-            outputs = [F.softmax(estimator(data), dim=1)
-                       for estimator in estimators]
-            proba = op.average(outputs)
-
-            return proba
+        if is_classification:
+            criterion = nn.CrossEntropyLoss(reduction="none")
+            best_score = 0.
+        else:
+            criterion = nn.MSELoss(reduction="none")
+            best_score = float("inf")
+
+        # The bootstrap sample of each base estimator, drawn once from the
+        # training dataset.
+        indices = self._bootstrap_indices(train_loader)
+        batch_bootstrap = indices is None
+        if self.oob_score and batch_bootstrap:
+            msg = ("The out-of-bag score requires the bootstrap sample on the"
+                   " training dataset.")
+            self.logger.error(msg)
+            raise ValueError(msg)
+        sample_weight = None
+        if batch_bootstrap:
+            indexed_loader = train_loader
+            member_loaders = [train_loader] * self.n_estimators
+            member_weights = [None] * self.n_estimators
+        else:
+            # The counts of samples drawn for all base estimators are only
+            # kept when batches are shared, or for the out-of-bag score.
+            if vectorize or shared_batches or self.oob_score:
+                sample_weight = _bootstrap_counts(
+                    indices, dataloader.n_samples(train_loader))
+            indexed_loader = dataloader.make_indexed_loader(train_loader)
+            oob_loader = dataloader.make_indexed_loader(
+                dataloader.without_echo(train_loader))
+            member_loaders, member_weights = None, None
+            if not (vectorize or shared_batches):
+                member_loaders, member_weights = self._make_member_loaders(
+                    train_loader, indices, bootstrap_weight)
+
+        if persistent_workers and not vectorize:
+            workers = par.WorkerPool(
+                estimators,
+                optimizers,
+                partial(_persistent_fit_per_epoch,
+                        criterion=criterion,
+                        log_interval=log_interval,
+                        device=self.device,
+                        is_classification=is_classification,
+                        shared_batches=shared_batches,
+                        member_loaders=member_loaders,
+                        member_weights=member_weights,
+                        sample_weight=sample_weight,
+                        batch_bootstrap=batch_bootstrap),
+                indexed_loader if shared_batches else train_loader,
+                self.n_jobs,
+                broadcast=shared_batches
+            )
+        else:
+            workers = contextlib.nullcontext()
 
         # Maintain a pool of workers
-        with Parallel(n_jobs=self.n_jobs) as parallel:
+        with Parallel(n_jobs=self.n_jobs) as parallel, workers:
 
             # Training loop
             for epoch in range(epochs):
@@ -168,56 +812,91 @@ class BaggingClassifier(BaseModule):
                 else:
                     cur_lr = None
 
-                if self.n_jobs and self.n_jobs > 1:
+                if (self.n_jobs and self.n_jobs > 1
+                        and not persistent_workers
+                        and not shared_batches and not vectorize):
                     msg = "Parallelization on the training epoch: {:03d}"
                     self.logger.info(msg.format(epoch))
 
-                rets = parallel(delayed(_parallel_fit_per_epoch)(
-                        train_loader,
-                        estimator,
+                if vectorize:
+                    stacked, stacked_optimizer = _vectorized_fit_per_epoch(
+                        indexed_loader,
+                        stacked.train(),
+                        cur_lr,
+                        stacked_optimizer,
+                        criterion,
+                        epoch,
+                        log_interval,
+                        self.device,
+                        is_classification,
+                        sample_weight
+                    )
+                    stacked.unstack(estimators)
+                elif persistent_workers:
+                    workers.fit(epoch, cur_lr)
+                elif shared_batches:
+                    estimators, optimizers = _shared_fit_per_epoch(
+                        indexed_loader,
+                        estimators,
                         cur_lr,
-                        optimizer,
+                        optimizers,
                         criterion,
-                        idx,
                         epoch,
                         log_interval,
                         self.device,
-                        True
+                        is_classification,
+                        sample_weight=sample_weight
+                    )
+                else:
+                    rets = parallel(delayed(_parallel_fit_per_epoch)(
+                            member_loader,
+                            estimator,
+                            cur_lr,
+                            optimizer,
+                            criterion,
+                            idx,
+                            epoch,
+                            log_interval,
+                            self.device,
+                            is_classification,
+                            member_weight,
+                            batch_bootstrap
+                        )
+                        for idx, (estimator, optimizer, member_loader,
+                                  member_weight) in enumerate(
+                            zip(estimators, optimizers, member_loaders,
+                                member_weights))
                     )
-                    for idx, (estimator, optimizer) in enumerate(
-                            zip(estimators, optimizers))
-                )
 
-                estimators, optimizers = [], []
-                for estimator, optimizer in rets:
-                    estimators.append(estimator)
-                    optimizers.append(optimizer)
+                    estimators, optimizers = [], []
+                    for estimator, optimizer in rets:
+                        estimators.append(estimator)
+                        optimizers.append(optimizer)
 
                 # Validation
-                if test_loader:
-                    self.eval()
-                    with torch.no_grad():
-                        correct = 0
-                        total = 0
-                        for _, (data, target) in enumerate(test_loader):
-                            data = data.to(self.device)
-                            target = target.to(self.device)
-                            output = _forward(estimators, data)
-                            _, predicted = torch.max(output.data, 1)
-                            correct += (predicted == target).sum().item()
-                            total += target.size(0)
-                        acc = 100 * correct / total
-
-                        if acc > best_acc:
-                            best_acc = acc
-                            self.estimators_ = nn.ModuleList()
-                            self.estimators_.extend(estimators)
-                            if save_model:
-                                io.save(self, save_dir, self.logger)
-
+                if test_loader is not None:
+                    score = self._evaluate(estimators,
+                                           test_loader,
+                                           is_classification)
+                    if is_classification:
+                        is_best = score > best_score
+                    else:
+                        is_best = score < best_score
+
+                    if is_best:
+                        best_score = score
+                        self.estimators_ = nn.ModuleList()
+                        self.estimators_.extend(estimators)
+                        if save_model:
+                            io.save(self, save_dir, self.logger)
+
+                    if is_classification:
                         msg = ("Epoch: {:03d} | Validation Acc: {:.3f}"
                                " % | Historical Best: {:.3f} %")
-                        self.logger.info(msg.format(epoch, acc, best_acc))
+                    else:
+                        msg = ("Epoch: {:03d} | Validation MSE:"
+                               " {:.5f} | Historical Best: {:.5f}")
+                    self.logger.info(msg.format(epoch, score, best_score))
 
                 # Update the scheduler
                 with warnings.catch_warnings():
@@ -229,41 +908,139 @@ class BaggingClassifier(BaseModule):
                     if self.use_scheduler_:
                         scheduler_.step()
 
+        # The out-of-bag score is only evaluated once on the fitted base
+        # estimators, instead of an extra pass over the training data in
+        # each epoch.
+        if self.oob_score:
+            score = self._oob_evaluate(estimators,
+                                       oob_loader,
+                                       sample_weight,
+                                       is_classification)
+            if is_classification:
+                msg = "OOB Acc: {:.3f} %"
+            else:
+                msg = "OOB MSE: {:.5f}"
+            self.logger.info(msg.format(score))
+
         self.estimators_ = nn.ModuleList()
         self.estimators_.extend(estimators)
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
+
+@_bagging_model_doc("""Implementation on the BaggingClassifier.""",
+                    "model")
+class BaggingClassifier(_BaseBagging):
+
+    @torchensemble_model_doc(
+        """Implementation on the data forwarding in BaggingClassifier.""",
+        "classifier_forward")
+    def forward(self, x):
+        # Take the average over class distributions from all base estimators.
+        outputs = F.softmax(self._forward_estimators(x), dim=2)
+        proba = op.average(outputs)
+
+        return proba
+
+    @torchensemble_model_doc(
+        """Implementation on the data forwarding with the confidence cascade in BaggingClassifier.""",  # noqa: E501
+        "classifier_forward_cascade")
+    def forward_cascade(self, X, threshold=None):
+        return self._forward_cascade(X, threshold, False)
+
+    @torchensemble_model_doc(
+        """Calibrate the confidence cascade in BaggingClassifier.""",
+        "classifier_calibrate_cascade")
+    def calibrate_cascade(self,
+                          test_loader,
+                          tolerance=0.5,
+                          criterion="max_proba"):
+        return self._calibrate_cascade(test_loader,
+                                       tolerance,
+                                       criterion,
+                                       False)
+
+    @torchensemble_model_doc(
+        """Set the attributes on optimizer for BaggingClassifier.""",
+        "set_optimizer")
+    def set_optimizer(self, optimizer_name, **kwargs):
+        self.optimizer_name = optimizer_name
+        self.optimizer_args = kwargs
+
+    @torchensemble_model_doc(
+        """Set the attributes on scheduler for BaggingClassifier.""",
+        "set_scheduler")
+    def set_scheduler(self, scheduler_name, **kwargs):
+        self.scheduler_name = scheduler_name
+        self.scheduler_args = kwargs
+        self.use_scheduler_ = True
+
+    @_bagging_model_doc(
+        """Implementation on the training stage of BaggingClassifier.""",
+        "fit")
+    def fit(self,
+            train_loader,
+            epochs=100,
+            log_interval=100,
+            test_loader=None,
+            save_model=True,
+            save_dir=None,
+            shared_batches=False,
+            vectorize=False,
+            persistent_workers=False,
+            bootstrap_weight=False,
+            batch_size=256):
+        self._fit(train_loader,
+                  epochs,
+                  log_interval,
+                  test_loader,
+                  save_model,
+                  save_dir,
+                  shared_batches,
+                  vectorize,
+                  persistent_workers,
+                  bootstrap_weight,
+                  batch_size,
+                  True)
+
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of BaggingClassifier.""",
         "classifier_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         correct = 0
         total = 0
 
-        for _, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            _, predicted = torch.max(output.data, 1)
-            correct += (predicted == target).sum().item()
-            total += target.size(0)
+        with torch.no_grad():
+            for _, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                _, predicted = torch.max(output.data, 1)
+                correct += (predicted == target).sum()
+                total += target.size(0)
 
-        acc = 100 * correct / total
+        acc = 100 * float(correct) / total
 
         return acc
 
+    @torchensemble_model_doc(
+        """Return the predicted class distributions of BaggingClassifier.""",
+        "classifier_predict_proba")
+    def predict_proba(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
+
 
-@torchensemble_model_doc("""Implementation on the BaggingRegressor.""",
-                         "model")
-class BaggingRegressor(BaseModule):
+@_bagging_model_doc("""Implementation on the BaggingRegressor.""",
+                    "model")
+class BaggingRegressor(_BaseBagging):
 
     @torchensemble_model_doc(
         """Implementation on the data forwarding in BaggingRegressor.""",
         "regressor_forward")
     def forward(self, x):
         # Take the average over predictions from all base estimators.
-        outputs = [estimator(x) for estimator in self.estimators_]
+        outputs = self._forward_estimators(x)
         pred = op.average(outputs)
 
         return pred
@@ -283,7 +1060,7 @@ class BaggingRegressor(BaseModule):
         self.scheduler_args = kwargs
         self.use_scheduler_ = True
 
-    @torchensemble_model_doc(
+    @_bagging_model_doc(
         """Implementation on the training stage of BaggingRegressor.""",
         "fit")
     def fit(self,
@@ -292,121 +1069,46 @@ class BaggingRegressor(BaseModule):
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
-
-        self._validate_parameters(epochs, log_interval)
-        self.n_outputs = self._decide_n_outputs(train_loader, False)
-
-        # Instantiate a pool of base estimators, optimizers, and schedulers.
-        estimators = []
-        for _ in range(self.n_estimators):
-            estimators.append(self._make_estimator())
-
-        optimizers = []
-        for i in range(self.n_estimators):
-            optimizers.append(set_module.set_optimizer(estimators[i],
-                                                       self.optimizer_name,
-                                                       **self.optimizer_args))
-
-        if self.use_scheduler_:
-            scheduler_ = set_module.set_scheduler(optimizers[0],
-                                                  self.scheduler_name,
-                                                  **self.scheduler_args)
-
-        # Utils
-        criterion = nn.MSELoss()
-        best_mse = float("inf")
-
-        # Internal helper function on pesudo forward
-        def _forward(estimators, data):
-            outputs = [estimator(data) for estimator in estimators]
-            pred = op.average(outputs)
-
-            return pred
-
-        # Maintain a pool of workers
-        with Parallel(n_jobs=self.n_jobs) as parallel:
-
-            # Training loop
-            for epoch in range(epochs):
-                self.train()
-
-                if self.use_scheduler_:
-                    cur_lr = scheduler_.get_last_lr()[0]
-                else:
-                    cur_lr = None
-
-                if self.n_jobs and self.n_jobs > 1:
-                    msg = "Parallelization on the training epoch: {:03d}"
-                    self.logger.info(msg.format(epoch))
-
-                rets = parallel(delayed(_parallel_fit_per_epoch)(
-                        train_loader,
-                        estimator,
-                        cur_lr,
-                        optimizer,
-                        criterion,
-                        idx,
-                        epoch,
-                        log_interval,
-                        self.device,
-                        False
-                    )
-                    for idx, (estimator, optimizer) in enumerate(
-                            zip(estimators, optimizers))
-                )
-
-                estimators, optimizers = [], []
-                for estimator, optimizer in rets:
-                    estimators.append(estimator)
-                    optimizers.append(optimizer)
-
-                # Validation
-                if test_loader:
-                    self.eval()
-                    with torch.no_grad():
-                        mse = 0
-                        for _, (data, target) in enumerate(test_loader):
-                            data = data.to(self.device)
-                            target = target.to(self.device)
-                            output = _forward(estimators, data)
-                            mse += criterion(output, target)
-                        mse /= len(test_loader)
-
-                        if mse < best_mse:
-                            best_mse = mse
-                            self.estimators_ = nn.ModuleList()
-                            self.estimators_.extend(estimators)
-                            if save_model:
-                                io.save(self, save_dir, self.logger)
-
-                        msg = ("Epoch: {:03d} | Validation MSE:"
-                               " {:.5f} | Historical Best: {:.5f}")
-                        self.logger.info(msg.format(epoch, mse, best_mse))
-
-                # Update the scheduler
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore", UserWarning)
-
-                    if self.use_scheduler_:
-                        scheduler_.step()
-
-        self.estimators_ = nn.ModuleList()
-        self.estimators_.extend(estimators)
-        if save_model and not test_loader:
-            io.save(self, save_dir, self.logger)
+            save_dir=None,
+            shared_batches=False,
+            vectorize=False,
+            persistent_workers=False,
+            bootstrap_weight=False,
+            batch_size=256):
+        self._fit(train_loader,
+                  epochs,
+                  log_interval,
+                  test_loader,
+                  save_model,
+                  save_dir,
+                  shared_batches,
+                  vectorize,
+                  persistent_workers,
+                  bootstrap_weight,
+                  batch_size,
+                  False)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of BaggingRegressor.""",
         "regressor_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         mse = 0
+        n_batches = 0
         criterion = nn.MSELoss()
 
-        for batch_idx, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            mse += criterion(output, target)
+        with torch.no_grad():
+            for batch_idx, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                mse += criterion(output, target)
+                n_batches += 1
+
+        return mse / n_batches
 
-        return mse / len(test_loader)
+    @torchensemble_model_doc(
+        """Return the predicted values of BaggingRegressor.""",
+        "regressor_predict_output")
+    def predict_output(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
@@ -29,7 +29,7 @@ class FusionClassifier(BaseModule):
         Implementation on the internal data forwarding in FusionClassifier.
         """
         # Average
-        outputs = [estimator(x) for estimator in self.estimators_]
+        outputs = self._forward_estimators(x)
         output = op.average(outputs)
 
         return output
@@ -67,7 +67,13 @@ class FusionClassifier(BaseModule):
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            batch_size=256):
+
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
+
+        self.unstack_estimators()
 
         # Instantiate base estimators and set attributes
         for _ in range(self.n_estimators):
@@ -116,7 +122,7 @@ class FusionClassifier(BaseModule):
                             )
 
             # Validation
-            if test_loader:
+            if test_loader is not None:
                 self.eval()
                 with torch.no_grad():
                     correct = 0
@@ -143,28 +149,36 @@ class FusionClassifier(BaseModule):
             if hasattr(self, "scheduler_"):
                 self.scheduler_.step()
 
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of FusionClassifier.""",
         "classifier_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         correct = 0
         total = 0
 
-        for _, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            _, predicted = torch.max(output.data, 1)
-            correct += (predicted == target).sum().item()
-            total += target.size(0)
+        with torch.no_grad():
+            for _, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                _, predicted = torch.max(output.data, 1)
+                correct += (predicted == target).sum()
+                total += target.size(0)
 
-        acc = 100 * correct / total
+        acc = 100 * float(correct) / total
 
         return acc
 
+    @torchensemble_model_doc(
+        """Return the predicted class distributions of FusionClassifier.""",
+        "classifier_predict_proba")
+    def predict_proba(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
+
 
 @torchensemble_model_doc("""Implementation on the FusionRegressor.""",
                          "model")
@@ -174,7 +188,7 @@ class FusionRegressor(BaseModule):
         """Implementation on the data forwarding in FusionRegressor.""",
         "regressor_forward")
     def forward(self, x):
-        outputs = [estimator(x) for estimator in self.estimators_]
+        outputs = self._forward_estimators(x)
         pred = op.average(outputs)
 
         return pred
@@ -203,7 +217,13 @@ class FusionRegressor(BaseModule):
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            batch_size=256):
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
+
+        self.unstack_estimators()
+
         # Instantiate base estimators and set attributes
         for _ in range(self.n_estimators):
             self.estimators_.append(self._make_estimator())
@@ -243,16 +263,18 @@ class FusionRegressor(BaseModule):
                         self.logger.info(msg.format(epoch, batch_idx, loss))
 
             # Validation
-            if test_loader:
+            if test_loader is not None:
                 self.eval()
                 with torch.no_grad():
                     mse = 0
+                    n_batches = 0
                     for _, (data, target) in enumerate(test_loader):
                         data = data.to(self.device)
                         target = target.to(self.device)
                         output = self.forward(data)
                         mse += criterion(output, target)
-                    mse /= len(test_loader)
+                        n_batches += 1
+                    mse /= n_batches
 
                     if mse < best_mse:
                         best_mse = mse
@@ -267,20 +289,30 @@ class FusionRegressor(BaseModule):
             if hasattr(self, "scheduler_"):
                 self.scheduler_.step()
 
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of FusionRegressor.""",
         "regressor_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         mse = 0
+        n_batches = 0
         criterion = nn.MSELoss()
 
-        for batch_idx, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            mse += criterion(output, target)
+        with torch.no_grad():
+            for batch_idx, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                mse += criterion(output, target)
+                n_batches += 1
+
+        return mse / n_batches
 
-        return mse / len(test_loader)
+    @torchensemble_model_doc(
+        """Return the predicted values of FusionRegressor.""",
+        "regressor_predict_output")
+    def predict_output(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
@@ -13,8 +13,10 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 from ._base import BaseModule, torchensemble_model_doc
+from . import _constants as const
 from .utils import io
 from .utils import set_module
+from .utils import dataloader
 from .utils import operator as op
 
 
@@ -44,22 +46,26 @@ __model_doc = """
     ----------
     estimators_ : torch.nn.ModuleList
         An internal container that stores all fitted base estimators.
+    stage_output_norms_ : list
+        The largest absolute value in the outputs of each fitted base
+        estimator on the training data, recorded in the last training epoch
+        of the base estimator.
 """
 
 
 __fit_doc = """
     Parameters
     ----------
-    train_loader : torch.utils.data.DataLoader
+    train_loader : torch.utils.data.DataLoader or tuple
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        training data.
+        training data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
     epochs : int, default=100
         The number of training epochs per base estimator.
     log_interval : int, default=100
         The number of batches to wait before logging the training status.
-    test_loader : torch.utils.data.DataLoader, default=None
+    test_loader : torch.utils.data.DataLoader or tuple, default=None
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        evaluating data.
+        evaluating data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
 
         - If ``None``, no validation is conducted after each base
           estimator being trained.
@@ -85,6 +91,107 @@ __fit_doc = """
         - If ``None``, the model will be saved in the current directory.
         - If not ``None``, the model will be saved in the specified
           directory: ``save_dir``.
+    stage_cache : {None, "memory", "disk"}, default=None
+        Specify whether to cache the accumulated outputs of fitted base
+        estimators on each training sample, which requires a map-style
+        dataset in ``train_loader``.
+
+        - If ``None``, the outputs of all fitted base estimators will be
+          re-computed on each training batch, and the cost on fitting the
+          ``k``-th base estimator grows linearly with ``k``.
+        - If ``"memory"``, the accumulated outputs will be stored in the main
+          memory, and updated only once after each base estimator is fitted.
+        - If ``"disk"``, same as ``"memory"``, except that the accumulated
+          outputs will be stored in a memory-mapped temporary file.
+
+        Notice that cached outputs are computed in the evaluating mode of
+        base estimators, and random data augmentations in ``train_loader``
+        will not be reflected by the cached outputs.
+""" + const.__batch_size_doc
+
+
+__classification_staged_predict_proba_doc = """
+    Parameters
+    ----------
+    X : tensor, numpy.ndarray, tuple or torch.utils.data.DataLoader
+        The testing data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
+        For data loaders, the first element in each batch is taken as the
+        input data.
+    batch_size : int, default=256
+        The number of samples in each batch when ``X`` is a tensor, a NumPy
+        array or a tuple ``(X, y)``. It is ignored for data loaders.
+
+    Yields
+    ------
+    proba : tensor of shape (n_samples, n_classes)
+        The predicted class distribution from the first ``k`` base
+        estimators, for ``k`` from ``1`` to the number of base estimators.
+"""
+
+
+__classification_staged_predict_doc = """
+    Parameters
+    ----------
+    X : tensor, numpy.ndarray, tuple or torch.utils.data.DataLoader
+        The testing data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
+        For data loaders, the first element in each batch is taken as the
+        input data.
+    batch_size : int, default=256
+        The number of samples in each batch when ``X`` is a tensor, a NumPy
+        array or a tuple ``(X, y)``. It is ignored for data loaders.
+
+    Yields
+    ------
+    label : tensor of shape (n_samples,)
+        The predicted class labels from the first ``k`` base estimators, for
+        ``k`` from ``1`` to the number of base estimators.
+"""
+
+
+__regression_staged_predict_doc = """
+    Parameters
+    ----------
+    X : tensor, numpy.ndarray, tuple or torch.utils.data.DataLoader
+        The testing data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
+        For data loaders, the first element in each batch is taken as the
+        input data.
+    batch_size : int, default=256
+        The number of samples in each batch when ``X`` is a tensor, a NumPy
+        array or a tuple ``(X, y)``. It is ignored for data loaders.
+
+    Yields
+    ------
+    pred : tensor of shape (n_samples, n_outputs)
+        The predicted values from the first ``k`` base estimators, for ``k``
+        from ``1`` to the number of base estimators.
+"""
+
+
+__classification_early_exit_doc = """
+    Base estimators are evaluated in order, and a sample stops adding the
+    outputs of remaining base estimators once the margin between its two
+    largest accumulated outputs exceeds the largest change that remaining
+    base estimators could make, estimated from ``stage_output_norms_``.
+    Only samples not yet decided are forwarded to the next base estimator.
+
+    Parameters
+    ----------
+    X : tensor
+        An input batch of data, which should be a valid input data batch
+        for base estimators in the ensemble.
+    slack : float, default=1.
+        The multiplicative factor on the estimated change from remaining
+        base estimators. A larger value makes early exit more conservative,
+        and a smaller value trades accuracy for speed.
+    max_stages : int, default=None
+        The largest number of base estimators evaluated on each sample. If
+        ``None``, all base estimators can be evaluated.
+
+    Returns
+    -------
+    proba : tensor of shape (batch_size, n_classes)
+        The predicted class distribution from the base estimators evaluated
+        on each sample.
 """
 
 
@@ -96,7 +203,13 @@ def _gradient_boosting_model_doc(header, item="model"):
     def get_doc(item):
         """Return the selected item"""
         __doc = {"model": __model_doc,
-                 "fit": __fit_doc}
+                 "fit": __fit_doc,
+                 "classifier_staged_predict_proba":
+                     __classification_staged_predict_proba_doc,
+                 "classifier_staged_predict":
+                     __classification_staged_predict_doc,
+                 "regressor_staged_predict": __regression_staged_predict_doc,
+                 "classifier_early_exit": __classification_early_exit_doc}
         return __doc[item]
 
     def adddoc(cls):
@@ -109,6 +222,9 @@ def _gradient_boosting_model_doc(header, item="model"):
 
 class _BaseGradientBoosting(BaseModule):
 
+    _fitted_attributes = (BaseModule._fitted_attributes
+                          + ("stage_output_norms_",))
+
     def __init__(self,
                  estimator,
                  n_estimators,
@@ -132,12 +248,15 @@ class _BaseGradientBoosting(BaseModule):
         self.logger = logging.getLogger()
 
         self.estimators_ = nn.ModuleList()
+        self.stacked_estimators_ = None
         self.use_scheduler_ = False
+        self._valid_cache = None
 
     def _validate_parameters(self,
                              epochs,
                              log_interval,
-                             early_stopping_rounds):
+                             early_stopping_rounds,
+                             stage_cache=None):
         """Validate hyper-parameters on training the ensemble."""
 
         if not epochs > 0:
@@ -165,6 +284,12 @@ class _BaseGradientBoosting(BaseModule):
             self.logger.error(msg.format(self.shrinkage_rate))
             raise ValueError(msg.format(self.shrinkage_rate))
 
+        if stage_cache not in (None, "memory", "disk"):
+            msg = ("The stage cache should be one of {{None, memory, disk}},"
+                   " but got {} instead.")
+            self.logger.error(msg.format(stage_cache))
+            raise ValueError(msg.format(stage_cache))
+
     @abc.abstractmethod
     def _handle_early_stopping(self, test_loader, est_idx):
         """Decide whether to trigger the internal counter on early stopping."""
@@ -184,6 +309,93 @@ class _BaseGradientBoosting(BaseModule):
 
         return out
 
+    def _staged_outputs(self, X, batch_size=256):
+        """
+        Yield the accumulated outputs from the first `k` base estimators on
+        all samples in `X` for each `k`. All stages are computed in a single
+        pass over `X`, where the output from each base estimator on a batch
+        is only computed once and added to a running sum.
+        """
+        if not batch_size > 0:
+            msg = ("The number of samples in each batch should be strictly"
+                   " positive, but got {} instead.")
+            self.logger.error(msg.format(batch_size))
+            raise ValueError(msg.format(batch_size))
+
+        X = self._make_loader(X, batch_size)
+
+        # `torch.inference_mode` is only available in PyTorch >= 1.9
+        inference_mode = getattr(torch, "inference_mode", torch.no_grad)
+
+        self.eval()
+        staged_outputs = [[] for _ in self.estimators_]
+        with inference_mode():
+            for data in dataloader.iter_inputs(X, batch_size):
+                data = data.to(self.device)
+                output = None
+                for est_idx, estimator in enumerate(self.estimators_):
+                    if output is None:
+                        output = self.shrinkage_rate * estimator(data)
+                    else:
+                        output = output + self.shrinkage_rate * estimator(data)
+                    staged_outputs[est_idx].append(output.cpu())
+
+        for outputs in staged_outputs:
+            yield torch.cat(outputs)
+
+    def _staged_validation(self, test_loader, est_idx):
+        """
+        Yield the accumulated outputs from the first `est_idx+1` base
+        estimators and the targets on each batch of `test_loader`.
+
+        Accumulated outputs of fitted base estimators on validation samples
+        are cached across stages, so that only the `est_idx`-th base
+        estimator is evaluated on each batch. Outputs are re-computed from
+        all fitted base estimators if `test_loader` does not support the
+        indices of samples.
+        """
+        test_loader = dataloader.without_echo(test_loader)
+        try:
+            indexed_loader = dataloader.make_indexed_loader(test_loader)
+        except ValueError:
+            for _, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                yield self._staged_forward(data, est_idx), target
+            return
+
+        if est_idx == 0:
+            self._valid_cache = None
+        estimator = self.estimators_[est_idx]
+
+        for _, (index, (data, target)) in enumerate(indexed_loader):
+            data, target = data.to(self.device), target.to(self.device)
+            output = self.shrinkage_rate * estimator(data)
+
+            if self._valid_cache is None:
+                shape = (len(indexed_loader.dataset),) + output.size()[1:]
+                self._valid_cache = io.zeros(shape)
+            self._valid_cache[index] += output.cpu()
+
+            yield self._valid_cache[index].to(self.device), target
+
+    def _update_stage_cache(self, cache, estimator, indexed_loader, on_disk):
+        """
+        Add the shrunken outputs of the fitted `estimator` on all training
+        samples to the accumulated outputs in `cache`.
+        """
+        estimator.eval()
+        with torch.no_grad():
+            for index, (data, target) in indexed_loader:
+                data = data.to(self.device)
+                output = self.shrinkage_rate * estimator(data).cpu()
+
+                if cache is None:
+                    shape = (len(indexed_loader.dataset),) + output.size()[1:]
+                    cache = io.zeros(shape, on_disk)
+                cache[index] += output
+
+        return cache
+
     @torchensemble_model_doc(
         """Set the attributes on optimizer for Gradient Boosting.""",
         "set_optimizer")
@@ -206,14 +418,22 @@ class _BaseGradientBoosting(BaseModule):
             test_loader=None,
             early_stopping_rounds=2,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            stage_cache=None,
+            batch_size=256):
+
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
+
+        self.unstack_estimators()
 
         # Instantiate base estimators and set attributes
         for _ in range(self.n_estimators):
             self.estimators_.append(self._make_estimator())
         self._validate_parameters(epochs,
                                   log_interval,
-                                  early_stopping_rounds)
+                                  early_stopping_rounds,
+                                  stage_cache)
         self.n_outputs = self._decide_n_outputs(train_loader,
                                                 self.is_classification)
 
@@ -221,6 +441,17 @@ class _BaseGradientBoosting(BaseModule):
         criterion = nn.MSELoss(reduction="sum")
         n_counter = 0  # a counter on early stopping
 
+        self.stage_output_norms_ = []
+
+        # The accumulated outputs of fitted base estimators on each training
+        # sample, which are looked up with the indices of samples. The cache
+        # is filled by loading each sample once without data echoing.
+        if stage_cache:
+            cache = None
+            cache_loader = dataloader.make_indexed_loader(
+                dataloader.without_echo(train_loader))
+            train_loader = dataloader.make_indexed_loader(train_loader)
+
         for est_idx, estimator in enumerate(self.estimators_):
 
             # Initialize a optimizer and scheduler for each base estimator to
@@ -235,13 +466,23 @@ class _BaseGradientBoosting(BaseModule):
 
             # Training loop
             estimator.train()
+            stage_norm = torch.zeros((), device=self.device)
             for epoch in range(epochs):
-                for batch_idx, (data, target) in enumerate(train_loader):
+                for batch_idx, elem in enumerate(train_loader):
 
+                    if stage_cache:
+                        index, (data, target) = elem
+                    else:
+                        data, target = elem
                     data, target = data.to(self.device), target.to(self.device)
 
                     # Compute the learning target of the current estimator
-                    residual = self._pseudo_residual(data, target, est_idx)
+                    if stage_cache and cache is not None:
+                        output = cache[index].to(self.device)
+                        residual = self._pseudo_residual(data, target,
+                                                         est_idx, output)
+                    else:
+                        residual = self._pseudo_residual(data, target, est_idx)
 
                     output = estimator(data)
                     loss = criterion(output, residual)
@@ -250,6 +491,12 @@ class _BaseGradientBoosting(BaseModule):
                     loss.backward()
                     learner_optimizer.step()
 
+                    # Record the largest output in the last epoch, used to
+                    # bound the contribution of this estimator in inference.
+                    if epoch == epochs - 1:
+                        stage_norm = torch.max(stage_norm,
+                                               output.detach().abs().max())
+
                     # Print training status
                     if batch_idx % log_interval == 0:
                         msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch:"
@@ -259,9 +506,17 @@ class _BaseGradientBoosting(BaseModule):
 
                 if self.use_scheduler_:
                     learner_scheduler.step()
+            self.stage_output_norms_.append(stage_norm.item())
+
+            # Update the cached outputs with the fitted estimator
+            if stage_cache and est_idx < self.n_estimators - 1:
+                cache = self._update_stage_cache(cache,
+                                                 estimator,
+                                                 cache_loader,
+                                                 stage_cache == "disk")
 
             # Validation
-            if test_loader:
+            if test_loader is not None:
                 flag = self._handle_early_stopping(test_loader, est_idx)
 
                 if flag:
@@ -278,12 +533,15 @@ class _BaseGradientBoosting(BaseModule):
                         offset = est_idx - n_counter
                         self.estimators_ = self.estimators_[:offset+1]
                         self.n_estimators = len(self.estimators_)
+                        self.stage_output_norms_ = \
+                            self.stage_output_norms_[:offset+1]
                         break
                 else:
                     # Reset the counter if the performance improves
                     n_counter = 0
 
         # Post-processing
+        self._valid_cache = None
         msg = "The optimal number of base estimators: {}"
         self.logger.info(msg.format(len(self.estimators_)))
         if save_model:
@@ -299,8 +557,17 @@ class GradientBoostingClassifier(_BaseGradientBoosting):
         super().__init__(**kwargs)
         self.is_classification = True
 
-    def _pseudo_residual(self, X, y, est_idx):
-        """Compute pseudo residuals in classification."""
+    def _pseudo_residual(self, X, y, est_idx, output=None):
+        """
+        Compute pseudo residuals in classification. If `output` is given, it
+        is used as the accumulated output of the first `est_idx` fitted base
+        estimators on `X`.
+        """
+        if output is not None:
+            return op.pesudo_residual_classification(y,
+                                                     output,
+                                                     self.n_outputs)
+
         output = torch.zeros(X.size(0), self.n_outputs).to(self.device)
 
         # Before fitting the first estimator, we simply assume that GBM
@@ -323,9 +590,9 @@ class GradientBoostingClassifier(_BaseGradientBoosting):
         total = 0
         flag = False
         with torch.no_grad():
-            for _, (data, target) in enumerate(test_loader):
-                data, target = data.to(self.device), target.to(self.device)
-                output = F.softmax(self._staged_forward(data, est_idx), dim=1)
+            for output, target in self._staged_validation(test_loader,
+                                                          est_idx):
+                output = F.softmax(output, dim=1)
                 _, predicted = torch.max(output.data, 1)
                 correct += (predicted == target).sum().item()
                 total += target.size(0)
@@ -369,7 +636,9 @@ class GradientBoostingClassifier(_BaseGradientBoosting):
             test_loader=None,
             early_stopping_rounds=2,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            stage_cache=None,
+            batch_size=256):
         super().fit(
             train_loader=train_loader,
             epochs=epochs,
@@ -377,37 +646,99 @@ class GradientBoostingClassifier(_BaseGradientBoosting):
             test_loader=test_loader,
             early_stopping_rounds=early_stopping_rounds,
             save_model=save_model,
-            save_dir=save_dir)
+            save_dir=save_dir,
+            stage_cache=stage_cache,
+            batch_size=batch_size)
 
     @torchensemble_model_doc(
         """Implementation on the data forwarding in GradientBoostingClassifier.""",  # noqa: E501
         "classifier_forward")
     def forward(self, x):
-        output = [estimator(x) for estimator in self.estimators_]
+        output = self._forward_estimators(x)
         output = op.sum_with_multiplicative(output, self.shrinkage_rate)
         proba = F.softmax(output, dim=1)
 
         return proba
 
+    @_gradient_boosting_model_doc(
+        """Return the staged class distributions of GradientBoostingClassifier.""",  # noqa: E501
+        "classifier_staged_predict_proba")
+    def staged_predict_proba(self, X, batch_size=256):
+        for output in self._staged_outputs(X, batch_size):
+            yield F.softmax(output, dim=1)
+
+    @_gradient_boosting_model_doc(
+        """Return the staged class labels of GradientBoostingClassifier.""",
+        "classifier_staged_predict")
+    def staged_predict(self, X, batch_size=256):
+        for output in self._staged_outputs(X, batch_size):
+            yield torch.argmax(output, dim=1)
+
+    @_gradient_boosting_model_doc(
+        """Implementation on the data forwarding with early exit in GradientBoostingClassifier.""",  # noqa: E501
+        "classifier_early_exit")
+    def forward_early_exit(self, X, slack=1., max_stages=None):
+        if not hasattr(self, "stage_output_norms_"):
+            msg = ("Please fit the ensemble before the data forwarding with"
+                   " early exit.")
+            self.logger.error(msg)
+            raise RuntimeError(msg)
+
+        n_stages = len(self.estimators_)
+        if max_stages is not None:
+            n_stages = min(max_stages, n_stages)
+
+        # The largest change on the margin from the remaining estimators
+        # after each stage.
+        norms = torch.tensor(self.stage_output_norms_[:n_stages],
+                             device=self.device)
+        remaining = 2 * slack * self.shrinkage_rate * (
+            norms.sum() - torch.cumsum(norms, dim=0)
+        )
+
+        self.eval()
+        output = torch.zeros(X.size(0), self.n_outputs, device=self.device)
+        active = torch.arange(X.size(0), device=self.device)
+        with torch.no_grad():
+            for est_idx in range(n_stages):
+                estimator = self.estimators_[est_idx]
+                output[active] += self.shrinkage_rate * estimator(X[active])
+
+                top2, _ = torch.topk(output[active], 2, dim=1)
+                margin = top2[:, 0] - top2[:, 1]
+                active = active[margin <= remaining[est_idx]]
+                if active.size(0) == 0:
+                    break
+
+        return F.softmax(output, dim=1)
+
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of GradientBoostingClassifier.""",  # noqa: E501
         "classifier_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         correct = 0
         total = 0
 
-        for _, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            _, predicted = torch.max(output.data, 1)
-            correct += (predicted == target).sum().item()
-            total += target.size(0)
+        with torch.no_grad():
+            for _, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                _, predicted = torch.max(output.data, 1)
+                correct += (predicted == target).sum()
+                total += target.size(0)
 
-        acc = 100 * correct / total
+        acc = 100 * float(correct) / total
 
         return acc
 
+    @torchensemble_model_doc(
+        """Return the predicted class distributions of GradientBoostingClassifier.""",  # noqa: E501
+        "classifier_predict_proba")
+    def predict_proba(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
+
 
 @_gradient_boosting_model_doc(
     """Implementation on the GradientBoostingRegressor.""", "model"
@@ -418,8 +749,15 @@ class GradientBoostingRegressor(_BaseGradientBoosting):
         super().__init__(**kwargs)
         self.is_classification = False
 
-    def _pseudo_residual(self, X, y, est_idx):
-        """Compute pseudo residuals in regression."""
+    def _pseudo_residual(self, X, y, est_idx, output=None):
+        """
+        Compute pseudo residuals in regression. If `output` is given, it is
+        used as the accumulated output of the first `est_idx` fitted base
+        estimators on `X`.
+        """
+        if output is not None:
+            return op.pseudo_residual_regression(y, output)
+
         output = torch.zeros_like(y).to(self.device)
 
         if est_idx > 0:
@@ -435,14 +773,15 @@ class GradientBoostingRegressor(_BaseGradientBoosting):
         # Compute the validation MSE of base estimators fitted so far
         self.eval()
         mse = 0
+        n_batches = 0
         flag = False
         criterion = nn.MSELoss()
         with torch.no_grad():
-            for _, (data, target) in enumerate(test_loader):
-                data, target = data.to(self.device), target.to(self.device)
-                output = self._staged_forward(data, est_idx)
+            for output, target in self._staged_validation(test_loader,
+                                                          est_idx):
                 mse += criterion(output, target)
-        mse /= len(test_loader)
+                n_batches += 1
+        mse /= n_batches
 
         if est_idx == 0:
             self.best_mse = mse
@@ -483,7 +822,9 @@ class GradientBoostingRegressor(_BaseGradientBoosting):
             test_loader=None,
             early_stopping_rounds=2,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            stage_cache=None,
+            batch_size=256):
         super().fit(
             train_loader=train_loader,
             epochs=epochs,
@@ -491,28 +832,47 @@ class GradientBoostingRegressor(_BaseGradientBoosting):
             test_loader=test_loader,
             early_stopping_rounds=early_stopping_rounds,
             save_model=save_model,
-            save_dir=save_dir)
+            save_dir=save_dir,
+            stage_cache=stage_cache,
+            batch_size=batch_size)
 
     @torchensemble_model_doc(
         """Implementation on the data forwarding in GradientBoostingRegressor.""",  # noqa: E501
         "regressor_forward")
     def forward(self, x):
-        outputs = [estimator(x) for estimator in self.estimators_]
+        outputs = self._forward_estimators(x)
         pred = op.sum_with_multiplicative(outputs, self.shrinkage_rate)
 
         return pred
 
+    @_gradient_boosting_model_doc(
+        """Return the staged predictions of GradientBoostingRegressor.""",
+        "regressor_staged_predict")
+    def staged_predict(self, X, batch_size=256):
+        for output in self._staged_outputs(X, batch_size):
+            yield output
+
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of GradientBoostingRegressor.""",  # noqa: E501
         "regressor_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         mse = 0
+        n_batches = 0
         criterion = nn.MSELoss()
 
-        for batch_idx, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            mse += criterion(output, target)
+        with torch.no_grad():
+            for batch_idx, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                mse += criterion(output, target)
+                n_batches += 1
 
-        return mse / len(test_loader)
+        return mse / n_batches
+
+    @torchensemble_model_doc(
+        """Return the predicted values of GradientBoostingRegressor.""",  # noqa: E501
+        "regressor_predict_output")
+    def predict_output(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
@@ -20,6 +20,7 @@ import torch.nn.functional as F
 from torch.optim.lr_scheduler import LambdaLR
 
 from ._base import BaseModule, torchensemble_model_doc
+from . import _constants as const
 from .utils import io
 from .utils import set_module
 from .utils import operator as op
@@ -33,8 +34,9 @@ __all__ = ["_BaseSnapshotEnsemble",
 __fit_doc = """
     Parameters
     ----------
-    train_loader : torch.utils.data.DataLoader
-        A :mod:`DataLoader` container that contains the training data.
+    train_loader : torch.utils.data.DataLoader or tuple
+        A :mod:`DataLoader` container that contains the training data, or a
+        tuple ``(X, y)`` of tensors or NumPy arrays.
     lr_clip : list or tuple, default=None
         Specify the accepted range of learning rate. When the learning rate
         determined by the scheduler is out of this range, it will be clipped.
@@ -45,9 +47,9 @@ __fit_doc = """
         The number of training epochs.
     log_interval : int, default=100
         The number of batches to wait before logging the training status.
-    test_loader : torch.utils.data.DataLoader, default=None
+    test_loader : torch.utils.data.DataLoader or tuple, default=None
         A :mod:`torch.utils.data.DataLoader` container that contains the
-        evaluating data.
+        evaluating data, or a tuple ``(X, y)`` of tensors or NumPy arrays.
 
         - If ``None``, no validation is conducted after each snapshot model
           being generated.
@@ -66,7 +68,7 @@ __fit_doc = """
         - If ``None``, the model will be saved in the current directory.
         - If not ``None``, the model will be saved in the specified
           directory: ``save_dir``.
-"""
+""" + const.__batch_size_doc
 
 
 def _snapshot_ensemble_model_doc(header, item="fit"):
@@ -110,6 +112,19 @@ class _BaseSnapshotEnsemble(BaseModule):
         self.logger = logging.getLogger()
 
         self.estimators_ = nn.ModuleList()
+        self.stacked_estimators_ = None
+
+    def _n_batches(self, train_loader):
+        """Return the number of batches in each epoch of `train_loader`."""
+        try:
+            return len(train_loader)
+        except TypeError:
+            msg = ("The number of batches in each epoch is required to set"
+                   " the learning rate schedule of snapshot ensemble. Please"
+                   " wrap `train_loader` with `StreamLoader` in"
+                   " `torchensemble.utils.dataloader` to declare it.")
+            self.logger.error(msg)
+            raise ValueError(msg)
 
     def _validate_parameters(self, lr_clip, epochs, log_interval):
         """Validate hyper-parameters on training the ensemble."""
@@ -156,7 +171,7 @@ class _BaseSnapshotEnsemble(BaseModule):
         Implementation on the internal data forwarding in snapshot ensemble.
         """
         # Average
-        results = [estimator(x) for estimator in self.estimators_]
+        results = self._forward_estimators(x)
         output = op.average(results)
 
         return output
@@ -210,6 +225,24 @@ class SnapshotEnsembleClassifier(_BaseSnapshotEnsemble):
 
         return F.softmax(proba, dim=1)
 
+    @torchensemble_model_doc(
+        """Implementation on the data forwarding with the confidence cascade in SnapshotEnsembleClassifier.""",  # noqa: E501
+        "classifier_forward_cascade")
+    def forward_cascade(self, X, threshold=None):
+        return self._forward_cascade(X, threshold, True)
+
+    @torchensemble_model_doc(
+        """Calibrate the confidence cascade in SnapshotEnsembleClassifier.""",
+        "classifier_calibrate_cascade")
+    def calibrate_cascade(self,
+                          test_loader,
+                          tolerance=0.5,
+                          criterion="max_proba"):
+        return self._calibrate_cascade(test_loader,
+                                       tolerance,
+                                       criterion,
+                                       True)
+
     @torchensemble_model_doc(
         """Set the attributes on optimizer for SnapshotEnsembleClassifier.""",
         "set_optimizer")
@@ -228,7 +261,12 @@ class SnapshotEnsembleClassifier(_BaseSnapshotEnsemble):
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            batch_size=256):
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
+
+        self.unstack_estimators()
         self._validate_parameters(lr_clip, epochs, log_interval)
         self.n_outputs = self._decide_n_outputs(train_loader,
                                                 self.is_classification)
@@ -241,13 +279,14 @@ class SnapshotEnsembleClassifier(_BaseSnapshotEnsemble):
                                              self.optimizer_name,
                                              **self.optimizer_args)
 
-        scheduler = self._set_scheduler(optimizer, epochs * len(train_loader))
+        n_steps = epochs * self._n_batches(train_loader)
+        scheduler = self._set_scheduler(optimizer, n_steps)
 
         # Utils
         criterion = nn.CrossEntropyLoss()
         best_acc = 0.
         counter = 0  # a counter on generating snapshots
-        n_iters_per_estimator = epochs * len(train_loader) // self.n_estimators
+        n_iters_per_estimator = n_steps // self.n_estimators
 
         # Training loop
         estimator_.train()
@@ -300,7 +339,8 @@ class SnapshotEnsembleClassifier(_BaseSnapshotEnsemble):
                 self.logger.info(msg.format(len(self.estimators_) - 1))
 
             # Validation after each snapshot model being generated
-            if test_loader and counter % n_iters_per_estimator == 0:
+            if (test_loader is not None
+                    and counter % n_iters_per_estimator == 0):
                 self.eval()
                 with torch.no_grad():
                     correct = 0
@@ -329,28 +369,36 @@ class SnapshotEnsembleClassifier(_BaseSnapshotEnsemble):
                         )
                     )
 
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of SnapshotEnsembleClassifier.""",  # noqa: E501
         "classifier_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         correct = 0
         total = 0
 
-        for _, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            _, predicted = torch.max(output.data, 1)
-            correct += (predicted == target).sum().item()
-            total += target.size(0)
+        with torch.no_grad():
+            for _, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                _, predicted = torch.max(output.data, 1)
+                correct += (predicted == target).sum()
+                total += target.size(0)
 
-        acc = 100 * correct / total
+        acc = 100 * float(correct) / total
 
         return acc
 
+    @torchensemble_model_doc(
+        """Return the predicted class distributions of SnapshotEnsembleClassifier.""",  # noqa: E501
+        "classifier_predict_proba")
+    def predict_proba(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
+
 
 @torchensemble_model_doc(
     """Implementation on the SnapshotEnsembleRegressor.""", "model")
@@ -385,7 +433,12 @@ class SnapshotEnsembleRegressor(_BaseSnapshotEnsemble):
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            batch_size=256):
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
+
+        self.unstack_estimators()
         self._validate_parameters(lr_clip, epochs, log_interval)
         self.n_outputs = self._decide_n_outputs(train_loader,
                                                 self.is_classification)
@@ -398,13 +451,14 @@ class SnapshotEnsembleRegressor(_BaseSnapshotEnsemble):
                                              self.optimizer_name,
                                              **self.optimizer_args)
 
-        scheduler = self._set_scheduler(optimizer, epochs * len(train_loader))
+        n_steps = epochs * self._n_batches(train_loader)
+        scheduler = self._set_scheduler(optimizer, n_steps)
 
         # Utils
         criterion = nn.MSELoss()
         best_mse = float("inf")
         counter = 0  # a counter on generating snapshots
-        n_iters_per_estimator = epochs * len(train_loader) // self.n_estimators
+        n_iters_per_estimator = n_steps // self.n_estimators
 
         # Training loop
         estimator_.train()
@@ -449,16 +503,19 @@ class SnapshotEnsembleRegressor(_BaseSnapshotEnsemble):
                 self.logger.info(msg.format(len(self.estimators_) - 1))
 
             # Validation after each snapshot model being generated
-            if test_loader and counter % n_iters_per_estimator == 0:
+            if (test_loader is not None
+                    and counter % n_iters_per_estimator == 0):
                 self.eval()
                 with torch.no_grad():
                     mse = 0
+                    n_batches = 0
                     for _, (data, target) in enumerate(test_loader):
                         data = data.to(self.device)
                         target = target.to(self.device)
                         output = self.forward(data)
                         mse += criterion(output, target)
-                    mse /= len(test_loader)
+                        n_batches += 1
+                    mse /= n_batches
 
                     if mse < best_mse:
                         best_mse = mse
@@ -475,20 +532,30 @@ class SnapshotEnsembleRegressor(_BaseSnapshotEnsemble):
                         )
                     )
 
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of SnapshotEnsembleRegressor.""",  # noqa: E501
         "regressor_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         mse = 0
+        n_batches = 0
         criterion = nn.MSELoss()
 
-        for batch_idx, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            mse += criterion(output, target)
+        with torch.no_grad():
+            for batch_idx, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                mse += criterion(output, target)
+                n_batches += 1
+
+        return mse / n_batches
 
-        return mse / len(test_loader)
+    @torchensemble_model_doc(
+        """Return the predicted values of SnapshotEnsembleRegressor.""",  # noqa: E501
+        "regressor_predict_output")
+    def predict_output(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
@@ -2,10 +2,15 @@ import torch
 import pytest
 import numpy as np
 import torch.nn as nn
-from torch.utils.data import TensorDataset, DataLoader
+from torch.utils.data import TensorDataset, DataLoader, IterableDataset
 
 import torchensemble
 from torchensemble.utils.logging import set_logger
+from torchensemble.utils.dataloader import PrefetchLoader
+from torchensemble.utils.dataloader import TensorLoader
+from torchensemble.utils.dataloader import MemmapLoader
+from torchensemble.utils.dataloader import StreamLoader
+from torchensemble.utils.dataloader import EchoLoader
 
 
 all_clf = [torchensemble.FusionClassifier,
@@ -149,6 +154,226 @@ def test_reg(reg):
     model.predict(test_loader)
 
 
+@pytest.mark.parametrize("clf", all_clf)
+def test_prefetch_loader(clf):
+    """
+    This unit test checks that all classifiers accept prefetched data loaders.
+    """
+    model = clf(estimator=MLP_clf, n_estimators=2, cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train = TensorDataset(X_train, y_train_clf)
+    train_loader = PrefetchLoader(DataLoader(train, batch_size=2), "cpu")
+    test = TensorDataset(X_test, y_test_clf)
+    test_loader = PrefetchLoader(DataLoader(test, batch_size=2), "cpu")
+
+    model.fit(train_loader,
+              epochs=2,
+              test_loader=test_loader,
+              save_model=False)
+    model.predict(test_loader)
+
+
+@pytest.mark.parametrize("model", all_clf + all_reg)
+def test_echo_loader(model):
+    """
+    This unit test checks that all ensembles are fitted with data echoing.
+    """
+    if model in all_clf:
+        model = model(estimator=MLP_clf, n_estimators=2, cuda=False)
+        train = TensorDataset(X_train, y_train_clf)
+    else:
+        model = model(estimator=MLP_reg, n_estimators=2, cuda=False)
+        train = TensorDataset(X_train, y_train_reg)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train_loader = EchoLoader(DataLoader(train, batch_size=2, shuffle=True),
+                              echo_factor=2,
+                              transform=lambda data: data + 0.01)
+
+    model.fit(train_loader, epochs=2, save_model=False)
+
+
+@pytest.mark.parametrize("clf", all_clf)
+def test_tensor_loader(clf):
+    """
+    This unit test checks that all classifiers accept data loaders on tensors.
+    """
+    model = clf(estimator=MLP_clf, n_estimators=2, cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train_loader = TensorLoader(X_train, y_train_clf, batch_size=2,
+                                shuffle=True)
+    test_loader = TensorLoader(X_test, y_test_clf, batch_size=2)
+
+    model.fit(train_loader,
+              epochs=2,
+              test_loader=test_loader,
+              save_model=False)
+    model.predict(test_loader)
+
+
+class MLP_sparse(nn.Module):
+    def __init__(self, n_outputs):
+        super(MLP_sparse, self).__init__()
+        self.linear1 = nn.Linear(2, 2)
+        self.linear2 = nn.Linear(2, n_outputs)
+
+    def forward(self, X):
+        output = self.linear1(X)  # sparse-dense product on sparse inputs
+        output = self.linear2(output)
+        return output
+
+
+@pytest.mark.parametrize(
+    "model",
+    [model for model in all_clf + all_reg
+     if not model.__name__.startswith("AdversarialTraining")])
+def test_sparse_inputs(model):
+    """
+    This unit test checks that ensembles accept sparse CSR inputs, except
+    adversarial training, where adversarial samples are dense.
+    """
+    n_outputs = 2 if model in all_clf else 1
+    model = model(estimator=MLP_sparse,
+                  n_estimators=2,
+                  estimator_args={"n_outputs": n_outputs},
+                  cuda=False)
+    if n_outputs == 2:
+        y_train, y_test = y_train_clf, y_test_clf
+    else:
+        y_train, y_test = y_train_reg, y_test_reg
+    model.set_optimizer("Adam", lr=1e-3)
+
+    X_sparse = X_train.to_sparse_csr()
+    model.fit((X_sparse, y_train),
+              epochs=2,
+              test_loader=(X_test.to_sparse_csr(), y_test),
+              save_model=False,
+              batch_size=2)
+    model.predict((X_test.to_sparse_csr(), y_test))
+
+    with torch.no_grad():
+        assert torch.allclose(model.forward(X_sparse),
+                              model.forward(X_train),
+                              atol=1e-6)
+
+    # SciPy sparse matrices in float64, e.g., from `load_svmlight_file`
+    scipy_sparse = pytest.importorskip("scipy.sparse")
+    X_scipy = scipy_sparse.csr_matrix(X_train.numpy().astype(np.float64))
+    model.fit((X_scipy, y_train), epochs=1, save_model=False, batch_size=2)
+    model.predict((X_scipy, y_train))
+
+
+class _Stream(IterableDataset):
+    """An infinite stream of training samples."""
+
+    def __init__(self, X, y):
+        self.X, self.y = X, y
+
+    def __iter__(self):
+        while True:
+            yield from zip(self.X, self.y)
+
+
+class _FiniteStream(IterableDataset):
+    """A stream of testing samples with unknown length."""
+
+    def __init__(self, X, y):
+        self.X, self.y = X, y
+
+    def __iter__(self):
+        return zip(self.X, self.y)
+
+
+@pytest.mark.parametrize("model", all_clf + all_reg)
+def test_stream_loader(model):
+    """
+    This unit test checks that all ensembles are fitted on streams with a
+    declared number of batches in each epoch.
+    """
+    if model in all_clf:
+        model = model(estimator=MLP_clf, n_estimators=2, cuda=False)
+        train, test = (_Stream(X_train, y_train_clf),
+                       _FiniteStream(X_test, y_test_clf))
+        train.n_outputs = 2
+    else:
+        model = model(estimator=MLP_reg, n_estimators=2, cuda=False)
+        train, test = (_Stream(X_train, y_train_reg),
+                       _FiniteStream(X_test, y_test_reg))
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train_loader = StreamLoader(DataLoader(train, batch_size=2), 3)
+    test_loader = DataLoader(test, batch_size=3)
+
+    model.fit(train_loader,
+              epochs=2,
+              test_loader=test_loader,
+              save_model=False)
+    model.predict(test_loader)
+
+
+@pytest.mark.parametrize("clf", all_clf)
+def test_memmap_loader(clf, tmp_path):
+    """
+    This unit test checks that all classifiers accept memory-mapped files.
+    """
+    model = clf(estimator=MLP_clf, n_estimators=2, cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    # Features are saved in float64, as NumPy arrays by default
+    paths = []
+    for name, array in [("X_train", X_train.double()),
+                        ("y_train", y_train_clf),
+                        ("X_test", X_test.double()),
+                        ("y_test", y_test_clf)]:
+        paths.append(str(tmp_path / "{}.npy".format(name)))
+        np.save(paths[-1], array.numpy())
+    train_loader = MemmapLoader(paths[0], paths[1], batch_size=2,
+                                shuffle=True)
+    test_loader = MemmapLoader(paths[2], paths[3], batch_size=2)
+
+    model.fit(train_loader,
+              epochs=2,
+              test_loader=test_loader,
+              save_model=False)
+    model.predict(test_loader)
+
+
+@pytest.mark.parametrize("model", all_clf + all_reg)
+def test_tensor_inputs(model):
+    """
+    This unit test checks that all ensembles accept tuples of NumPy arrays.
+    """
+    if model in all_clf:
+        model = model(estimator=MLP_clf, n_estimators=2, cuda=False)
+        y_train, y_test = y_train_clf, y_test_clf
+    else:
+        model = model(estimator=MLP_reg, n_estimators=2, cuda=False)
+        y_train, y_test = y_train_reg, y_test_reg
+    model.set_optimizer("Adam", lr=1e-3)
+
+    model.fit((X_train.numpy(), y_train.numpy()),
+              epochs=2,
+              test_loader=(X_test, y_test),
+              save_model=False,
+              batch_size=2)
+    model.predict((X_test.numpy(), y_test.numpy()), batch_size=3)
+
+    # Features and targets in float64 as created by NumPy
+    X = np.random.rand(4, 2)
+    y = y_train.numpy()
+    if not np.issubdtype(y.dtype, np.integer):
+        y = np.random.rand(*y.shape)
+    model.fit((X, y), epochs=1, save_model=False, batch_size=2)
+    model.predict((X, y))
+    assert model._predict_output(X).dtype == torch.float32
+
+    with pytest.raises(ValueError) as excinfo:
+        model.predict((X_test, y_test[:2]))
+    assert "number of samples in X and y" in str(excinfo.value)
+
+
 @pytest.mark.parametrize("method", all_clf + all_reg)
 def test_estimator_check(method):
     """
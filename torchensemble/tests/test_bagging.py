@@ -0,0 +1,402 @@
+import torch
+import pytest
+import numpy as np
+import torch.nn as nn
+from torch.utils.data import (Dataset, IterableDataset, DataLoader,
+                              TensorDataset)
+
+import torchensemble
+from torchensemble.bagging import _bootstrap_counts
+from torchensemble.utils.dataloader import EchoLoader
+from torchensemble.utils.logging import set_logger
+
+
+set_logger("pytest_bagging")
+
+
+# Base estimator
+class MLP(nn.Module):
+    def __init__(self):
+        super(MLP, self).__init__()
+        self.linear1 = nn.Linear(2, 2)
+        self.linear2 = nn.Linear(2, 2)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = self.linear1(X)
+        output = self.linear2(output)
+        return output
+
+
+class MLP_reg(nn.Module):
+    def __init__(self):
+        super(MLP_reg, self).__init__()
+        self.linear1 = nn.Linear(2, 2)
+        self.linear2 = nn.Linear(2, 1)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = self.linear1(X)
+        output = self.linear2(output)
+        return output
+
+
+X_train = torch.Tensor(np.array(([0.1, 0.1],
+                                 [0.2, 0.2],
+                                 [0.3, 0.3],
+                                 [0.4, 0.4],
+                                 [0.5, 0.5],
+                                 [0.6, 0.6],
+                                 [0.7, 0.7],
+                                 [0.8, 0.8])))
+
+y_train = torch.LongTensor(np.array(([0, 0, 1, 1, 0, 1, 0, 1])))
+
+
+class CountingDataset(Dataset):
+    """Record the indices of samples loaded."""
+
+    def __init__(self, X, y):
+        self.X = X
+        self.y = y
+        self.loaded = []
+
+    def __len__(self):
+        return len(self.X)
+
+    def __getitem__(self, index):
+        self.loaded.append(index)
+        return self.X[index], self.y[index]
+
+
+class Stream(IterableDataset):
+
+    def __iter__(self):
+        return iter(zip(X_train, y_train))
+
+
+def _fit(bootstrap_weight, **kwargs):
+    model = torchensemble.BaggingClassifier(estimator=MLP,
+                                            n_estimators=3,
+                                            cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train = CountingDataset(X_train, y_train)
+    train_loader = DataLoader(train, batch_size=3, shuffle=True)
+    model.fit(train_loader,
+              epochs=2,
+              save_model=False,
+              bootstrap_weight=bootstrap_weight,
+              **kwargs)
+
+    return model, train
+
+
+def test_bootstrap_counts():
+    model = torchensemble.BaggingClassifier(estimator=MLP,
+                                            n_estimators=4,
+                                            cuda=False)
+    train_loader = DataLoader(CountingDataset(X_train, y_train),
+                              batch_size=3)
+
+    indices = model._bootstrap_indices(train_loader)
+
+    assert len(indices) == 4
+    for member_indices in indices:
+        assert member_indices.dtype == torch.int64
+        assert member_indices.size(0) == len(X_train)
+        assert torch.all(member_indices[1:] >= member_indices[:-1])
+
+    counts = _bootstrap_counts(indices, len(X_train))
+
+    assert counts.shape == (4, len(X_train))
+    assert torch.all(counts.sum(dim=1) == len(X_train))
+
+
+def test_bootstrap_sampler():
+    """
+    This unit test checks that each base estimator only loads its bootstrap
+    sample on the training dataset in each epoch.
+    """
+    _, train = _fit(False)
+
+    # One pass for deciding the number of classes
+    loaded = train.loaded[len(X_train):]
+    assert len(loaded) == 2 * 3 * len(X_train)
+
+    # The same bootstrap samples are loaded in both epochs
+    n_loaded = 3 * len(X_train)
+    assert sorted(loaded[:n_loaded]) == sorted(loaded[n_loaded:])
+
+
+@pytest.mark.parametrize("kwargs", [{},
+                                    {"shared_batches": True},
+                                    {"vectorize": True}])
+def test_bootstrap_weight(kwargs):
+    """
+    This unit test checks that duplicates in bootstrap samples are loaded
+    only once with the bootstrap weight.
+    """
+    model, train = _fit(True, **kwargs)
+
+    loaded = train.loaded[len(X_train):]
+    if kwargs:
+        # Batches are shared by all base estimators
+        assert len(loaded) == 2 * len(X_train)
+    else:
+        assert len(loaded) < 2 * 3 * len(X_train)
+        assert len(set(loaded)) <= len(X_train)
+    assert len(model.estimators_) == 3
+
+
+def test_batch_bootstrap():
+    """
+    This unit test checks that the sampling with replacement is conducted on
+    each batch of data on iterable-style datasets.
+    """
+    model = torchensemble.BaggingClassifier(estimator=MLP,
+                                            n_estimators=2,
+                                            cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+    model.fit(DataLoader(Stream(), batch_size=3), epochs=1, save_model=False)
+
+    assert len(model.estimators_) == 2
+
+
+@pytest.mark.parametrize("method", [torchensemble.BaggingClassifier,
+                                    torchensemble.BaggingRegressor])
+@pytest.mark.parametrize("use_test_loader", [False, True])
+def test_oob_score(method, use_test_loader):
+    """
+    This unit test checks the out-of-bag predictions and score.
+    """
+    if method is torchensemble.BaggingClassifier:
+        estimator, y = MLP, y_train
+    else:
+        estimator, y = MLP_reg, X_train[:, :1]
+
+    model = method(estimator=estimator,
+                   n_estimators=4,
+                   cuda=False,
+                   oob_score=True)
+    model.set_optimizer("Adam", lr=1e-3)
+    train_loader = DataLoader(CountingDataset(X_train, y), batch_size=3)
+    test_loader = train_loader if use_test_loader else None
+    model.fit(train_loader, epochs=2, test_loader=test_loader)
+
+    n_outputs = 2 if method is torchensemble.BaggingClassifier else 1
+    assert model.oob_prediction_.shape == (len(X_train), n_outputs)
+    is_valid = ~torch.isnan(model.oob_prediction_[:, 0])
+    assert is_valid.any()
+
+    if method is torchensemble.BaggingClassifier:
+        pred = model.oob_prediction_[is_valid].argmax(dim=1)
+        expected = 100 * (pred == y[is_valid]).float().mean().item()
+        assert 0 <= model.oob_score_ <= 100
+    else:
+        pred = model.oob_prediction_[is_valid]
+        expected = ((pred - y[is_valid]) ** 2).mean().item()
+    assert model.oob_score_ == pytest.approx(expected, abs=1e-5)
+
+
+class Constant(nn.Module):
+    def __init__(self):
+        super(Constant, self).__init__()
+        self.bias = nn.Parameter(torch.ones(1))
+
+    def forward(self, X):
+        return self.bias.expand(X.size(0), 1)
+
+
+def test_oob_score_echo():
+    """
+    This unit test checks that batches repeated with data echoing are not
+    added to the out-of-bag predictions multiple times.
+    """
+    torch.manual_seed(0)
+    model = torchensemble.BaggingRegressor(estimator=Constant,
+                                           n_estimators=4,
+                                           cuda=False,
+                                           oob_score=True)
+    model.set_optimizer("SGD", lr=0.)
+    train = TensorDataset(X_train, X_train[:, :1])
+    train_loader = EchoLoader(DataLoader(train, batch_size=3),
+                              echo_factor=2,
+                              transform=lambda data: data + 0.01)
+    model.fit(train_loader, epochs=1, save_model=False)
+
+    is_valid = ~torch.isnan(model.oob_prediction_[:, 0])
+    assert is_valid.any()
+    assert torch.allclose(model.oob_prediction_[is_valid],
+                          torch.ones(1))
+
+
+def test_oob_score_batch_bootstrap():
+    model = torchensemble.BaggingClassifier(estimator=MLP,
+                                            n_estimators=2,
+                                            cuda=False,
+                                            oob_score=True)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    with pytest.raises(ValueError) as excinfo:
+        model.fit(DataLoader(Stream(), batch_size=3), epochs=1)
+    assert "out-of-bag" in str(excinfo.value)
+
+
+def test_pasting_disjoint_shards():
+    """
+    This unit test checks that base estimators are trained on disjoint
+    shards without replacement.
+    """
+    model = torchensemble.BaggingClassifier(estimator=MLP,
+                                            n_estimators=4,
+                                            cuda=False,
+                                            bootstrap=False,
+                                            max_samples=0.25)
+    train_loader = DataLoader(CountingDataset(X_train, y_train),
+                              batch_size=3)
+
+    counts = _bootstrap_counts(model._bootstrap_indices(train_loader),
+                               len(X_train))
+
+    assert torch.all(counts.sum(dim=1) == 2)
+    assert torch.all(counts.sum(dim=0) == 1)
+
+
+@pytest.mark.parametrize("bootstrap", [False, True])
+def test_subagging(bootstrap):
+    """
+    This unit test checks that each base estimator only loads `max_samples`
+    training samples in each epoch.
+    """
+    model = torchensemble.BaggingClassifier(estimator=MLP,
+                                            n_estimators=3,
+                                            cuda=False,
+                                            bootstrap=bootstrap,
+                                            max_samples=3,
+                                            oob_score=True)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train = CountingDataset(X_train, y_train)
+    model.fit(DataLoader(train, batch_size=2), epochs=2, save_model=False)
+
+    # One pass for deciding the number of classes, and one pass for the
+    # out-of-bag evaluation after the last epoch
+    loaded = train.loaded[len(X_train):]
+    assert len(loaded) == 2 * 3 * 3 + len(X_train)
+
+    indices = model._bootstrap_indices(DataLoader(train, batch_size=2))
+    counts = _bootstrap_counts(indices, len(X_train))
+    assert torch.all(counts.sum(dim=1) == 3)
+    if not bootstrap:
+        assert counts.max() == 1
+        assert torch.all(counts.sum(dim=0) >= 1)
+
+
+@pytest.mark.parametrize("max_samples", [0, 1.5, 9, -1, True])
+def test_invalid_max_samples(max_samples):
+    model = torchensemble.BaggingClassifier(estimator=MLP,
+                                            n_estimators=2,
+                                            cuda=False,
+                                            max_samples=max_samples)
+    model.set_optimizer("Adam", lr=1e-3)
+    train_loader = DataLoader(CountingDataset(X_train, y_train),
+                              batch_size=2)
+
+    with pytest.raises(ValueError) as excinfo:
+        model.fit(train_loader, epochs=1, save_model=False)
+    assert "number of samples drawn" in str(excinfo.value)
+
+
+class MLP_subspace(nn.Module):
+    def __init__(self, n_features):
+        super(MLP_subspace, self).__init__()
+        self.linear1 = nn.Linear(n_features, 2)
+        self.linear2 = nn.Linear(2, 2)
+
+    def forward(self, X):
+        output = self.linear1(X)
+        output = self.linear2(output)
+        return output
+
+
+@pytest.mark.parametrize("vectorize", [False, True])
+def test_random_subspace(vectorize):
+    """
+    This unit test checks that each base estimator only takes its own subset
+    of features with the reduced input dimensionality.
+    """
+    X = torch.cat([X_train, X_train.flip(0)], dim=1)  # 4 features
+    model = torchensemble.BaggingClassifier(estimator=MLP_subspace,
+                                            n_estimators=3,
+                                            estimator_args={"n_features": 2},
+                                            cuda=False,
+                                            max_features=0.5)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train_loader = DataLoader(TensorDataset(X, y_train), batch_size=2)
+    model.fit(train_loader, epochs=2, vectorize=vectorize, save_model=False)
+
+    for estimator in model.estimators_:
+        indices = estimator.feature_indices
+        assert indices.size(0) == 2
+        assert torch.equal(indices, torch.sort(torch.unique(indices))[0])
+        assert estimator.estimator.linear1.in_features == 2
+
+    # The output equals evaluating the inner estimator on the subset
+    estimator = model.estimators_[0]
+    with torch.no_grad():
+        expected = estimator.estimator(X[:, estimator.feature_indices])
+        assert torch.allclose(estimator(X), expected)
+
+    with torch.no_grad():
+        assert model.forward(X).shape == (8, 2)
+
+
+def test_random_subspace_single_feature():
+    """
+    This unit test checks that the int 1 is a single feature, instead of
+    all features as the float 1.0.
+    """
+    X = torch.cat([X_train, X_train.flip(0)], dim=1)  # 4 features
+    model = torchensemble.BaggingClassifier(estimator=MLP_subspace,
+                                            n_estimators=2,
+                                            estimator_args={"n_features": 1},
+                                            cuda=False,
+                                            max_features=1)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train_loader = DataLoader(TensorDataset(X, y_train), batch_size=2)
+    model.fit(train_loader, epochs=1, save_model=False)
+
+    for estimator in model.estimators_:
+        assert estimator.feature_indices.size(0) == 1
+        assert estimator.estimator.linear1.in_features == 1
+
+
+def test_random_subspace_sparse():
+    model = torchensemble.BaggingClassifier(estimator=MLP_subspace,
+                                            n_estimators=2,
+                                            estimator_args={"n_features": 1},
+                                            cuda=False,
+                                            max_features=0.5)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    with pytest.raises(ValueError) as excinfo:
+        model.fit((X_train.to_sparse(), y_train),
+                  epochs=1,
+                  save_model=False)
+    assert "sparse input data" in str(excinfo.value)
+
+
+def test_invalid_max_features():
+    model = torchensemble.BaggingClassifier(estimator=MLP,
+                                            n_estimators=2,
+                                            cuda=False,
+                                            max_features=3)
+    model.set_optimizer("Adam", lr=1e-3)
+    train_loader = DataLoader(TensorDataset(X_train, y_train), batch_size=2)
+
+    with pytest.raises(ValueError) as excinfo:
+        model.fit(train_loader, epochs=1, save_model=False)
+    assert "number of features" in str(excinfo.value)
@@ -0,0 +1,153 @@
+import torch
+import pytest
+import numpy as np
+import torch.nn as nn
+from torch.utils.data import TensorDataset, DataLoader
+
+import torchensemble
+from torchensemble.utils import io
+from torchensemble.utils import cascade
+from torchensemble.utils.logging import set_logger
+
+
+all_cascade = [torchensemble.VotingClassifier,
+               torchensemble.BaggingClassifier,
+               torchensemble.SnapshotEnsembleClassifier]
+
+
+set_logger("pytest_cascade")
+
+
+# Base estimator
+class MLP(nn.Module):
+    def __init__(self):
+        super(MLP, self).__init__()
+        self.linear1 = nn.Linear(2, 4)
+        self.linear2 = nn.Linear(4, 3)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = torch.relu(self.linear1(X))
+        output = self.linear2(output)
+        return output
+
+
+X_train = torch.Tensor(np.array(([0.1, 0.1],
+                                 [0.2, 0.2],
+                                 [0.3, 0.3],
+                                 [0.4, 0.4],
+                                 [0.5, 0.5],
+                                 [0.6, 0.6])))
+
+y_train = torch.LongTensor(np.array(([0, 0, 1, 1, 2, 2])))
+
+
+def test_confidence():
+    proba = torch.Tensor(np.array(([0.5, 0.3, 0.2], [0.1, 0.1, 0.8])))
+
+    assert torch.allclose(cascade.confidence(proba, "max_proba"),
+                          torch.Tensor([0.5, 0.8]))
+    assert torch.allclose(cascade.confidence(proba, "margin"),
+                          torch.Tensor([0.2, 0.7]))
+
+    with pytest.raises(ValueError) as excinfo:
+        cascade.confidence(proba, "entropy")
+    assert "confidence criterion should be one of" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("method", all_cascade)
+def test_forward_cascade(method):
+    model = method(estimator=MLP, n_estimators=3, cuda=False)
+    model.set_optimizer("Adam", lr=1e-2)
+
+    train = TensorDataset(X_train, y_train)
+    train_loader = DataLoader(train, batch_size=3)
+    model.fit(train_loader, epochs=3, save_model=False)
+
+    # Not calibrated
+    with pytest.raises(RuntimeError) as excinfo:
+        model.forward_cascade(X_train)
+    assert "call `calibrate_cascade` first" in str(excinfo.value)
+
+    # All base estimators are evaluated with the largest threshold
+    with torch.no_grad():
+        assert torch.allclose(model.forward_cascade(X_train, threshold=1.1),
+                              model(X_train),
+                              atol=1e-6)
+
+    # Only the first base estimator is evaluated with the smallest threshold
+    average_logits = isinstance(model,
+                                torchensemble.SnapshotEnsembleClassifier)
+    proba, n_used = cascade.cascade_forward(model.estimators_,
+                                            X_train,
+                                            threshold=0.,
+                                            average_logits=average_logits)
+    assert torch.all(n_used == 1)
+    with torch.no_grad():
+        expected = torch.softmax(model.estimators_[0](X_train), dim=1)
+    assert torch.allclose(proba, expected, atol=1e-6)
+
+    # Calibration
+    acc = model.calibrate_cascade(train_loader, tolerance=0.)
+    assert acc >= model.predict(train_loader) - 1e-6
+    assert sorted(model.cascade_order_) == [0, 1, 2]
+    assert model.forward_cascade(X_train).size() == (6, 3)
+
+
+class FixedOutput(nn.Module):
+    def __init__(self, output):
+        super(FixedOutput, self).__init__()
+        self.output = torch.Tensor(output)
+
+    def forward(self, X):
+        return self.output
+
+
+def test_calibrate_saturated():
+    # The most accurate base estimator is wrong on the last sample with a
+    # class probability saturated to 1, and the full ensemble is correct.
+    estimators = [FixedOutput([[100, 0], [100, 0], [100, 0], [0, 100]]),
+                  FixedOutput([[100, 0], [0, 1], [0, 1], [100, 0]]),
+                  FixedOutput([[0, 1], [100, 0], [0, 1], [100, 0]])]
+    X = torch.zeros(4, 2)
+    y = torch.LongTensor(np.array([0, 0, 0, 0]))
+    test_loader = DataLoader(TensorDataset(X, y), batch_size=4)
+
+    order, threshold, acc, n_used = cascade.calibrate(estimators,
+                                                      test_loader,
+                                                      torch.device("cpu"),
+                                                      tolerance=0.)
+    assert order[0] == 0
+    assert threshold == float("inf")
+    assert acc == 100.
+    assert n_used == 3.
+
+    with pytest.raises(ValueError) as excinfo:
+        cascade.calibrate(estimators,
+                          test_loader,
+                          torch.device("cpu"),
+                          tolerance=-1.)
+    assert "should be non-negative" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("method", all_cascade)
+def test_cascade_reload(method, tmp_path):
+    """
+    This unit test checks that the calibrated cascade is restored along with
+    the model from its checkpoint.
+    """
+    model = method(estimator=MLP, n_estimators=3, cuda=False)
+    model.set_optimizer("Adam", lr=1e-2)
+    train_loader = DataLoader(TensorDataset(X_train, y_train), batch_size=3)
+    model.fit(train_loader, epochs=3, save_model=False)
+    model.calibrate_cascade(train_loader, tolerance=0., criterion="margin")
+    io.save(model, str(tmp_path), model.logger)
+
+    restored = method(estimator=MLP, n_estimators=3, cuda=False)
+    io.load(restored, str(tmp_path))
+
+    assert restored.cascade_order_ == model.cascade_order_
+    assert restored.cascade_threshold_ == model.cascade_threshold_
+    assert restored.cascade_criterion_ == "margin"
+    assert torch.allclose(restored.forward_cascade(X_train),
+                          model.forward_cascade(X_train))
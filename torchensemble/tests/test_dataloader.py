@@ -0,0 +1,447 @@
+import torch
+import pickle
+import pytest
+import numpy as np
+from torch.utils.data import (TensorDataset, DataLoader, IterableDataset,
+                              ConcatDataset, Subset, WeightedRandomSampler)
+
+from torchensemble.utils import dataloader
+
+
+X = torch.arange(20, dtype=torch.float32).view(10, 2)
+y = torch.arange(10)
+
+
+class _Stream(IterableDataset):
+    def __iter__(self):
+        return iter(zip(X, y))
+
+
+def test_indexed_loader():
+    loader = DataLoader(TensorDataset(X, y), batch_size=3, shuffle=True)
+    indexed_loader = dataloader.make_indexed_loader(loader)
+
+    n_samples = 0
+    for index, (data, target) in indexed_loader:
+        assert torch.equal(data, X[index])
+        assert torch.equal(target, y[index])
+        n_samples += index.size(0)
+    assert n_samples == 10
+
+
+def test_indexed_loader_iterable():
+    loader = DataLoader(_Stream(), batch_size=3)
+    with pytest.raises(ValueError) as excinfo:
+        dataloader.make_indexed_loader(loader)
+    assert "map-style datasets" in str(excinfo.value)
+
+
+def test_share_memory():
+    X, y = torch.rand(6, 2), torch.arange(6)
+    dataset = ConcatDataset([TensorDataset(X, y),
+                             Subset(TensorDataset(X.clone(), y.clone()),
+                                    [0, 1])])
+    loader = DataLoader(dataset, batch_size=2)
+
+    nbytes = dataloader.share_memory(loader)
+
+    assert X.is_shared() and y.is_shared()
+    assert dataset.datasets[1].dataset.tensors[0].is_shared()
+    assert nbytes == 2 * (X.nelement() * 4 + y.nelement() * 8)
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_make_subset_loader(shuffle):
+    loader = DataLoader(TensorDataset(X, y), batch_size=3, shuffle=shuffle)
+    indices = torch.tensor([1, 1, 4, 7])
+
+    subset_loader = dataloader.make_subset_loader(loader, indices)
+    assert torch.equal(subset_loader.sampler.indices, indices)
+    targets = torch.cat([target for _, target in subset_loader])
+    assert sorted(targets.tolist()) == [1, 1, 4, 7]
+    if not shuffle:
+        assert targets.tolist() == [1, 1, 4, 7]
+
+    subset_loader = dataloader.make_subset_loader(loader, indices, True)
+    for index, (data, target) in subset_loader:
+        assert torch.equal(index, target)
+
+
+def test_make_subset_loader_invalid():
+    loader = DataLoader(_Stream(), batch_size=2)
+
+    with pytest.raises(ValueError) as excinfo:
+        dataloader.make_subset_loader(loader, [0])
+    assert "map-style" in str(excinfo.value)
+
+    # Samplers that cannot be restricted to the subset of samples
+    sampler = WeightedRandomSampler(torch.ones(10), 10)
+    loader = DataLoader(TensorDataset(X, y), batch_size=2, sampler=sampler)
+
+    with pytest.raises(ValueError) as excinfo:
+        dataloader.make_subset_loader(loader, [0])
+    assert "WeightedRandomSampler" in str(excinfo.value)
+
+
+def test_rebuilt_loader_kwargs():
+    generator = torch.Generator()
+    loader = DataLoader(TensorDataset(X, y),
+                        batch_size=3,
+                        shuffle=True,
+                        num_workers=1,
+                        persistent_workers=True,
+                        prefetch_factor=3,
+                        generator=generator)
+
+    for rebuilt_loader in (dataloader.make_indexed_loader(loader),
+                           dataloader.make_subset_loader(loader, [0, 1])):
+        assert rebuilt_loader.generator is generator
+        assert rebuilt_loader.persistent_workers
+        assert rebuilt_loader.prefetch_factor == 3
+
+
+class _CountingStream(IterableDataset):
+    def __init__(self):
+        self.n_iters = 0
+
+    def __iter__(self):
+        self.n_iters += 1
+        return iter(zip(X, y % 3))
+
+
+def test_n_outputs():
+    # Targets in TensorDataset are inspected without loading batches
+    loader = DataLoader(TensorDataset(X, y % 4), batch_size=3)
+    assert dataloader.n_outputs(loader) == 4
+    assert dataloader.n_outputs(loader, False) == 1
+    subset = Subset(TensorDataset(X, y % 4), [0, 1, 4])
+    assert dataloader.n_outputs(DataLoader(subset)) == 2
+    loader = DataLoader(TensorDataset(X, X), batch_size=3)
+    assert dataloader.n_outputs(loader, False) == 2
+
+    # Other datasets are iterated once, and the result is cached
+    stream = _CountingStream()
+    for batch_size in (3, 4):
+        loader = DataLoader(stream, batch_size=batch_size)
+        assert dataloader.n_outputs(loader) == 3
+    assert stream.n_iters == 1
+
+    stream.n_outputs = 5
+    assert dataloader.n_outputs(DataLoader(stream)) == 5
+
+
+def test_n_outputs_changed():
+    # Targets changed in place or a new dataset are not taken from the cache
+    dataset = TensorDataset(X, y % 4)
+    loader = DataLoader(dataset, batch_size=3)
+    assert dataloader.n_outputs(loader) == 4
+    dataset.tensors = (X, y % 2)
+    assert dataloader.n_outputs(loader) == 2
+
+    loader = DataLoader(_CountingStream(), batch_size=3)
+    stream_loader = dataloader.StreamLoader(loader, steps_per_epoch=2)
+    assert dataloader.n_outputs(stream_loader) == 3
+    stream_loader.loader = DataLoader(TensorDataset(X, y % 4), batch_size=3)
+    assert dataloader.n_outputs(stream_loader) == 4
+
+    # The attribute `n_outputs` on the loader wins over the cache
+    stream_loader.n_outputs = 6
+    assert dataloader.n_outputs(stream_loader) == 6
+
+
+def test_n_features():
+    # Input data in TensorDataset are inspected without loading batches
+    assert dataloader.n_features(DataLoader(TensorDataset(X, y))) == 2
+    subset = Subset(TensorDataset(X, y), [0, 1, 4])
+    assert dataloader.n_features(DataLoader(subset)) == 2
+    tensor_loader = dataloader.TensorLoader(X.to_sparse(), y)
+    assert dataloader.n_features(tensor_loader) == 2
+    assert dataloader.is_sparse(tensor_loader)
+    assert not dataloader.is_sparse(DataLoader(TensorDataset(X, y)))
+
+    # Iterable-style datasets are not iterated
+    stream = _CountingStream()
+    with pytest.raises(ValueError) as excinfo:
+        dataloader.n_features(DataLoader(stream))
+    assert "attribute `n_features`" in str(excinfo.value)
+    stream.n_features = 2
+    assert dataloader.n_features(DataLoader(stream)) == 2
+    assert stream.n_iters == 0
+
+
+class _Failing(IterableDataset):
+    def __iter__(self):
+        yield X[0], y[0]
+        raise RuntimeError("failed")
+
+
+def test_prefetch_loader():
+    loader = DataLoader(TensorDataset(X, y), batch_size=3)
+    prefetch_loader = dataloader.PrefetchLoader(loader, "cpu", n_prefetch=1)
+    assert len(prefetch_loader) == len(loader)
+    assert prefetch_loader.dataset is loader.dataset
+    assert prefetch_loader.batch_size == 3
+
+    for (data, target), (expected_data, expected_target) in zip(
+            prefetch_loader, loader):
+        assert torch.equal(data, expected_data)
+        assert torch.equal(target, expected_target)
+
+    # Stopping early does not leave the background thread blocked
+    for _ in range(3):
+        for batch in prefetch_loader:
+            break
+
+    with pytest.raises(RuntimeError) as excinfo:
+        for batch in dataloader.PrefetchLoader(DataLoader(_Failing())):
+            pass
+    assert "failed" in str(excinfo.value)
+
+    with pytest.raises(ValueError):
+        dataloader.PrefetchLoader(loader, n_prefetch=0)
+
+
+class _DictDataset(TensorDataset):
+    def __getitem__(self, index):
+        data, target = super(_DictDataset, self).__getitem__(index)
+        return {"data": [data, data]}, target
+
+
+def test_prefetch_loader_nested():
+    # Tensors in nested lists and dicts are copied to the device
+    loader = DataLoader(_DictDataset(X, y), batch_size=3)
+    prefetch_loader = dataloader.PrefetchLoader(loader, "cpu")
+
+    for (data, target), (expected_data, _) in zip(prefetch_loader, loader):
+        assert isinstance(data, dict)
+        for elem, expected_elem in zip(data["data"], expected_data["data"]):
+            assert torch.equal(elem, expected_elem)
+
+
+@pytest.mark.parametrize("tensor_loader", [False, True])
+def test_prefetch_loader_subset(tensor_loader):
+    if tensor_loader:
+        loader = dataloader.TensorLoader(X, y, batch_size=3)
+    else:
+        loader = DataLoader(TensorDataset(X, y), batch_size=3)
+    prefetch_loader = dataloader.PrefetchLoader(loader, "cpu")
+
+    indexed_loader = dataloader.make_indexed_loader(prefetch_loader)
+    assert isinstance(indexed_loader, dataloader.PrefetchLoader)
+    for index, (data, target) in indexed_loader:
+        assert torch.equal(target, y[index])
+
+    subset_loader = dataloader.make_subset_loader(prefetch_loader,
+                                                  [1, 1, 4],
+                                                  True)
+    assert isinstance(subset_loader, dataloader.PrefetchLoader)
+    indices = torch.cat([index for index, _ in subset_loader])
+    assert indices.tolist() == [1, 1, 4]
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_tensor_loader(shuffle):
+    loader = dataloader.TensorLoader(X, y, batch_size=4, shuffle=shuffle)
+    assert len(loader) == 3
+    assert dataloader.n_samples(loader) == 10
+    assert dataloader.n_outputs(loader) == 10
+
+    targets = []
+    for data, target in loader:
+        assert torch.equal(data, X[target])
+        targets.extend(target.tolist())
+    assert sorted(targets) == list(range(10))
+    if not shuffle:
+        assert targets == list(range(10))
+
+    loader.drop_last = True
+    assert len(loader) == 2
+    assert sum(target.size(0) for _, target in loader) == 8
+
+
+def test_tensor_loader_subset():
+    loader = dataloader.TensorLoader(X, y, batch_size=3, shuffle=True)
+
+    indexed_loader = dataloader.make_indexed_loader(loader)
+    for index, (data, target) in indexed_loader:
+        assert torch.equal(index, target)
+
+    subset_loader = dataloader.make_subset_loader(loader, [1, 1, 4, 7], True)
+    assert len(subset_loader) == 2
+    indices = []
+    for index, (data, target) in subset_loader:
+        assert torch.equal(index, target)
+        indices.extend(index.tolist())
+    assert sorted(indices) == [1, 1, 4, 7]
+
+    # The original loader is unchanged
+    assert len(loader) == 4
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_memmap_loader(tmp_path, shuffle):
+    X_path, y_path = str(tmp_path / "X.npy"), str(tmp_path / "y.npy")
+    np.save(X_path, X.numpy())
+    np.save(y_path, (y % 3).numpy())
+
+    loader = dataloader.MemmapLoader(X_path, y_path, batch_size=3,
+                                     shuffle=shuffle, chunk_size=4)
+    assert len(loader) == 4
+    assert dataloader.n_samples(loader) == 10
+    assert dataloader.n_outputs(loader) == 3
+
+    rows = []
+    for data, target in loader:
+        assert data.size(0) == 3 or len(rows) == 9
+        rows.extend((data[:, 0] / 2).long().tolist())
+        assert torch.equal(target, (data[:, 0] / 2).long() % 3)
+    assert sorted(rows) == list(range(10))
+    if not shuffle:
+        assert rows == list(range(10))
+
+    # Only the paths are serialized
+    assert pickle.loads(pickle.dumps(loader)).dataset._X is None
+
+    subset_loader = dataloader.make_subset_loader(loader, [7, 1, 1, 4], True)
+    indices = []
+    for index, (data, target) in subset_loader:
+        assert torch.equal(data, X[index])
+        indices.extend(index.tolist())
+    assert sorted(indices) == [1, 1, 4, 7]
+
+
+def test_memmap_loader_dtype(tmp_path):
+    X_path, y_path = str(tmp_path / "X.npy"), str(tmp_path / "y.npy")
+    np.save(X_path, X.numpy().astype(np.float64))
+    np.save(y_path, y.numpy())
+
+    # Floating-point features are converted, and integer targets are kept
+    data, target = next(iter(dataloader.MemmapLoader(X_path, y_path)))
+    assert data.dtype == torch.get_default_dtype()
+    assert target.dtype == torch.int64
+
+    loader = dataloader.MemmapLoader(X_path, y_path, dtype=torch.float64)
+    data, _ = next(iter(loader))
+    assert data.dtype == torch.float64
+
+
+def test_sparse_inputs():
+    scipy_sparse = pytest.importorskip("scipy.sparse")
+    dense = X.clone()
+    dense[dense % 3 != 0] = 0
+    matrix = scipy_sparse.csr_matrix(dense.numpy())
+
+    tensor = dataloader.to_tensor(matrix)
+    assert tensor.layout == torch.sparse_csr
+    assert torch.equal(tensor.to_dense(), dense)
+
+    # Values in float64 are converted into the default floating-point type
+    tensor64 = dataloader.to_tensor(matrix.astype(np.float64))
+    assert tensor64.dtype == torch.get_default_dtype()
+    assert torch.equal(tensor64.to_dense(), dense)
+    assert dataloader.n_samples(matrix) == 10
+
+    for shuffle in (False, True):
+        loader = dataloader.TensorLoader(matrix, y, batch_size=4,
+                                         shuffle=shuffle)
+        for data, target in loader:
+            assert data.layout == torch.sparse_csr
+            assert torch.equal(data.to_dense(), dense[target])
+
+    batches = list(dataloader.iter_inputs(tensor, 4))
+    assert torch.equal(torch.cat([b.to_dense() for b in batches]), dense)
+
+    # Sparse COO tensors are sliced into sparse CSR batches
+    batches = list(dataloader.iter_inputs(dense.to_sparse(), 4))
+    assert all(b.layout == torch.sparse_csr for b in batches)
+    assert torch.equal(torch.cat([b.to_dense() for b in batches]), dense)
+
+
+def test_stream_loader():
+    stream = _CountingStream()
+    loader = dataloader.StreamLoader(DataLoader(stream, batch_size=4), 2)
+    assert len(loader) == 2
+    assert loader.dataset is stream
+
+    # Epochs continue from the position in the stream, which is restarted
+    # once exhausted
+    targets = [target.tolist() for epoch in range(3)
+               for _, target in loader]
+    assert targets == [[0, 1, 2, 0], [1, 2, 0, 1], [2, 0],
+                       [0, 1, 2, 0], [1, 2, 0, 1], [2, 0]]
+    assert stream.n_iters == 2
+
+    with pytest.raises(ValueError):
+        dataloader.StreamLoader(loader, 0)
+
+
+class _CountingDataset(TensorDataset):
+    def __init__(self, *tensors):
+        super().__init__(*tensors)
+        self.loaded = []
+
+    def __getitem__(self, index):
+        self.loaded.append(index)
+        return super().__getitem__(index)
+
+
+def _add_one(data):
+    return data + 1
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_cached_dataset(tmp_path, on_disk):
+    dataset = _CountingDataset(X, y)
+    cached = dataloader.CachedDataset(dataset,
+                                      transform=_add_one,
+                                      cache_size=3,
+                                      cache_dir=tmp_path if on_disk else None)
+    assert len(cached) == 10
+
+    # Samples are loaded once while cached, and transformed on each access
+    for _ in range(2):
+        for index in (0, 1, 2):
+            data, target = cached[index]
+            assert torch.equal(data, X[index] + 1)
+            assert target == index
+    assert dataset.loaded == [0, 1, 2]
+    assert (cached.hits, cached.misses) == (3, 3)
+
+    # The least recently used sample is evicted
+    cached[1]
+    cached[3]  # evict 0
+    assert dataset.loaded == [0, 1, 2, 3]
+    cached[2]
+    cached[0]  # evict 1
+    cached[2], cached[3]
+    assert dataset.loaded == [0, 1, 2, 3, 0]
+
+    # The cache is not serialized
+    restored = pickle.loads(pickle.dumps(cached))
+    assert len(restored._cache) == 0
+    assert torch.equal(restored[4][0], X[4] + 1)
+
+
+def test_echo_loader():
+    loader = DataLoader(TensorDataset(X, y), batch_size=4)
+    echo_loader = dataloader.EchoLoader(loader, 3, transform=_add_one)
+    assert len(echo_loader) == 9
+    assert echo_loader.dataset is loader.dataset
+
+    batches = list(echo_loader)
+    assert len(batches) == 9
+    for batch_idx, (data, target) in enumerate(batches):
+        offset = 0 if batch_idx % 3 == 0 else 1
+        assert torch.equal(data, X[target] + offset)
+        assert torch.equal(target, batches[batch_idx - batch_idx % 3][1])
+
+    # Subsets of samples are also repeated
+    subset_loader = dataloader.make_subset_loader(echo_loader, [1, 4], True)
+    batches = list(subset_loader)
+    assert len(batches) == 3
+    for index, (data, target) in batches:
+        assert torch.equal(index, torch.tensor([1, 4]))
+    assert torch.equal(batches[1][1][0], X[[1, 4]] + 1)
+
+    with pytest.raises(ValueError):
+        dataloader.EchoLoader(loader, 0)
@@ -0,0 +1,244 @@
+import torch
+import pytest
+import numpy as np
+import torch.nn as nn
+from torch.utils.data import TensorDataset, DataLoader
+
+import torchensemble
+from torchensemble.utils import io
+from torchensemble.utils import dataloader
+from torchensemble.utils.logging import set_logger
+
+
+set_logger("pytest_gradient_boosting")
+
+
+# Base estimator
+class MLP_clf(nn.Module):
+    def __init__(self):
+        super(MLP_clf, self).__init__()
+        self.linear1 = nn.Linear(2, 4)
+        self.linear2 = nn.Linear(4, 2)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = torch.relu(self.linear1(X))
+        output = self.linear2(output)
+        return output
+
+
+class MLP_reg(nn.Module):
+    def __init__(self):
+        super(MLP_reg, self).__init__()
+        self.linear1 = nn.Linear(2, 4)
+        self.linear2 = nn.Linear(4, 1)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = torch.relu(self.linear1(X))
+        output = self.linear2(output)
+        return output
+
+
+X_train = torch.Tensor(np.array(([0.1, 0.1],
+                                 [0.2, 0.2],
+                                 [0.3, 0.3],
+                                 [0.4, 0.4],
+                                 [0.5, 0.5],
+                                 [0.6, 0.6])))
+
+y_train_clf = torch.LongTensor(np.array(([0, 0, 1, 1, 0, 1])))
+y_train_reg = torch.FloatTensor(np.array(([0.1, 0.2, 0.3, 0.4, 0.5, 0.6])))
+y_train_reg = y_train_reg.view(-1, 1)
+
+
+def _fit(method, estimator, y_train, **kwargs):
+    torch.manual_seed(0)
+    model = method(estimator=estimator,
+                   n_estimators=3,
+                   shrinkage_rate=0.5,
+                   cuda=False)
+    model.set_optimizer("SGD", lr=1e-1)
+
+    train = TensorDataset(X_train, y_train)
+    train_loader = DataLoader(train, batch_size=4)
+    model.fit(train_loader, epochs=2, save_model=False, **kwargs)
+
+    return model
+
+
+@pytest.mark.parametrize("stage_cache", ["memory", "disk"])
+@pytest.mark.parametrize("method,estimator,y_train", [
+    (torchensemble.GradientBoostingClassifier, MLP_clf, y_train_clf),
+    (torchensemble.GradientBoostingRegressor, MLP_reg, y_train_reg)])
+def test_stage_cache(method, estimator, y_train, stage_cache):
+    """
+    This unit test checks that caching the outputs of fitted base estimators
+    does not change the fitted ensemble.
+    """
+    expected = _fit(method, estimator, y_train)
+    actual = _fit(method, estimator, y_train, stage_cache=stage_cache)
+
+    with torch.no_grad():
+        assert torch.allclose(actual(X_train), expected(X_train), atol=1e-5)
+
+
+@pytest.mark.parametrize("method,estimator,y_train", [
+    (torchensemble.GradientBoostingClassifier, MLP_clf, y_train_clf),
+    (torchensemble.GradientBoostingRegressor, MLP_reg, y_train_reg)])
+def test_stage_cache_echo(method, estimator, y_train):
+    """
+    This unit test checks that each training sample is added to the cached
+    outputs once when batches are repeated with data echoing.
+    """
+    models = []
+    for stage_cache in (None, "memory"):
+        torch.manual_seed(0)
+        model = method(estimator=estimator,
+                       n_estimators=3,
+                       shrinkage_rate=0.5,
+                       cuda=False)
+        model.set_optimizer("SGD", lr=1e-1)
+
+        train = TensorDataset(X_train, y_train)
+        train_loader = dataloader.EchoLoader(DataLoader(train, batch_size=4),
+                                             echo_factor=2)
+        model.fit(train_loader,
+                  epochs=2,
+                  save_model=False,
+                  stage_cache=stage_cache)
+        models.append(model)
+
+    with torch.no_grad():
+        assert torch.allclose(models[1](X_train),
+                              models[0](X_train),
+                              atol=1e-5)
+
+
+def test_stage_cache_invalid():
+    with pytest.raises(ValueError) as excinfo:
+        _fit(torchensemble.GradientBoostingClassifier, MLP_clf, y_train_clf,
+             stage_cache="gpu")
+    assert "stage cache should be one of" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("method,estimator,y_train", [
+    (torchensemble.GradientBoostingClassifier, MLP_clf, y_train_clf),
+    (torchensemble.GradientBoostingRegressor, MLP_reg, y_train_reg)])
+def test_staged_validation(method, estimator, y_train):
+    """
+    This unit test checks that the cached outputs on validation data match
+    the outputs from all fitted base estimators.
+    """
+    model = _fit(method, estimator, y_train)
+    model.eval()
+
+    test = TensorDataset(X_train, y_train)
+    test_loader = DataLoader(test, batch_size=4)
+    echo_loader = dataloader.EchoLoader(test_loader, echo_factor=2)
+
+    with torch.no_grad():
+        for loader in (test_loader, echo_loader):
+            for est_idx in range(len(model)):
+                staged_validation = list(model._staged_validation(loader,
+                                                                  est_idx))
+                assert len(staged_validation) == len(test_loader)
+                for (output, _), (data, _) in zip(staged_validation,
+                                                  test_loader):
+                    expected = model._staged_forward(data, est_idx)
+                    assert torch.allclose(output, expected, atol=1e-6)
+
+
+def test_staged_predict_clf():
+    model = _fit(torchensemble.GradientBoostingClassifier,
+                 MLP_clf,
+                 y_train_clf)
+
+    probas = list(model.staged_predict_proba(X_train))
+    labels = list(model.staged_predict(X_train))
+    assert len(probas) == len(labels) == len(model)
+
+    with torch.no_grad():
+        for est_idx, (proba, label) in enumerate(zip(probas, labels)):
+            output = model._staged_forward(X_train, est_idx)
+            assert torch.allclose(proba, torch.softmax(output, dim=1))
+            assert torch.equal(label, torch.argmax(output, dim=1))
+        assert torch.allclose(probas[-1], model(X_train))
+
+
+@pytest.mark.parametrize("method,estimator,y_train", [
+    (torchensemble.GradientBoostingClassifier, MLP_clf, y_train_clf),
+    (torchensemble.GradientBoostingRegressor, MLP_reg, y_train_reg)])
+def test_staged_predict_inputs(method, estimator, y_train):
+    """
+    This unit test checks that staged predictions on data loaders, tuples
+    ``(X, y)`` and NumPy arrays match those on the tensor.
+    """
+    model = _fit(method, estimator, y_train)
+    expected = list(model.staged_predict(X_train))
+
+    loader = DataLoader(TensorDataset(X_train, y_train), batch_size=4)
+    for X in (loader, (X_train, y_train), X_train.numpy()):
+        actual = list(model.staged_predict(X, batch_size=4))
+        assert len(actual) == len(expected)
+        for pred, expected_pred in zip(actual, expected):
+            assert torch.allclose(pred.float(), expected_pred.float(),
+                                  atol=1e-6)
+
+
+def test_staged_predict_reg():
+    model = _fit(torchensemble.GradientBoostingRegressor,
+                 MLP_reg,
+                 y_train_reg)
+
+    preds = list(model.staged_predict(X_train, batch_size=4))
+    assert len(preds) == len(model)
+
+    with torch.no_grad():
+        for est_idx, pred in enumerate(preds):
+            expected = model._staged_forward(X_train, est_idx)
+            assert torch.allclose(pred, expected, atol=1e-6)
+
+
+def test_forward_early_exit():
+    model = _fit(torchensemble.GradientBoostingClassifier,
+                 MLP_clf,
+                 y_train_clf)
+    assert len(model.stage_output_norms_) == len(model)
+
+    # No early exit when the estimated change is large enough
+    actual = model.forward_early_exit(X_train, slack=1e8)
+    with torch.no_grad():
+        assert torch.allclose(actual, model(X_train), atol=1e-6)
+
+    # Only the first base estimator is evaluated
+    actual = model.forward_early_exit(X_train, max_stages=1)
+    expected = next(model.staged_predict_proba(X_train))
+    assert torch.allclose(actual, expected, atol=1e-6)
+
+    # All samples exit after the first base estimator
+    actual = model.forward_early_exit(X_train, slack=-1.)
+    assert torch.allclose(actual, expected, atol=1e-6)
+
+
+def test_forward_early_exit_reload(tmp_path):
+    """
+    This unit test checks that a model restored from its checkpoint keeps
+    the attributes used by the data forwarding with early exit.
+    """
+    model = _fit(torchensemble.GradientBoostingClassifier,
+                 MLP_clf,
+                 y_train_clf)
+    io.save(model, str(tmp_path), model.logger)
+
+    restored = torchensemble.GradientBoostingClassifier(estimator=MLP_clf,
+                                                        n_estimators=3,
+                                                        shrinkage_rate=0.5,
+                                                        cuda=False)
+    io.load(restored, str(tmp_path))
+
+    assert restored.stage_output_norms_ == model.stage_output_norms_
+    assert restored.n_outputs == model.n_outputs
+    for slack in (1e8, 1., -1.):
+        assert torch.allclose(restored.forward_early_exit(X_train, slack),
+                              model.forward_early_exit(X_train, slack))
@@ -41,3 +41,11 @@ def test_residual_regression_invalid_shape():
             label.view(-1, 1)  # 4 * 1
         )
     assert "should be the same as output" in str(excinfo.value)
+
+
+def test_stacked_outputs():
+    stacked = torch.stack(outputs)
+    assert_array_equal(op.average(stacked).numpy(),
+                       op.average(outputs).numpy())
+    assert_array_almost_equal(op.sum_with_multiplicative(stacked, 0.1).numpy(),
+                              op.sum_with_multiplicative(outputs, 0.1).numpy())
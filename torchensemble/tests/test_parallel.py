@@ -0,0 +1,181 @@
+import torch
+import pytest
+import numpy as np
+import torch.nn as nn
+from torch.utils.data import TensorDataset, DataLoader
+
+import torchensemble
+from torchensemble.utils import parallel as par
+from torchensemble.utils.logging import set_logger
+
+
+parallel = [torchensemble.VotingClassifier,
+            torchensemble.BaggingClassifier,
+            torchensemble.AdversarialTrainingClassifier]
+
+
+set_logger("pytest_parallel")
+
+
+# Base estimator
+class MLP(nn.Module):
+    def __init__(self):
+        super(MLP, self).__init__()
+        self.linear1 = nn.Linear(2, 2)
+        self.linear2 = nn.Linear(2, 2)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = self.linear1(X)
+        output = self.linear2(output)
+        return output
+
+
+X_train = torch.Tensor(np.array(([0.1, 0.1],
+                                 [0.2, 0.2],
+                                 [0.3, 0.3],
+                                 [0.4, 0.4],
+                                 [0.5, 0.5],
+                                 [0.6, 0.6])))
+
+y_train = torch.LongTensor(np.array(([0, 0, 1, 1, 0, 1])))
+
+
+def _fill_fit(estimators, optimizers, indices, cur_lr, epoch, loader):
+    with torch.no_grad():
+        for idx, estimator in zip(indices, estimators):
+            estimator.weight.fill_(10 * epoch + idx)
+
+
+def _failed_fit(estimators, optimizers, indices, cur_lr, epoch, loader):
+    raise ValueError("failed")
+
+
+def test_worker_pool_shared_estimators():
+    """
+    This unit test checks that base estimators updated by persistent workers
+    are available in the main process.
+    """
+    estimators = [nn.Linear(2, 2) for _ in range(3)]
+    optimizers = [None] * 3
+    loader = DataLoader(TensorDataset(X_train, y_train), batch_size=2)
+
+    with par.WorkerPool(estimators,
+                        optimizers,
+                        _fill_fit,
+                        loader,
+                        2) as workers:
+        assert workers.n_workers == 2
+        for epoch in range(2):
+            workers.fit(epoch)
+            for idx, estimator in enumerate(estimators):
+                assert torch.all(estimator.weight == 10 * epoch + idx)
+
+
+def test_worker_pool_error():
+    estimators = [nn.Linear(2, 2) for _ in range(2)]
+    loader = DataLoader(TensorDataset(X_train, y_train), batch_size=2)
+
+    for broadcast in [False, True]:
+        with par.WorkerPool(estimators,
+                            [None] * 2,
+                            _failed_fit,
+                            loader,
+                            2,
+                            broadcast=broadcast) as workers:
+            for epoch in range(2):
+                with pytest.raises(RuntimeError) as excinfo:
+                    workers.fit(epoch)
+                assert "ValueError: failed" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("method", parallel)
+@pytest.mark.parametrize("shared_batches", [False, True])
+def test_persistent_workers(method, shared_batches):
+    """
+    This unit test checks that fitting with persistent workers is equivalent
+    to fitting base estimators in the main process.
+    """
+    train_loader = DataLoader(TensorDataset(X_train, y_train), batch_size=2)
+    test_loader = DataLoader(TensorDataset(X_train, y_train), batch_size=2)
+
+    models = []
+    for persistent_workers in [False, True]:
+        torch.manual_seed(0)
+        model = method(estimator=MLP, n_estimators=3, cuda=False, n_jobs=2)
+        model.set_optimizer("Adam", lr=1e-2)
+        model.set_scheduler("StepLR", step_size=1)
+        model.fit(train_loader,
+                  epochs=2,
+                  test_loader=test_loader,
+                  save_model=False,
+                  shared_batches=shared_batches,
+                  persistent_workers=persistent_workers)
+        models.append(model)
+
+    for param, persistent_param in zip(models[0].parameters(),
+                                       models[1].parameters()):
+        assert torch.allclose(param, persistent_param, atol=1e-6)
+
+
+def _update_data_fit(estimators, optimizers, indices, cur_lr, epoch, loader):
+    loader.dataset.tensors[0][indices[0]] = -1
+
+
+def test_worker_pool_shared_data():
+    """
+    This unit test checks that workers attach to the training data in the
+    shared memory instead of copying it.
+    """
+    X = torch.zeros(4, 2)
+    loader = DataLoader(TensorDataset(X, torch.zeros(4)), batch_size=2)
+    estimators = [nn.Linear(2, 2) for _ in range(2)]
+
+    with par.WorkerPool(estimators,
+                        [None] * 2,
+                        _update_data_fit,
+                        loader,
+                        2) as workers:
+        assert X.is_shared()
+        workers.fit(0)
+
+    assert torch.all(X[:2] == -1)
+    assert torch.all(X[2:] == 0)
+
+
+def _record_fit(estimators, optimizers, indices, cur_lr, epoch, loader):
+    with torch.no_grad():
+        for data, target in loader:
+            for estimator in estimators:
+                estimator.weight[:data.size(0)] += data
+                estimator.bias[:target.size(0)] += target
+
+
+def test_worker_pool_broadcast():
+    """
+    This unit test checks that all workers read all batches loaded in the
+    main process from the ring buffer.
+    """
+    X = torch.rand(7, 2)
+    y = torch.rand(7)
+    loader = DataLoader(TensorDataset(X, y), batch_size=2, shuffle=True)
+    estimators = [nn.Linear(2, 2) for _ in range(3)]
+    for estimator in estimators:
+        nn.init.zeros_(estimator.weight)
+        nn.init.zeros_(estimator.bias)
+
+    with par.WorkerPool(estimators,
+                        [None] * 3,
+                        _record_fit,
+                        loader,
+                        2,
+                        broadcast=True,
+                        n_slots=2) as workers:
+        for epoch in range(2):
+            workers.fit(epoch)
+
+    # Each estimator accumulates the sum over all batches in two epochs
+    for estimator in estimators:
+        assert torch.allclose(estimator.weight.sum(), 2 * X.sum())
+        assert torch.allclose(estimator.bias.sum(), 2 * y.sum())
+    assert not X.is_shared()
@@ -0,0 +1,118 @@
+import torch
+import pytest
+import numpy as np
+import torch.nn as nn
+from torch.utils.data import TensorDataset, DataLoader
+
+import torchensemble
+from torchensemble.utils.logging import set_logger
+
+
+all_clf = [torchensemble.FusionClassifier,
+           torchensemble.VotingClassifier,
+           torchensemble.BaggingClassifier,
+           torchensemble.GradientBoostingClassifier,
+           torchensemble.SnapshotEnsembleClassifier,
+           torchensemble.AdversarialTrainingClassifier]
+
+
+all_reg = [torchensemble.FusionRegressor,
+           torchensemble.VotingRegressor,
+           torchensemble.BaggingRegressor,
+           torchensemble.GradientBoostingRegressor,
+           torchensemble.SnapshotEnsembleRegressor,
+           torchensemble.AdversarialTrainingRegressor]
+
+
+set_logger("pytest_predict")
+
+
+# Base estimator
+class MLP_clf(nn.Module):
+    def __init__(self):
+        super(MLP_clf, self).__init__()
+        self.linear1 = nn.Linear(2, 2)
+        self.linear2 = nn.Linear(2, 2)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = self.linear1(X)
+        output = self.linear2(output)
+        return output
+
+
+class MLP_reg(nn.Module):
+    def __init__(self):
+        super(MLP_reg, self).__init__()
+        self.linear1 = nn.Linear(2, 2)
+        self.linear2 = nn.Linear(2, 1)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = self.linear1(X)
+        output = self.linear2(output)
+        return output
+
+
+X_train = torch.Tensor(np.array(([0.1, 0.1],
+                                 [0.2, 0.2],
+                                 [0.3, 0.3],
+                                 [0.4, 0.4],
+                                 [0.5, 0.5],
+                                 [0.6, 0.6])))
+
+y_train_clf = torch.LongTensor(np.array(([0, 0, 1, 1, 0, 1])))
+y_train_reg = torch.FloatTensor(np.array(([0.1, 0.2, 0.3, 0.4, 0.5, 0.6])))
+y_train_reg = y_train_reg.view(-1, 1)
+
+
+def _fit(method, estimator, y_train):
+    model = method(estimator=estimator, n_estimators=2, cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train = TensorDataset(X_train, y_train)
+    train_loader = DataLoader(train, batch_size=2)
+    model.fit(train_loader, epochs=2, save_model=False)
+
+    return model, train_loader
+
+
+def _check_outputs(predict, model, train_loader, n_outputs):
+    with torch.no_grad():
+        expected = model(X_train)
+
+    # Tensor and NumPy array
+    assert torch.allclose(predict(X_train, batch_size=2), expected)
+    assert torch.allclose(predict(X_train.numpy(), batch_size=4), expected)
+
+    # Data loader
+    assert torch.allclose(predict(train_loader), expected)
+
+    # Preallocated buffers
+    out = torch.zeros(6, n_outputs)
+    assert predict(X_train, out=out) is out
+    assert torch.allclose(out, expected)
+
+    out = np.zeros((6, n_outputs), dtype=np.float32)
+    assert predict(train_loader, out=out) is out
+    assert np.allclose(out, expected.numpy())
+
+
+@pytest.mark.parametrize("clf", all_clf)
+def test_predict_proba(clf):
+    model, train_loader = _fit(clf, MLP_clf, y_train_clf)
+    _check_outputs(model.predict_proba, model, train_loader, 2)
+
+
+@pytest.mark.parametrize("reg", all_reg)
+def test_predict_output(reg):
+    model, train_loader = _fit(reg, MLP_reg, y_train_reg)
+    _check_outputs(model.predict_output, model, train_loader, 1)
+
+
+def test_predict_invalid_batch_size():
+    model, _ = _fit(torchensemble.VotingClassifier, MLP_clf, y_train_clf)
+
+    with pytest.raises(ValueError) as excinfo:
+        model.predict_proba(X_train, batch_size=0)
+    assert "number of samples in each batch" in str(excinfo.value)
@@ -0,0 +1,189 @@
+import torch
+import pytest
+import numpy as np
+import torch.nn as nn
+from torch.utils.data import Dataset, TensorDataset, DataLoader
+
+import torchensemble
+from torchensemble.utils.logging import set_logger
+
+
+parallel = [torchensemble.VotingClassifier,
+            torchensemble.BaggingClassifier,
+            torchensemble.AdversarialTrainingClassifier]
+
+
+set_logger("pytest_shared_batches")
+
+
+# Base estimator
+class MLP(nn.Module):
+    def __init__(self):
+        super(MLP, self).__init__()
+        self.linear1 = nn.Linear(2, 2)
+        self.linear2 = nn.Linear(2, 2)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = self.linear1(X)
+        output = self.linear2(output)
+        return output
+
+
+X_train = torch.Tensor(np.array(([0.1, 0.1],
+                                 [0.2, 0.2],
+                                 [0.3, 0.3],
+                                 [0.4, 0.4],
+                                 [0.5, 0.5],
+                                 [0.6, 0.6])))
+
+y_train = torch.LongTensor(np.array(([0, 0, 1, 1, 0, 1])))
+
+
+class CountingDataset(Dataset):
+    """Count the number of samples loaded."""
+
+    def __init__(self, X, y):
+        self.X = X
+        self.y = y
+        self.n_loaded = 0
+
+    def __len__(self):
+        return len(self.X)
+
+    def __getitem__(self, index):
+        self.n_loaded += 1
+        return self.X[index], self.y[index]
+
+
+@pytest.mark.parametrize("method", parallel)
+def test_shared_batches_single_pass(method):
+    """
+    This unit test checks that the training data is loaded once per epoch
+    when fitting with shared batches.
+    """
+    model = method(estimator=MLP, n_estimators=3, cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train = CountingDataset(X_train, y_train)
+    train_loader = DataLoader(train, batch_size=2)
+    model.fit(train_loader, epochs=2, save_model=False, shared_batches=True)
+
+    # One pass for deciding the number of classes, and one pass per epoch
+    assert train.n_loaded == 3 * len(X_train)
+    assert len(model.estimators_) == 3
+
+
+def test_shared_batches_voting_equivalence():
+    """
+    This unit test checks that fitting VotingClassifier with shared batches
+    is equivalent to fitting base estimators independently.
+    """
+    train_loader = DataLoader(TensorDataset(X_train, y_train), batch_size=2)
+
+    models = []
+    for shared_batches in [False, True]:
+        torch.manual_seed(0)
+        model = torchensemble.VotingClassifier(estimator=MLP,
+                                               n_estimators=2,
+                                               cuda=False)
+        model.set_optimizer("SGD", lr=1e-1)
+        model.fit(train_loader,
+                  epochs=2,
+                  save_model=False,
+                  shared_batches=shared_batches)
+        models.append(model)
+
+    for param, shared_param in zip(models[0].parameters(),
+                                   models[1].parameters()):
+        assert torch.allclose(param, shared_param)
+
+
+class MLP_reg(nn.Module):
+    def __init__(self):
+        super(MLP_reg, self).__init__()
+        self.linear1 = nn.Linear(2, 2)
+        self.linear2 = nn.Linear(2, 1)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = self.linear1(X)
+        output = self.linear2(output)
+        return output
+
+
+class MLP_bn(MLP):
+    def __init__(self):
+        super(MLP_bn, self).__init__()
+        self.bn = nn.BatchNorm1d(2)
+
+    def forward(self, X):
+        return super(MLP_bn, self).forward(self.bn(X))
+
+
+@pytest.mark.parametrize("method", [torchensemble.VotingClassifier,
+                                    torchensemble.VotingRegressor])
+def test_vectorize_voting_equivalence(method):
+    """
+    This unit test checks that the vectorized training of VotingClassifier
+    and VotingRegressor is equivalent to fitting base estimators
+    independently.
+    """
+    if method is torchensemble.VotingClassifier:
+        estimator, y = MLP, y_train
+    else:
+        estimator, y = MLP_reg, X_train[:, :1]
+    train_loader = DataLoader(TensorDataset(X_train, y), batch_size=2)
+    test_loader = DataLoader(TensorDataset(X_train, y), batch_size=2)
+
+    models = []
+    for vectorize in [False, True]:
+        torch.manual_seed(0)
+        model = method(estimator=estimator, n_estimators=2, cuda=False)
+        model.set_optimizer("Adam", lr=1e-2)
+        model.set_scheduler("StepLR", step_size=1)
+        model.fit(train_loader,
+                  epochs=3,
+                  test_loader=test_loader,
+                  save_model=False,
+                  vectorize=vectorize)
+        models.append(model)
+
+    for param, fused_param in zip(models[0].parameters(),
+                                  models[1].parameters()):
+        assert torch.allclose(param, fused_param, atol=1e-6)
+
+
+@pytest.mark.parametrize("method", [torchensemble.BaggingClassifier,
+                                    torchensemble.BaggingRegressor])
+def test_vectorize_bagging(method):
+    """
+    This unit test checks the vectorized training of bagging.
+    """
+    if method is torchensemble.BaggingClassifier:
+        estimator, y = MLP, y_train
+    else:
+        estimator, y = MLP_reg, X_train[:, :1]
+    train_loader = DataLoader(TensorDataset(X_train, y), batch_size=2)
+
+    model = method(estimator=estimator, n_estimators=3, cuda=False)
+    model.set_optimizer("Adam", lr=1e-2)
+    model.fit(train_loader, epochs=2, save_model=False, vectorize=True)
+
+    # Base estimators are updated with different bootstrap samples
+    assert len(model.estimators_) == 3
+    assert not torch.allclose(model.estimators_[0].linear1.weight,
+                              model.estimators_[1].linear1.weight)
+    assert model(X_train).shape == (6, 1 if y.dim() > 1 else 2)
+
+
+def test_vectorize_batch_norm():
+    model = torchensemble.VotingClassifier(estimator=MLP_bn,
+                                           n_estimators=2,
+                                           cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+    train_loader = DataLoader(TensorDataset(X_train, y_train), batch_size=2)
+
+    with pytest.raises(ValueError) as excinfo:
+        model.fit(train_loader, epochs=1, save_model=False, vectorize=True)
+    assert "running statistics" in str(excinfo.value)
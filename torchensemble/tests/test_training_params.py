@@ -2,7 +2,7 @@ import torch
 import pytest
 import numpy as np
 import torch.nn as nn
-from torch.utils.data import TensorDataset, DataLoader
+from torch.utils.data import TensorDataset, DataLoader, IterableDataset
 
 import torchensemble
 from torchensemble.utils.logging import set_logger
@@ -38,6 +38,11 @@ X_train = torch.Tensor(np.array(([1, 1],
 y_train = torch.LongTensor(np.array(([0, 0, 1, 1])))
 
 
+class _Stream(IterableDataset):
+    def __iter__(self):
+        return zip(X_train, y_train)
+
+
 # Prepare data
 train = TensorDataset(X_train, y_train)
 train_loader = DataLoader(train, batch_size=2)
@@ -121,6 +126,12 @@ def test_snapshot_ensemble():
         model.fit(train_loader, epochs=5)
     assert "should be a multiple of n_estimators" in str(excinfo.value)
 
+    # Number of batches in each epoch
+    model.set_optimizer("Adam", lr=1e-3)
+    with pytest.raises(ValueError) as excinfo:
+        model.fit(DataLoader(_Stream(), batch_size=2), epochs=2)
+    assert "number of batches in each epoch" in str(excinfo.value)
+
 
 def test_adversarial_training():
     model = torchensemble.AdversarialTrainingClassifier(estimator=MLP,
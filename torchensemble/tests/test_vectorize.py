@@ -0,0 +1,88 @@
+import torch
+import pytest
+import numpy as np
+import torch.nn as nn
+from torch.utils.data import TensorDataset, DataLoader
+
+import torchensemble
+from torchensemble.utils.logging import set_logger
+from torchensemble.utils.vectorize import StackedEstimators
+
+
+all_clf = [torchensemble.FusionClassifier,
+           torchensemble.VotingClassifier,
+           torchensemble.BaggingClassifier,
+           torchensemble.GradientBoostingClassifier,
+           torchensemble.SnapshotEnsembleClassifier,
+           torchensemble.AdversarialTrainingClassifier]
+
+
+set_logger("pytest_vectorize")
+
+
+# Base estimator
+class MLP(nn.Module):
+    def __init__(self):
+        super(MLP, self).__init__()
+        self.linear1 = nn.Linear(2, 4)
+        self.linear2 = nn.Linear(4, 2)
+
+    def forward(self, X):
+        X = X.view(X.size()[0], -1)
+        output = torch.relu(self.linear1(X))
+        output = self.linear2(output)
+        return output
+
+
+X_train = torch.Tensor(np.array(([0.1, 0.1],
+                                 [0.2, 0.2],
+                                 [0.3, 0.3],
+                                 [0.4, 0.4])))
+
+y_train = torch.LongTensor(np.array(([0, 0, 1, 1])))
+
+
+def test_stacked_estimators():
+    estimators = [MLP() for _ in range(3)]
+    stacked = StackedEstimators(estimators)
+
+    expected = torch.stack([estimator(X_train) for estimator in estimators])
+    actual = stacked(X_train)
+
+    assert actual.size() == (3, 4, 2)
+    assert torch.allclose(actual, expected, atol=1e-6)
+
+    # Copy the stacked parameters back to base estimators
+    with torch.no_grad():
+        stacked.params[0].zero_()
+    stacked.unstack(estimators)
+    for estimator in estimators:
+        assert torch.all(estimator.linear1.weight == 0)
+
+
+def test_stacked_estimators_empty():
+    with pytest.raises(ValueError) as excinfo:
+        StackedEstimators([])
+    assert "no base estimator to stack" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("clf", all_clf)
+def test_stack_estimators(clf):
+    model = clf(estimator=MLP, n_estimators=2, cuda=False)
+    model.set_optimizer("Adam", lr=1e-3)
+
+    train = TensorDataset(X_train, y_train)
+    train_loader = DataLoader(train, batch_size=2)
+
+    epochs = 2 if isinstance(model, torchensemble.SnapshotEnsembleClassifier) else 1  # noqa: E501
+    model.fit(train_loader, epochs=epochs, save_model=False)
+
+    model.eval()
+    with torch.no_grad():
+        expected = model(X_train)
+        model.stack_estimators()
+        actual = model(X_train)
+    assert torch.allclose(actual, expected, atol=1e-6)
+
+    model.unstack_estimators()
+    assert model.stacked_estimators_ is None
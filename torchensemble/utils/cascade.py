@@ -0,0 +1,168 @@
+"""
+This module collects operations on the confidence cascade of base estimators
+in classification, where base estimators are evaluated one by one, and each
+sample stops being forwarded to remaining base estimators once the averaged
+class distribution is confident enough.
+"""
+
+
+import torch
+import torch.nn.functional as F
+
+
+__all__ = ["confidence",
+           "cascade_forward",
+           "calibrate"]
+
+
+def confidence(proba, criterion="max_proba"):
+    """
+    Compute the confidence of class distributions along the last dimension.
+
+    - If `criterion` is ``max_proba``, return the largest class probability.
+    - If `criterion` is ``margin``, return the difference between the two
+      largest class probabilities.
+    """
+    if criterion == "max_proba":
+        return proba.max(dim=-1)[0]
+    elif criterion == "margin":
+        top2, _ = torch.topk(proba, 2, dim=-1)
+        return top2[..., 0] - top2[..., 1]
+    else:
+        msg = ("The confidence criterion should be one of {{max_proba,"
+               " margin}}, but got {} instead.")
+        raise ValueError(msg.format(criterion))
+
+
+def _average(outputs, n_estimators, average_logits):
+    """Return the class distribution from the sum of outputs."""
+    average = outputs / n_estimators
+    if average_logits:
+        return F.softmax(average, dim=-1)
+
+    return average
+
+
+def cascade_forward(estimators,
+                    x,
+                    threshold,
+                    order=None,
+                    criterion="max_proba",
+                    average_logits=False):
+    """
+    Evaluate base estimators in `order`, and stop adding the outputs of
+    remaining base estimators for each sample once the confidence on its
+    averaged class distribution reaches `threshold`. Only undecided samples
+    are forwarded to the next base estimator.
+
+    - If `average_logits` is False, the class distributions of base
+      estimators are averaged.
+    - If `average_logits` is True, the outputs of base estimators are
+      averaged before the softmax.
+
+    Return the class distribution and the number of base estimators
+    evaluated on each sample.
+    """
+    if order is None:
+        order = range(len(estimators))
+
+    outputs = None
+    active = torch.arange(x.size(0), device=x.device)
+    n_used = torch.zeros(x.size(0), dtype=torch.int64, device=x.device)
+
+    for idx in order:
+        output = estimators[idx](x[active])
+        if not average_logits:
+            output = F.softmax(output, dim=1)
+
+        if outputs is None:
+            outputs = torch.zeros(x.size(0), output.size(1),
+                                  device=output.device)
+        outputs[active] += output
+        n_used[active] += 1
+
+        proba = _average(outputs[active],
+                         n_used[active].unsqueeze(1),
+                         average_logits)
+        active = active[confidence(proba, criterion) < threshold]
+        if active.size(0) == 0:
+            break
+
+    proba = _average(outputs, n_used.unsqueeze(1), average_logits)
+
+    return proba, n_used
+
+
+def calibrate(estimators,
+              test_loader,
+              device,
+              tolerance=0.5,
+              criterion="max_proba",
+              average_logits=False):
+    """
+    Decide the order of base estimators and the confidence threshold of the
+    cascade on the validation data in `test_loader`.
+
+    Base estimators are sorted by the descending order of their validation
+    accuracy. The threshold is the smallest candidate, with which the
+    validation accuracy of the cascade is at most `tolerance` (in percentage)
+    lower than the validation accuracy of all base estimators. The largest
+    candidate is infinite, with which all base estimators are evaluated on
+    each sample, so that a threshold is always found.
+
+    Return the order, the threshold, the validation accuracy of the cascade
+    and the average number of base estimators evaluated on each sample.
+    """
+    if tolerance < 0:
+        msg = ("The largest drop on the validation accuracy should be"
+               " non-negative, but got {} instead.")
+        raise ValueError(msg.format(tolerance))
+
+    outputs, targets = [], []
+    with torch.no_grad():
+        for _, (data, target) in enumerate(test_loader):
+            data, target = data.to(device), target.to(device)
+            output = torch.stack([estimator(data) for estimator in estimators])
+            if not average_logits:
+                output = F.softmax(output, dim=2)
+            outputs.append(output)
+            targets.append(target)
+    outputs = torch.cat(outputs, dim=1)  # n_estimators * n_samples * n_classes
+    targets = torch.cat(targets)
+
+    # Sort base estimators by their validation accuracy
+    correct = (outputs.argmax(dim=2) == targets.unsqueeze(0)).sum(dim=1)
+    order = torch.argsort(correct, descending=True)
+
+    # Class distributions and confidence after each stage of the cascade
+    n_estimators = torch.arange(1, len(estimators) + 1, device=device)
+    proba = _average(torch.cumsum(outputs[order], dim=0),
+                     n_estimators.view(-1, 1, 1),
+                     average_logits)
+    scores = confidence(proba, criterion)
+    is_correct = (proba.argmax(dim=2) == targets.unsqueeze(0)).float()
+    best_acc = 100 * is_correct[-1].mean().item()
+
+    # The index of stage where each sample exits under each threshold. A
+    # confidence saturated to 1 still exits early with the threshold 1, so
+    # the infinite threshold is needed to run the full ensemble.
+    thresholds = torch.cat([torch.linspace(0, 1, 101, device=device),
+                            torch.tensor([float("inf")], device=device)])
+    exited = scores.unsqueeze(0) >= thresholds.view(-1, 1, 1)
+    exited[:, -1, :] = True
+    exit_idx = torch.argmax(exited.int(), dim=1)  # first stage that exits
+
+    acc = 100 * torch.gather(
+        is_correct.unsqueeze(0).expand(len(thresholds), -1, -1),
+        1,
+        exit_idx.unsqueeze(1)
+    ).squeeze(1).mean(dim=1)
+    feasible = torch.nonzero(acc >= best_acc - tolerance).view(-1)
+    selected = feasible[0]
+
+    n_used = (exit_idx[selected].float() + 1).mean().item()
+
+    return (order.tolist(),
+            thresholds[selected].item(),
+            acc[selected].item(),
+            n_used)
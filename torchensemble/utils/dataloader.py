@@ -0,0 +1,1201 @@
+"""This module collects utilities on data loaders used in Ensemble-PyTorch."""
+
+
+import copy
+import queue
+import torch
+import weakref
+import tempfile
+import threading
+import collections
+import numpy as np
+from torch.utils.data import (DataLoader, Dataset, IterableDataset,
+                              TensorDataset, Subset, ConcatDataset, Sampler,
+                              RandomSampler, SequentialSampler)
+
+
+__all__ = ["PrefetchLoader",
+           "StreamLoader",
+           "EchoLoader",
+           "TensorLoader",
+           "MemmapLoader",
+           "CachedDataset",
+           "is_array",
+           "to_tensor",
+           "make_indexed_loader",
+           "make_subset_loader",
+           "without_echo",
+           "n_samples",
+           "n_outputs",
+           "n_features",
+           "is_sparse",
+           "iter_inputs",
+           "share_memory"]
+
+
+def _apply(batch, fn):
+    """Apply `fn` on each tensor in a nested batch."""
+    if isinstance(batch, (tuple, list)):
+        return type(batch)(_apply(elem, fn) for elem in batch)
+    if isinstance(batch, dict):
+        return type(batch)((key, _apply(elem, fn))
+                           for key, elem in batch.items())
+    if isinstance(batch, torch.Tensor):
+        return fn(batch)
+
+    return batch
+
+
+def _record_stream(batch, stream):
+    """
+    Mark each CUDA tensor in a nested batch as used by `stream`, so that its
+    memory allocated on another stream is not reused before the work queued
+    on `stream` is done.
+    """
+    if isinstance(batch, (tuple, list)):
+        for elem in batch:
+            _record_stream(elem, stream)
+    elif isinstance(batch, dict):
+        for elem in batch.values():
+            _record_stream(elem, stream)
+    elif isinstance(batch, torch.Tensor) and batch.is_cuda:
+        batch.record_stream(stream)
+
+
+class StreamLoader(object):
+    """
+    Wrap a data loader on a stream of batches, e.g., a data loader on an
+    :class:`IterableDataset`, to yield ``steps_per_epoch`` batches in each
+    epoch. The stream is consumed across epochs, instead of being restarted
+    on each epoch, and it is only restarted once exhausted.
+
+    The wrapper provides the number of batches in each epoch, which is
+    required by snapshot ensemble, so that ensembles can be fitted on a
+    stream of unknown or infinite length with a budget of ``epochs *
+    steps_per_epoch`` training steps. Other attributes, e.g., ``dataset``,
+    are taken from the wrapped loader.
+
+    To avoid loading batches from the stream to count distinct classes in
+    classification, please set the attribute ``n_outputs`` or ``classes``
+    on the dataset. The position in the stream is not kept when the wrapper
+    is serialized, so please set ``persistent_workers`` or
+    ``shared_batches`` when fitting base estimators in parallel.
+
+    Parameters
+    ----------
+    loader : iterable
+        The data loader to wrap.
+    steps_per_epoch : int
+        The number of batches in each epoch.
+    """
+
+    def __init__(self, loader, steps_per_epoch):
+        if not steps_per_epoch > 0:
+            msg = ("The number of batches in each epoch should be strictly"
+                   " positive, but got {} instead.")
+            raise ValueError(msg.format(steps_per_epoch))
+
+        self.loader = loader
+        self.steps_per_epoch = steps_per_epoch
+        self._iterator = None
+
+    def __getattr__(self, name):
+        # Only called on attributes not found on the wrapper
+        if name == "loader":
+            raise AttributeError(name)
+        return getattr(self.loader, name)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_iterator"] = None  # iterators on the stream are not shared
+        return state
+
+    def __len__(self):
+        return self.steps_per_epoch
+
+    def _next_batch(self):
+        if self._iterator is not None:
+            try:
+                return next(self._iterator)
+            except StopIteration:
+                pass
+
+        self._iterator = iter(self.loader)
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._iterator = None
+            msg = "The data loader wrapped by `StreamLoader` is empty."
+            raise RuntimeError(msg)
+
+    def __iter__(self):
+        for _ in range(self.steps_per_epoch):
+            yield self._next_batch()
+
+
+class EchoLoader(object):
+    """
+    Wrap a data loader to repeat each loaded batch ``echo_factor`` times in a
+    row, known as data echoing, so that each loaded batch is used for
+    multiple training steps. It is recommended when loading the data is
+    slower than training base estimators on each batch.
+
+    Other attributes, e.g., ``dataset``, are taken from the wrapped loader,
+    and loaders returned by :func:`make_subset_loader` and
+    :func:`make_indexed_loader` on the wrapper also repeat batches. Batches
+    are not repeated when samples are evaluated instead of trained on, e.g.,
+    in the validation, the stage cache of gradient boosting and the
+    out-of-bag evaluation of bagging, see :func:`without_echo`.
+
+    Parameters
+    ----------
+    loader : iterable
+        The data loader to wrap, which yields batches of ``(data, target)``.
+    echo_factor : int
+        The number of times that each batch is used.
+    transform : callable, default=None
+        The function applied on the data of each repeated batch, e.g., cheap
+        random data augmentations on the batch. The first use of each batch
+        is not transformed.
+    """
+
+    def __init__(self, loader, echo_factor, transform=None):
+        if not (isinstance(echo_factor, int) and echo_factor >= 1):
+            msg = ("The number of times that each batch is used should be a"
+                   " positive integer, but got {} instead.")
+            raise ValueError(msg.format(echo_factor))
+
+        self.loader = loader
+        self.echo_factor = echo_factor
+        self.transform = transform
+        self.return_index = False
+
+    def __getattr__(self, name):
+        # Only called on attributes not found on the wrapper
+        if name == "loader":
+            raise AttributeError(name)
+        return getattr(self.loader, name)
+
+    def __len__(self):
+        return self.echo_factor * len(self.loader)
+
+    def _wrap(self, loader, return_index):
+        """Return the wrapper on `loader` with the same options."""
+        echo_loader = copy.copy(self)
+        echo_loader.loader = loader
+        echo_loader.return_index = return_index
+
+        return echo_loader
+
+    def _echo(self, batch):
+        if self.return_index:
+            index, (data, target) = batch
+            return index, (self.transform(data), target)
+
+        data, target = batch
+        return self.transform(data), target
+
+    def __iter__(self):
+        for batch in self.loader:
+            yield batch
+            for _ in range(self.echo_factor - 1):
+                if self.transform is None:
+                    yield batch
+                else:
+                    yield self._echo(batch)
+
+
+def is_array(X):
+    """
+    Return True if `X` is a tensor, a NumPy array, or a SciPy sparse matrix.
+    """
+    return (isinstance(X, (torch.Tensor, np.ndarray))
+            or hasattr(X, "tocsr"))
+
+
+def to_tensor(X):
+    """
+    Convert a tensor, a NumPy array, or a SciPy sparse matrix into a tensor.
+    Sparse matrices and sparse COO tensors are converted into sparse CSR
+    tensors, which are accepted by :class:`torch.nn.Linear` as the input,
+    without materializing dense features. Floating-point NumPy arrays and
+    SciPy sparse matrices, e.g., of the default ``float64``, are converted
+    into the default floating-point type of PyTorch, so that they match the
+    parameters of base estimators.
+    """
+    if isinstance(X, torch.Tensor):
+        if X.layout == torch.sparse_coo:
+            return X.to_sparse_csr()
+        return X
+
+    if hasattr(X, "tocsr"):  # SciPy sparse matrices
+        X = X.tocsr()
+        values = torch.from_numpy(X.data)
+        if values.is_floating_point():
+            values = values.to(torch.get_default_dtype())
+        return torch.sparse_csr_tensor(
+            torch.from_numpy(X.indptr.astype(np.int64)),
+            torch.from_numpy(X.indices.astype(np.int64)),
+            values,
+            size=X.shape
+        )
+
+    tensor = torch.as_tensor(X)
+    if tensor.is_floating_point():
+        tensor = tensor.to(torch.get_default_dtype())
+
+    return tensor
+
+
+def _slice_rows(tensor, start, end):
+    """Return the rows in [`start`, `end`) of a dense or sparse CSR tensor."""
+    if tensor.layout != torch.sparse_csr:
+        return tensor[start:end]
+
+    crow = tensor.crow_indices()[start:end + 1]
+    nnz_start, nnz_end = crow[0], crow[-1]
+    return torch.sparse_csr_tensor(
+        crow - nnz_start,
+        tensor.col_indices()[nnz_start:nnz_end],
+        tensor.values()[nnz_start:nnz_end],
+        size=(crow.size(0) - 1,) + tensor.size()[1:]
+    )
+
+
+def _gather_rows(tensor, index):
+    """Return the rows at `index` of a dense or sparse CSR tensor."""
+    index = index.to(tensor.device)
+    if tensor.layout != torch.sparse_csr:
+        return tensor.index_select(0, index)
+
+    # Row pointers of selected rows, and positions of their nonzeros
+    crow = tensor.crow_indices()
+    starts = crow[index]
+    lengths = crow[index + 1] - starts
+    new_crow = torch.cat([lengths.new_zeros(1), torch.cumsum(lengths, 0)])
+    nnz = int(new_crow[-1])
+    offsets = torch.repeat_interleave(starts - new_crow[:-1],
+                                      lengths,
+                                      output_size=nnz)
+    positions = torch.arange(nnz, device=crow.device) + offsets
+
+    return torch.sparse_csr_tensor(
+        new_crow,
+        tensor.col_indices()[positions],
+        tensor.values()[positions],
+        size=(index.size(0),) + tensor.size()[1:]
+    )
+
+
+class PrefetchLoader(object):
+    """
+    Wrap a data loader to load and transfer the next `n_prefetch` batches on
+    a background thread, so that the training and evaluating loops do not
+    wait on collating batches or copying them to the device.
+
+    - If `device` is None, batches are only loaded ahead of time.
+    - If `device` is a CUDA device, batches are copied from the pinned memory
+      to the device on a separate CUDA stream.
+
+    Other attributes, e.g., ``dataset`` and ``batch_size``, are taken from
+    the wrapped loader, so that the wrapper can be passed to :meth:`fit` and
+    :meth:`predict` of all ensembles in place of the wrapped loader. Loaders
+    returned by :func:`make_subset_loader` and :func:`make_indexed_loader`
+    on the wrapper also prefetch batches, and the indices of samples are
+    kept in the host memory.
+
+    Parameters
+    ----------
+    loader : iterable
+        The data loader to wrap.
+    device : str or torch.device, default=None
+        The device to copy batches to.
+    n_prefetch : int, default=2
+        The maximum number of batches loaded ahead of time.
+    """
+
+    def __init__(self, loader, device=None, n_prefetch=2):
+        if n_prefetch < 1:
+            msg = ("The number of prefetched batches should be strictly"
+                   " positive, but got {} instead.")
+            raise ValueError(msg.format(n_prefetch))
+
+        self.loader = loader
+        self.device = None if device is None else torch.device(device)
+        self.n_prefetch = n_prefetch
+        self.return_index = False
+
+    def __getattr__(self, name):
+        # Only called on attributes not found on the wrapper
+        if name == "loader":
+            raise AttributeError(name)
+        return getattr(self.loader, name)
+
+    def __len__(self):
+        return len(self.loader)
+
+    def _wrap(self, loader, return_index):
+        """Return the wrapper on `loader` with the same options."""
+        prefetch_loader = copy.copy(self)
+        prefetch_loader.loader = loader
+        prefetch_loader.return_index = return_index
+
+        return prefetch_loader
+
+    def _move(self, batch):
+        """Copy the tensors in `batch` except the indices to the device."""
+        if self.return_index:
+            index, batch = batch
+            return index, _apply(batch, self._to_device)
+
+        return _apply(batch, self._to_device)
+
+    def _to_device(self, tensor):
+        if self.device.type == "cuda" and tensor.layout == torch.strided:
+            if not tensor.is_pinned():
+                tensor = tensor.pin_memory()
+            return tensor.to(self.device, non_blocking=True)
+
+        return tensor.to(self.device)
+
+    def _produce(self, batches, stop):
+        """Load batches into the queue `batches` until `stop` is set."""
+        stream = None
+        if self.device is not None and self.device.type == "cuda":
+            stream = torch.cuda.Stream(self.device)
+
+        try:
+            for batch in self.loader:
+                if stop.is_set():
+                    return
+                event = None
+                if stream is not None:
+                    with torch.cuda.stream(stream):
+                        batch = self._move(batch)
+                        event = stream.record_event()
+                elif self.device is not None:
+                    batch = self._move(batch)
+                batches.put(("batch", batch, event))
+        except Exception as e:
+            batches.put(("error", e, None))
+        else:
+            batches.put(("end", None, None))
+
+    def __iter__(self):
+        batches = queue.Queue(maxsize=self.n_prefetch)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._produce,
+                                  args=(batches, stop),
+                                  daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                msg, batch, event = batches.get()
+                if msg == "end":
+                    break
+                elif msg == "error":
+                    raise batch
+
+                if event is not None:
+                    # Wait for the copy, and keep the memory of tensors
+                    # allocated on the side stream until they are used
+                    stream = torch.cuda.current_stream(self.device)
+                    stream.wait_event(event)
+                    _record_stream(batch, stream)
+                yield batch
+        finally:
+            # Unblock the producer if the loop stops early
+            stop.set()
+            while thread.is_alive():
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
+
+
+class _IndexLoader(object):
+    """
+    The base class of data loaders that load batches of samples at indices
+    by themselves. A loader on a subset of samples only keeps the indices of
+    the subset, and shares the data with the original loader.
+    """
+
+    def __init__(self, batch_size, shuffle, drop_last):
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.indices = None
+        self.return_index = False
+
+    def _subset(self, indices=None, return_index=False):
+        """
+        Return a loader on the samples at `indices`, used in
+        :func:`make_subset_loader` and :func:`make_indexed_loader`.
+        """
+        subset_loader = copy.copy(self)
+        if indices is not None:
+            subset_loader.indices = torch.as_tensor(indices,
+                                                    dtype=torch.int64)
+        subset_loader.return_index = return_index
+
+        return subset_loader
+
+    def _n_samples(self):
+        if self.indices is None:
+            return len(self.dataset)
+        return self.indices.size(0)
+
+    def __len__(self):
+        n_samples = self._n_samples()
+        if self.drop_last:
+            return n_samples // self.batch_size
+        return (n_samples + self.batch_size - 1) // self.batch_size
+
+    def _yield(self, index, batch):
+        if self.return_index:
+            return index, batch
+        return batch
+
+
+class TensorLoader(_IndexLoader):
+    """
+    A data loader on tensors kept in the memory of the device, which yields
+    batches by gathering rows of the tensors at the indices of each batch,
+    without calling :meth:`__getitem__` on each sample and collating them as
+    in :class:`torch.utils.data.DataLoader`. It is suited to small datasets
+    that fit in the memory of the device, e.g., tabular datasets.
+
+    The loader can be passed to all ensembles in place of a data loader on
+    a :class:`TensorDataset` of the same tensors, and batches are tuples of
+    tensors in the same order, e.g., ``(data, target)``.
+
+    Parameters
+    ----------
+    *tensors : torch.Tensor
+        Tensors with the same size of the first dimension. NumPy arrays and
+        SciPy sparse matrices are converted by :func:`to_tensor`, and rows
+        of sparse CSR tensors are gathered into sparse CSR tensors.
+    batch_size : int, default=1
+        The number of samples in each batch.
+    shuffle : bool, default=False
+        Specify whether to shuffle samples on each epoch.
+    drop_last : bool, default=False
+        Specify whether to drop the last incomplete batch.
+    device : str or torch.device, default=None
+        The device to keep the tensors on. If None, the tensors are kept on
+        their current device.
+    """
+
+    def __init__(self,
+                 *tensors,
+                 batch_size=1,
+                 shuffle=False,
+                 drop_last=False,
+                 device=None):
+        tensors = [to_tensor(tensor) for tensor in tensors]
+        if device is not None:
+            tensors = [tensor.to(device) for tensor in tensors]
+
+        super(TensorLoader, self).__init__(batch_size, shuffle, drop_last)
+        self.dataset = TensorDataset(*tensors)
+
+    @property
+    def tensors(self):
+        return self.dataset.tensors
+
+    def __iter__(self):
+        # Indices are kept in the host memory as in `make_indexed_loader`,
+        # and only copied to the device for gathering rows
+        n_samples = self._n_samples()
+        if self.shuffle:
+            order = torch.randperm(n_samples)
+            if self.indices is not None:
+                order = self.indices[order]
+        elif self.indices is not None:
+            order = self.indices
+        else:
+            order = None
+
+        for batch_idx in range(len(self)):
+            start = batch_idx * self.batch_size
+            end = min(start + self.batch_size, n_samples)
+            if order is None:
+                index = torch.arange(start, end)
+                batch = tuple(_slice_rows(tensor, start, end)
+                              for tensor in self.tensors)
+            else:
+                index = order[start:end]
+                batch = tuple(_gather_rows(tensor, index)
+                              for tensor in self.tensors)
+
+            yield self._yield(index, batch)
+
+
+class _MemmapDataset(Dataset):
+    """
+    A map-style dataset on the features and targets in ``.npy`` files, which
+    are memory-mapped in each process that loads them. Only the paths are
+    serialized, so that worker processes do not copy the data. Floating-point
+    features and targets are converted into `dtype`.
+    """
+
+    def __init__(self, X_path, y_path, dtype=None):
+        self.X_path = X_path
+        self.y_path = y_path
+        self.dtype = dtype
+        self._X = self._y = self._classes = None
+
+        if self.X.shape[0] != self.y.shape[0]:
+            msg = ("The number of samples in {} and {} should be the same,"
+                   " but got {} and {} instead.")
+            raise ValueError(msg.format(X_path, y_path,
+                                        self.X.shape[0], self.y.shape[0]))
+
+    @property
+    def X(self):
+        if self._X is None:
+            self._X = np.load(self.X_path, mmap_mode="r")
+        return self._X
+
+    @property
+    def y(self):
+        if self._y is None:
+            self._y = np.load(self.y_path, mmap_mode="r")
+        return self._y
+
+    @property
+    def classes(self):
+        """The distinct classes, counted over chunks of the targets."""
+        if self._classes is None:
+            classes = np.empty(0, dtype=self.y.dtype)
+            for start in range(0, self.y.shape[0], 1 << 20):
+                chunk = np.unique(self.y[start:start + (1 << 20)])
+                classes = np.union1d(classes, chunk)
+            self._classes = classes.tolist()
+        return self._classes
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_X"] = state["_y"] = None
+        return state
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def __getitem__(self, index):
+        return self.read(index)
+
+    def _to_tensor(self, array):
+        tensor = torch.from_numpy(np.array(array))
+        if tensor.is_floating_point():
+            dtype = self.dtype
+            if dtype is None:
+                dtype = torch.get_default_dtype()
+            tensor = tensor.to(dtype)
+
+        return tensor
+
+    def read(self, rows):
+        """Return the features and targets at `rows` as tensors."""
+        return self._to_tensor(self.X[rows]), self._to_tensor(self.y[rows])
+
+
+class MemmapLoader(_IndexLoader):
+    """
+    A data loader on the features and targets in ``.npy`` files, e.g., saved
+    by :func:`numpy.save`, which are memory-mapped instead of being loaded
+    into the memory. It is suited to tabular datasets larger than the memory.
+
+    Samples are read in chunks of ``chunk_size`` consecutive rows, so that
+    the files are read sequentially. When ``shuffle`` is ``True``, the order
+    of chunks and the order of samples within each chunk are shuffled on
+    each epoch, instead of shuffling all samples.
+
+    The loader can be passed to all ensembles in place of a data loader, and
+    batches are tuples ``(data, target)`` of tensors. Floating-point features
+    and targets, e.g., in ``float64`` as saved from NumPy by default, are
+    converted into ``dtype``, and other data types are kept as in the files.
+
+    Parameters
+    ----------
+    X_path : str
+        The path to the ``.npy`` file of features, with samples in the first
+        dimension.
+    y_path : str
+        The path to the ``.npy`` file of targets, with samples in the first
+        dimension.
+    batch_size : int, default=1
+        The number of samples in each batch.
+    shuffle : bool, default=False
+        Specify whether to shuffle samples on each epoch.
+    chunk_size : int, default=None
+        The number of consecutive rows read at once. If ``None``, it is 64
+        times of ``batch_size``.
+    drop_last : bool, default=False
+        Specify whether to drop the last incomplete batch.
+    dtype : torch.dtype, default=None
+        The data type of floating-point features and targets in batches. If
+        ``None``, the default floating-point type of PyTorch is used.
+    """
+
+    def __init__(self,
+                 X_path,
+                 y_path,
+                 batch_size=1,
+                 shuffle=False,
+                 chunk_size=None,
+                 drop_last=False,
+                 dtype=None):
+        super(MemmapLoader, self).__init__(batch_size, shuffle, drop_last)
+        self.dataset = _MemmapDataset(X_path, y_path, dtype)
+        if chunk_size is None:
+            chunk_size = 64 * batch_size
+        self.chunk_size = chunk_size
+
+    def _subset(self, indices=None, return_index=False):
+        subset_loader = super(MemmapLoader, self)._subset(indices,
+                                                          return_index)
+        if indices is not None:
+            # Sorted indices keep reading each chunk sequential
+            subset_loader.indices, _ = torch.sort(subset_loader.indices)
+
+        return subset_loader
+
+    def _read_chunk(self, start, end):
+        if self.indices is None:
+            index = torch.arange(start, end)
+            data, target = self.dataset.read(slice(start, end))
+        else:
+            index = self.indices[start:end]
+            data, target = self.dataset.read(index.numpy())
+
+        return index, data, target
+
+    def __iter__(self):
+        n_samples = self._n_samples()
+        starts = torch.arange(0, n_samples, self.chunk_size)
+        if self.shuffle:
+            starts = starts[torch.randperm(starts.size(0))]
+
+        # Samples left over from the previous chunk, which are loaded in the
+        # next batch to keep all batches except the last one full
+        carry = None
+        for start in starts.tolist():
+            end = min(start + self.chunk_size, n_samples)
+            chunk = self._read_chunk(start, end)
+            if carry is not None:
+                chunk = [torch.cat([prev, elem])
+                         for prev, elem in zip(carry, chunk)]
+            if self.shuffle:
+                order = torch.randperm(chunk[0].size(0))
+                chunk = [elem[order] for elem in chunk]
+
+            n_full = chunk[0].size(0) // self.batch_size * self.batch_size
+            for batch_start in range(0, n_full, self.batch_size):
+                batch_end = batch_start + self.batch_size
+                index, data, target = (elem[batch_start:batch_end]
+                                       for elem in chunk)
+                yield self._yield(index, (data, target))
+            carry = [elem[n_full:] for elem in chunk]
+
+        if (carry is not None
+                and carry[0].size(0) > 0
+                and not self.drop_last):
+            index, data, target = carry
+            yield self._yield(index, (data, target))
+
+
+class CachedDataset(Dataset):
+    """
+    Wrap a map-style dataset to cache its samples, so that expensive steps
+    on loading samples, e.g., decoding images, are not repeated on each
+    epoch and for each base estimator. Only ``transform``, e.g., cheap random
+    data augmentations, is applied on each access.
+
+    Cached samples are kept in the memory, or in a memory-mapped file when
+    ``cache_dir`` is given, and the least recently used sample is evicted
+    once ``cache_size`` samples are cached. Each process keeps its own cache,
+    and the cache is not serialized, so please set ``num_workers=0`` or
+    ``persistent_workers=True`` in :class:`torch.utils.data.DataLoader`, and
+    set ``persistent_workers`` or ``shared_batches`` when fitting base
+    estimators in parallel.
+
+    Parameters
+    ----------
+    dataset : torch.utils.data.Dataset
+        The map-style dataset to wrap, which returns ``(data, target)``
+        before random data augmentations.
+    transform : callable, default=None
+        The function applied on the cached data on each access. It should
+        not modify the data in-place.
+    cache_size : int, default=None
+        The maximum number of cached samples. If ``None``, all samples are
+        cached.
+    cache_dir : str, default=None
+        The directory of the memory-mapped file that keeps the cached data,
+        which should be tensors or NumPy arrays with the same shape and data
+        type. If ``None``, cached samples are kept in the memory.
+    """
+
+    def __init__(self,
+                 dataset,
+                 transform=None,
+                 cache_size=None,
+                 cache_dir=None):
+        if cache_size is not None and not cache_size > 0:
+            msg = ("The maximum number of cached samples should be strictly"
+                   " positive, but got {} instead.")
+            raise ValueError(msg.format(cache_size))
+
+        self.dataset = dataset
+        self.transform = transform
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        for name in ("classes", "n_outputs"):
+            if hasattr(dataset, name):
+                setattr(self, name, getattr(dataset, name))
+        self._reset()
+
+    def _reset(self):
+        # Map the index of each cached sample to the sample, or to its slot
+        # in the memory-mapped file, in the order of recent use
+        self._cache = collections.OrderedDict()
+        self._shard = None
+        self._free_slots = []
+        self.hits = self.misses = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ("_cache", "_shard", "_free_slots", "hits", "misses"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def _capacity(self):
+        if self.cache_size is None:
+            return len(self.dataset)
+        return min(self.cache_size, len(self.dataset))
+
+    def _open_shard(self, data):
+        if not isinstance(data, (torch.Tensor, np.ndarray)):
+            msg = ("Caching samples in a memory-mapped file requires tensors"
+                   " or NumPy arrays, but got {} instead.")
+            raise ValueError(msg.format(type(data)))
+
+        data = np.asarray(data)
+        self._shard = np.memmap(tempfile.TemporaryFile(dir=self.cache_dir),
+                                dtype=data.dtype,
+                                mode="w+",
+                                shape=(self._capacity(),) + data.shape)
+        self._free_slots = list(range(self._capacity() - 1, -1, -1))
+
+    def _store(self, index, data, target):
+        if len(self._cache) >= self._capacity():
+            _, entry = self._cache.popitem(last=False)
+            if self.cache_dir is not None:
+                self._free_slots.append(entry[0])
+
+        if self.cache_dir is None:
+            self._cache[index] = (data, target)
+        else:
+            if self._shard is None:
+                self._open_shard(data)
+            slot = self._free_slots.pop()
+            self._shard[slot] = np.asarray(data)
+            self._cache[index] = (slot, target)
+
+    def _load(self, index):
+        """Return the cached sample at `index`, or load and cache it."""
+        if index not in self._cache:
+            self.misses += 1
+            data, target = self.dataset[index]
+            self._store(index, data, target)
+            if self.cache_dir is not None:
+                data = torch.as_tensor(data)
+            return data, target
+
+        self.hits += 1
+        self._cache.move_to_end(index)
+        data, target = self._cache[index]
+        if self.cache_dir is not None:
+            data = torch.from_numpy(np.array(self._shard[data]))
+
+        return data, target
+
+    def __getitem__(self, index):
+        data, target = self._load(index)
+        if self.transform is not None:
+            data = self.transform(data)
+
+        return data, target
+
+
+class _IndexedDataset(Dataset):
+    """Wrap a map-style dataset to also return the index of each sample."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        return index, self.dataset[index]
+
+
+class _IndexedCollate(object):
+    """Collate indices and samples returned by `_IndexedDataset` separately."""
+
+    def __init__(self, collate_fn):
+        self.collate_fn = collate_fn
+
+    def __call__(self, batch):
+        index = torch.tensor([idx for idx, _ in batch], dtype=torch.int64)
+        samples = self.collate_fn([sample for _, sample in batch])
+
+        return index, samples
+
+
+class _TensorSampler(Sampler):
+    """
+    Yield the indices in an int64 tensor, in a random order on each epoch if
+    `shuffle` is True. Indices are converted into Python integers in chunks,
+    so that the whole tensor is never copied into a list.
+    """
+
+    def __init__(self, indices, shuffle=False, generator=None):
+        self.indices = indices
+        self.shuffle = shuffle
+        self.generator = generator
+
+    def __len__(self):
+        return self.indices.size(0)
+
+    def __iter__(self):
+        indices = self.indices
+        if self.shuffle:
+            order = torch.randperm(indices.size(0), generator=self.generator)
+            indices = indices[order]
+
+        for chunk in torch.split(indices, 1 << 16):
+            yield from chunk.tolist()
+
+
+def _loader_kwargs(loader):
+    """
+    Return keyword arguments on workers, memory and random states of the
+    data loader, which are kept by data loaders rebuilt from it.
+    """
+    return {"num_workers": loader.num_workers,
+            "pin_memory": loader.pin_memory,
+            "timeout": loader.timeout,
+            "worker_init_fn": loader.worker_init_fn,
+            "multiprocessing_context": loader.multiprocessing_context,
+            "generator": loader.generator,
+            "prefetch_factor": loader.prefetch_factor,
+            "persistent_workers": loader.persistent_workers}
+
+
+def make_indexed_loader(loader):
+    """
+    Return a data loader with the same sampling and batching strategy as
+    `loader`, which additionally returns the indices of samples in each
+    batch, i.e., ``(index, (data, target))``. The dataset of `loader` should
+    be a map-style dataset so that the indices of samples are stable.
+    """
+    if isinstance(loader, _IndexLoader):
+        return loader._subset(return_index=True)
+    if isinstance(loader, (EchoLoader, PrefetchLoader)):
+        return loader._wrap(make_indexed_loader(loader.loader), True)
+
+    if (isinstance(loader.dataset, IterableDataset)
+            or loader.batch_sampler is None):
+        msg = ("The indices of samples are only available for data loaders"
+               " on map-style datasets with automatic batching.")
+        raise ValueError(msg)
+
+    indexed_loader = DataLoader(_IndexedDataset(loader.dataset),
+                                batch_sampler=loader.batch_sampler,
+                                collate_fn=_IndexedCollate(loader.collate_fn),
+                                **_loader_kwargs(loader))
+
+    return indexed_loader
+
+
+def make_subset_loader(loader, indices, return_index=False):
+    """
+    Return a data loader on the samples at `indices` of the dataset of
+    `loader`, with the same batch size, collate function and workers as
+    `loader`. Duplicated indices are loaded multiple times, and samples are
+    shuffled on each epoch if `loader` shuffles samples. If `return_index` is
+    True, batches are in the form of ``(index, (data, target))`` as in
+    :func:`make_indexed_loader`.
+
+    The sampler of `loader` should load samples in order, or shuffle them
+    without replacement as with ``shuffle=True``, since other samplers,
+    e.g., weighted or distributed samplers, cannot be restricted to
+    `indices`.
+    """
+    if isinstance(loader, _IndexLoader):
+        return loader._subset(indices, return_index)
+    if isinstance(loader, (EchoLoader, PrefetchLoader)):
+        return loader._wrap(
+            make_subset_loader(loader.loader, indices, return_index),
+            return_index
+        )
+
+    if (isinstance(loader.dataset, IterableDataset)
+            or loader.batch_size is None):
+        msg = ("The subset of samples is only available for data loaders on"
+               " map-style datasets with the argument `batch_size`.")
+        raise ValueError(msg)
+
+    indices = torch.as_tensor(indices, dtype=torch.int64)
+    if isinstance(loader.sampler, SequentialSampler):
+        sampler = _TensorSampler(indices)
+    elif (type(loader.sampler) is RandomSampler
+          and not loader.sampler.replacement
+          and loader.sampler.num_samples == len(loader.dataset)):
+        sampler = _TensorSampler(indices, True, loader.sampler.generator)
+    else:
+        msg = ("The subset of samples is only available for data loaders"
+               " with the sequential sampler or the random sampler without"
+               " replacement, but got {} instead.")
+        raise ValueError(msg.format(type(loader.sampler).__name__))
+
+    dataset, collate_fn = loader.dataset, loader.collate_fn
+    if return_index:
+        dataset = _IndexedDataset(dataset)
+        collate_fn = _IndexedCollate(collate_fn)
+
+    subset_loader = DataLoader(dataset,
+                               batch_size=loader.batch_size,
+                               sampler=sampler,
+                               drop_last=loader.drop_last,
+                               collate_fn=collate_fn,
+                               **_loader_kwargs(loader))
+
+    return subset_loader
+
+
+def without_echo(loader):
+    """
+    Return `loader` without data echoing, i.e., the data loader wrapped by
+    :class:`EchoLoader`, including that wrapped by :class:`PrefetchLoader`,
+    so that each sample is loaded once without the transform on repeated
+    batches. It is used when samples are evaluated instead of trained on.
+    """
+    if isinstance(loader, EchoLoader):
+        return without_echo(loader.loader)
+    if isinstance(loader, PrefetchLoader):
+        return loader._wrap(without_echo(loader.loader), loader.return_index)
+
+    return loader
+
+
+def n_samples(X):
+    """
+    Return the number of samples in a tensor, a NumPy array, or a data loader
+    on a sized dataset. Return None if the number of samples is unknown.
+    """
+    if is_array(X):
+        return X.shape[0]
+
+    try:
+        return len(X.dataset)
+    except (AttributeError, TypeError):
+        return None
+
+
+# The number of outputs counted by iterating over each dataset, shared by all
+# ensembles
+_N_OUTPUTS_CACHE = weakref.WeakKeyDictionary()
+
+
+def _tensor_targets(dataset):
+    """
+    Return the tensor of targets in a :class:`TensorDataset` of ``(data,
+    target)``, including that wrapped by :class:`Subset`, or None otherwise.
+    """
+    if isinstance(dataset, Subset):
+        targets = _tensor_targets(dataset.dataset)
+        if targets is None:
+            return None
+        return targets[torch.as_tensor(dataset.indices, dtype=torch.int64)]
+
+    if isinstance(dataset, TensorDataset) and len(dataset.tensors) == 2:
+        return dataset.tensors[1]
+
+    return None
+
+
+def _count_outputs(targets, is_classification):
+    """Decide the number of outputs from the tensor of targets."""
+    if is_classification:
+        return torch.unique(targets).size(0)
+    elif targets.dim() == 1:
+        return 1
+    else:
+        return targets.size(1)
+
+
+def _iterate_outputs(loader, is_classification):
+    """Decide the number of outputs from the targets over batches."""
+    if not is_classification:
+        # The first batch is enough to get the shape of targets
+        for _, (_, target) in enumerate(loader):
+            return _count_outputs(target, is_classification)
+
+    # Only keep the distinct classes seen so far
+    targets = torch.empty(0, dtype=torch.int64)
+    for _, (_, target) in enumerate(loader):
+        targets = torch.unique(torch.cat([targets.to(target),
+                                          torch.unique(target)]))
+
+    return _count_outputs(targets, is_classification)
+
+
+def n_outputs(loader, is_classification=True):
+    """
+    Return the number of outputs of the training data in `loader`, that is,
+    the number of distinct classes in classification, or the number of target
+    variables in regression.
+
+    The number of outputs is taken from the attribute ``n_outputs`` of the
+    loader or the dataset if available, then from the attribute ``classes``
+    of the dataset or the targets in :class:`TensorDataset`, and finally
+    from the distinct targets over all batches, which only keeps the
+    distinct classes in memory. Only the result of iterating over batches is
+    cached for each dataset, so that ensembles fitted on the same dataset do
+    not iterate over it again. Please set the attribute ``n_outputs`` after
+    changing the targets of such a dataset in place.
+    """
+    for obj in (loader, loader.dataset):
+        if getattr(obj, "n_outputs", None) is not None:
+            return obj.n_outputs
+
+    dataset = loader.dataset
+    if is_classification and hasattr(dataset, "classes"):
+        return len(dataset.classes)
+
+    targets = _tensor_targets(dataset)
+    if targets is not None:
+        return _count_outputs(targets, is_classification)
+
+    try:
+        cache = _N_OUTPUTS_CACHE.setdefault(dataset, {})
+    except TypeError:  # the dataset does not support weak references
+        cache = {}
+
+    if is_classification not in cache:
+        cache[is_classification] = _iterate_outputs(loader, is_classification)
+
+    return cache[is_classification]
+
+
+def _tensor_data(dataset):
+    """
+    Return the tensor of input data in a :class:`TensorDataset`, including
+    that wrapped by :class:`Subset`, or None otherwise. The tensor is not
+    indexed by :class:`Subset`, and it is only used for the shape of samples
+    and the layout.
+    """
+    if isinstance(dataset, Subset):
+        return _tensor_data(dataset.dataset)
+
+    if isinstance(dataset, TensorDataset):
+        return dataset.tensors[0]
+
+    return None
+
+
+def n_features(loader):
+    """
+    Return the number of features in `loader`, that is, the size of the
+    second dimension of input data, without loading batches. It is taken from
+    the attribute ``n_features`` of the dataset if available, otherwise from
+    the tensor of input data in :class:`TensorDataset`, and finally from the
+    first sample of a map-style dataset.
+    """
+    dataset = loader.dataset
+    if hasattr(dataset, "n_features"):
+        return dataset.n_features
+
+    data = _tensor_data(dataset)
+    if data is not None:
+        return data.size(1)
+
+    if isinstance(dataset, IterableDataset):
+        msg = ("The number of features on an iterable-style dataset requires"
+               " the attribute `n_features` of the dataset.")
+        raise ValueError(msg)
+
+    data, _ = dataset[0]
+    return torch.as_tensor(data).size(0)
+
+
+def is_sparse(loader):
+    """
+    Return True if the input data in `loader` are sparse CSR tensors, e.g.,
+    in :class:`TensorLoader` on a sparse tensor or a SciPy sparse matrix.
+    """
+    data = _tensor_data(loader.dataset)
+    return data is not None and data.layout == torch.sparse_csr
+
+
+def iter_inputs(X, batch_size):
+    """
+    Yield batches of input data from a tensor, a NumPy array, a SciPy sparse
+    matrix, or a data loader. For data loaders, the first element of each
+    batch is taken as the input data if the batch is a tuple or list, e.g.,
+    ``(data, target)``.
+    """
+    if is_array(X):
+        if isinstance(X, torch.Tensor):
+            # Sparse COO tensors are only converted into CSR tensors once
+            X = to_tensor(X)
+        for start in range(0, X.shape[0], batch_size):
+            if isinstance(X, torch.Tensor):
+                yield _slice_rows(X, start, start + batch_size)
+            else:
+                yield to_tensor(X[start:start+batch_size])
+        return
+
+    for elem in X:
+        if isinstance(elem, (tuple, list)):
+            elem = elem[0]
+        yield elem
+
+
+def share_memory(loader):
+    """
+    Move the tensors in the dataset of `loader` to the shared memory in-place,
+    so that worker processes attach to them without copying the dataset.
+    Tensors in :class:`TensorDataset` are supported, including those wrapped
+    by :class:`Subset` and :class:`ConcatDataset`. Other datasets are left
+    unchanged. Return the number of bytes in the shared memory.
+    """
+    nbytes = 0
+    datasets = [getattr(loader, "dataset", loader)]
+    while datasets:
+        dataset = datasets.pop()
+        if isinstance(dataset, TensorDataset):
+            for tensor in dataset.tensors:
+                if (tensor.device.type == "cpu"
+                        and tensor.layout == torch.strided):
+                    tensor.share_memory_()
+                    nbytes += tensor.element_size() * tensor.nelement()
+        elif isinstance(dataset, (Subset, _IndexedDataset)):
+            datasets.append(dataset.dataset)
+        elif isinstance(dataset, ConcatDataset):
+            datasets.extend(dataset.datasets)
+
+    return nbytes
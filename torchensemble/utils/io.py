@@ -1,5 +1,7 @@
 import os
 import torch
+import tempfile
+import numpy as np
 
 
 def save(model, save_dir, logger):
@@ -10,12 +12,9 @@ def save(model, save_dir, logger):
     if not os.path.isdir(save_dir):
         os.mkdir(save_dir)
 
-    # {Ensemble_Method_Name}_{Base_Estimator_Name}_{n_estimators}
-    filename = "{}_{}_{}_ckpt.pth".format(type(model).__name__,
-                                          model.base_estimator_.__name__,
-                                          model.n_estimators)
-    state = {"model": model.state_dict()}
-    save_dir = os.path.join(save_dir, filename)
+    state = {"n_estimators": len(model.estimators_),
+             "model": model.state_dict()}
+    save_dir = os.path.join(save_dir, _filename(model))
 
     logger.info("Saving the model to `{}`".format(save_dir))
 
@@ -23,3 +22,58 @@ def save(model, save_dir, logger):
     torch.save(state, save_dir)
 
     return
+
+
+def load(model, save_dir=None, logger=None):
+    """
+    Implement model deserialization from the specified directory, where the
+    model is saved by :func:`save`. Fitted attributes kept in the extra state
+    of the model, e.g., the number of outputs, are restored before base
+    estimators are made, and base estimators are loaded afterwards.
+    """
+    if save_dir is None:
+        save_dir = "./"
+
+    save_dir = os.path.join(save_dir, _filename(model))
+    if not os.path.exists(save_dir):
+        msg = "The saved model `{}` does not exist."
+        raise FileNotFoundError(msg.format(save_dir))
+
+    if logger is not None:
+        logger.info("Loading the model from `{}`".format(save_dir))
+
+    state = torch.load(save_dir, map_location=model.device)
+    model_params = state["model"]
+    if "_extra_state" in model_params:
+        model.set_extra_state(model_params["_extra_state"])
+
+    # Pre-allocate base estimators before loading their parameters
+    model.unstack_estimators()
+    model.estimators_ = torch.nn.ModuleList()
+    for _ in range(state["n_estimators"]):
+        model.estimators_.append(model._make_estimator())
+    model.load_state_dict(model_params)
+
+    return
+
+
+def _filename(model):
+    # {Ensemble_Method_Name}_{Base_Estimator_Name}_{n_estimators}
+    return "{}_{}_{}_ckpt.pth".format(type(model).__name__,
+                                      model.base_estimator_.__name__,
+                                      model.n_estimators)
+
+
+def zeros(shape, on_disk=False):
+    """
+    Return a zero-initialized float tensor with the specified shape. If
+    `on_disk` is True, the tensor is backed by a memory-mapped temporary file
+    instead of the main memory.
+    """
+    if not on_disk:
+        return torch.zeros(shape)
+
+    with tempfile.TemporaryFile() as f:
+        array = np.memmap(f, dtype=np.float32, mode="w+", shape=tuple(shape))
+
+    return torch.from_numpy(array)
@@ -13,15 +13,25 @@ __all__ = ["average",
 
 
 def average(outputs):
-    """Compute the average over a list of tensors with the same size."""
+    """
+    Compute the average over a list of tensors with the same size, or over
+    the first dimension of a stacked tensor.
+    """
+    if isinstance(outputs, torch.Tensor):
+        return outputs.mean(dim=0)
+
     return sum(outputs) / len(outputs)
 
 
 def sum_with_multiplicative(outputs, factor):
     """
-    Compuate the summation on a list of tensors, and the result is multiplied
-    by a multiplicative factor.
+    Compuate the summation on a list of tensors (or over the first dimension
+    of a stacked tensor), and the result is multiplied by a multiplicative
+    factor.
     """
+    if isinstance(outputs, torch.Tensor):
+        return factor * outputs.sum(dim=0)
+
     return factor * sum(outputs)
 
 
@@ -0,0 +1,334 @@
+"""
+This module collects the pool of persistent worker processes used to fit
+base estimators in parallel. Each worker owns a subset of base estimators
+and their optimizers for the whole training stage, and only receives small
+control messages on each epoch.
+"""
+
+
+import queue
+import traceback
+import torch
+import torch.multiprocessing as mp
+from joblib import effective_n_jobs
+
+from . import dataloader
+
+
+__all__ = ["WorkerPool"]
+
+
+def _flatten(batch):
+    """Return the tensors in a batch and the nested structure of the batch."""
+    if isinstance(batch, (tuple, list)):
+        tensors, structure = [], []
+        for elem in batch:
+            elem_tensors, elem_structure = _flatten(elem)
+            tensors.extend(elem_tensors)
+            structure.append(elem_structure)
+        return tensors, tuple(structure)
+
+    return [batch], None
+
+
+def _unflatten(tensors, structure):
+    """Restore a batch from its tensors and its nested structure."""
+    tensors = iter(tensors)
+
+    def _build(structure):
+        if structure is None:
+            return next(tensors)
+        return tuple(_build(elem) for elem in structure)
+
+    return _build(structure)
+
+
+class _BatchRing(object):
+    """
+    A ring buffer of batches in the shared memory, written by a producer in
+    the main process and read by all workers.
+
+    Each slot keeps one tensor for each element of the batch, e.g., the data
+    and the target, and nested batches are flattened. A slot is written only
+    after all workers have released it. Tensors of a slot are sent to workers
+    only when the slot is allocated, otherwise workers only receive the index
+    of the slot and the size of the batch.
+    """
+
+    def __init__(self, ctx, n_consumers, n_slots):
+        self.n_consumers = n_consumers
+        self.n_slots = n_slots
+        self.queues = [ctx.Queue() for _ in range(n_consumers)]
+        self.release_queue = ctx.Queue()
+        self._slots = [None] * n_slots
+        self._pending = [0] * n_slots
+
+    def reader(self, consumer_idx):
+        return _RingReader(self.queues[consumer_idx], self.release_queue)
+
+    def _allocate(self, slot, batch):
+        tensors = self._slots[slot]
+        if tensors is not None and all(
+                t.dtype == b.dtype
+                and t.shape[1:] == b.shape[1:]
+                and t.size(0) >= b.size(0)
+                for t, b in zip(tensors, batch)):
+            return False
+
+        self._slots[slot] = [b.new_empty(b.shape).share_memory_()
+                             for b in batch]
+        return True
+
+    def _wait(self, slot, processes):
+        """Wait until all workers have released the slot."""
+        while self._pending[slot] > 0:
+            try:
+                released = self.release_queue.get(timeout=1.)
+            except queue.Empty:
+                if not all(process.is_alive() for process in processes):
+                    msg = "A worker exited unexpectedly."
+                    raise RuntimeError(msg)
+                continue
+            self._pending[released] -= 1
+
+    def produce(self, loader, processes):
+        """Write all batches from `loader` into the ring buffer."""
+        try:
+            for batch_idx, batch in enumerate(loader):
+                batch, structure = _flatten(batch)
+                slot = batch_idx % self.n_slots
+                self._wait(slot, processes)
+
+                is_allocated = self._allocate(slot, batch)
+                batch_size = batch[0].size(0)
+                for tensor, elem in zip(self._slots[slot], batch):
+                    tensor[:batch_size].copy_(elem)
+
+                tensors = self._slots[slot] if is_allocated else None
+                for q in self.queues:
+                    q.put(("batch", slot, batch_size, structure, tensors))
+                self._pending[slot] = self.n_consumers
+        finally:
+            # Workers always stop reading at the end of each epoch
+            for q in self.queues:
+                q.put(("end", None, None, None, None))
+
+        for slot in range(self.n_slots):
+            self._wait(slot, processes)
+
+
+class _RingReader(object):
+    """The iterable over batches in :class:`_BatchRing` used by a worker."""
+
+    def __init__(self, batch_queue, release_queue):
+        self.batch_queue = batch_queue
+        self.release_queue = release_queue
+        self._slots = {}
+        self._exhausted = True
+
+    def start_epoch(self):
+        self._exhausted = False
+
+    def __iter__(self):
+        while True:
+            msg, slot, batch_size, structure, tensors = self.batch_queue.get()
+            if msg == "end":
+                self._exhausted = True
+                return
+            if tensors is not None:
+                self._slots[slot] = tensors
+            try:
+                yield _unflatten([tensor[:batch_size]
+                                  for tensor in self._slots[slot]],
+                                 structure)
+            finally:
+                self.release_queue.put(slot)
+
+    def drain(self):
+        """Release all remaining batches in the current epoch."""
+        if self._exhausted:
+            return
+        for _ in self:
+            pass
+
+
+def _worker_loop(conn,
+                 estimators,
+                 optimizers,
+                 indices,
+                 fit_fn,
+                 loader,
+                 n_threads):
+    """The main loop of a worker process."""
+    # Workers share the CPU cores instead of each using all of them
+    torch.set_num_threads(n_threads)
+
+    while True:
+        msg = conn.recv()
+        if msg[0] == "close":
+            break
+
+        _, epoch, cur_lr = msg
+        if isinstance(loader, _RingReader):
+            loader.start_epoch()
+        try:
+            fit_fn(estimators, optimizers, indices, cur_lr, epoch, loader)
+        except Exception:
+            if isinstance(loader, _RingReader):
+                loader.drain()
+            conn.send(("error", traceback.format_exc()))
+        else:
+            conn.send(("done", None))
+
+    conn.close()
+
+
+class WorkerPool(object):
+    """
+    A pool of persistent worker processes that fit base estimators in
+    parallel.
+
+    Base estimators are distributed to workers in a round-robin manner, and
+    their parameters and buffers, along with the training data, are moved to
+    the shared memory before workers are started. The CPU cores are evenly
+    divided among workers for their intra-op thread pools. Workers update
+    base estimators in-place, so that the latest base estimators are
+    available in the main process after each call on :meth:`fit`, without
+    serializing them back. The states of optimizers are owned by workers.
+
+    Parameters
+    ----------
+    estimators : list
+        The list of base estimators.
+    optimizers : list
+        The list of optimizers, one for each base estimator.
+    fit_fn : callable
+        The function used to fit base estimators owned by a worker for one
+        epoch, called as ``fit_fn(estimators, optimizers, indices, cur_lr,
+        epoch, train_loader)``, where ``indices`` are the indices of base
+        estimators owned by the worker. It should be picklable if the
+        ``spawn`` start method is used.
+    train_loader : torch.utils.data.DataLoader
+        The data loader that contains the training data.
+    n_jobs : int, default=None
+        The number of workers, following the convention of :mod:`joblib`.
+    broadcast : bool, default=False
+        Specify how workers load the training data.
+
+        - If ``False``, each worker iterates over ``train_loader``, and
+          tensors in its dataset are moved to the shared memory, so that
+          workers attach to the same copy of training data.
+        - If ``True``, ``train_loader`` is only iterated in the main process,
+          and each batch is written into a ring buffer in the shared memory
+          that is read by all workers.
+    n_slots : int, default=4
+        The number of batches in the ring buffer when ``broadcast`` is
+        ``True``.
+    """
+
+    def __init__(self,
+                 estimators,
+                 optimizers,
+                 fit_fn,
+                 train_loader,
+                 n_jobs=None,
+                 broadcast=False,
+                 n_slots=4):
+        self.estimators = estimators
+        self.optimizers = optimizers
+        self.fit_fn = fit_fn
+        self.train_loader = train_loader
+        self.broadcast = broadcast
+        self.n_slots = n_slots
+        self.n_workers = min(len(estimators), effective_n_jobs(n_jobs))
+        self._ring = None
+        self._conns = []
+        self._processes = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _get_context(self):
+        # CUDA cannot be re-initialized in a forked process
+        is_cuda = any(param.is_cuda for estimator in self.estimators
+                      for param in estimator.parameters())
+        if is_cuda:
+            return mp.get_context("spawn")
+        return mp.get_context()
+
+    def start(self):
+        """
+        Move base estimators and the training data to the shared memory, and
+        start workers.
+        """
+        ctx = self._get_context()
+        for estimator in self.estimators:
+            estimator.share_memory()
+
+        if self.broadcast:
+            self._ring = _BatchRing(ctx, self.n_workers, self.n_slots)
+        else:
+            dataloader.share_memory(self.train_loader)
+
+        n_threads = max(1, mp.cpu_count() // self.n_workers)
+        for worker_idx in range(self.n_workers):
+            indices = list(range(worker_idx,
+                                 len(self.estimators),
+                                 self.n_workers))
+            if self.broadcast:
+                loader = self._ring.reader(worker_idx)
+            else:
+                loader = self.train_loader
+
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker_loop,
+                args=(child_conn,
+                      [self.estimators[idx] for idx in indices],
+                      [self.optimizers[idx] for idx in indices],
+                      indices,
+                      self.fit_fn,
+                      loader,
+                      n_threads),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+    def fit(self, epoch, cur_lr=None):
+        """Fit all base estimators for one epoch and wait for workers."""
+        for conn in self._conns:
+            conn.send(("fit", epoch, cur_lr))
+
+        if self.broadcast:
+            self._ring.produce(self.train_loader, self._processes)
+
+        errors = []
+        for conn in self._conns:
+            status, info = conn.recv()
+            if status == "error":
+                errors.append(info)
+
+        if errors:
+            msg = "Fitting base estimators failed in a worker:\n{}"
+            raise RuntimeError(msg.format(errors[0]))
+
+    def close(self):
+        """Stop all workers."""
+        for conn, process in zip(self._conns, self._processes):
+            try:
+                conn.send(("close",))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+
+        self._conns, self._processes = [], []
@@ -0,0 +1,142 @@
+"""
+This module collects operations on evaluating base estimators with the same
+architecture in one vectorized call, using the stacked parameters of all
+base estimators.
+"""
+
+
+import copy
+import torch
+from torch.nn.modules.batchnorm import _BatchNorm
+
+try:
+    from torch.func import functional_call, stack_module_state, vmap
+except ImportError:  # PyTorch < 2.0
+    functional_call = stack_module_state = vmap = None
+
+
+__all__ = ["StackedEstimators",
+           "stack_for_training",
+           "stacked_loss"]
+
+
+class StackedEstimators(object):
+    """
+    A container on the stacked parameters and buffers of base estimators.
+
+    All base estimators should be instances of the same class instantiated
+    with the same arguments, which always holds for base estimators created
+    by an ensemble. Calling the container returns the outputs of all base
+    estimators stacked along a new leading dimension, that is, a tensor of
+    shape ``(n_estimators, batch_size, ...)``.
+
+    Parameters of the container are copies of the parameters of base
+    estimators. Changes on either side are not synchronized unless
+    :meth:`unstack` is called explicitly.
+    """
+
+    def __init__(self, estimators):
+        if vmap is None:
+            msg = ("Stacking base estimators requires `torch.func`, which is"
+                   " only available in PyTorch >= 2.0, but got {} instead.")
+            raise RuntimeError(msg.format(torch.__version__))
+
+        estimators = list(estimators)
+        if len(estimators) == 0:
+            msg = "There is no base estimator to stack."
+            raise ValueError(msg)
+
+        if len(set(type(estimator) for estimator in estimators)) > 1:
+            msg = "All base estimators should be instances of the same class."
+            raise ValueError(msg)
+
+        params, buffers = stack_module_state(estimators)
+
+        self.n_estimators = len(estimators)
+        self.param_names = list(params.keys())
+        self.params = list(params.values())
+        self.buffer_names = list(buffers.keys())
+        self.buffers = list(buffers.values())
+        self.training = estimators[0].training
+
+        # A stateless copy of the base estimator that only keeps the
+        # architecture, parameters are passed when calling it.
+        self._skeleton = copy.deepcopy(estimators[0]).to("meta")
+
+    def __len__(self):
+        return self.n_estimators
+
+    def __call__(self, x):
+        return self.forward(x)
+
+    def forward(self, x):
+        """Return the stacked outputs of all base estimators on ``x``."""
+        params = dict(zip(self.param_names, self.params))
+        buffers = dict(zip(self.buffer_names, self.buffers))
+        self._skeleton.train(self.training)
+
+        def _call(params, buffers, x):
+            return functional_call(self._skeleton, (params, buffers), (x,))
+
+        return vmap(_call,
+                    in_dims=(0, 0, None),
+                    randomness="different")(params, buffers, x)
+
+    def parameters(self):
+        """Return the stacked parameters, used to set the optimizer."""
+        return iter(self.params)
+
+    def train(self, mode=True):
+        self.training = mode
+        return self
+
+    def eval(self):
+        return self.train(False)
+
+    def unstack(self, estimators):
+        """Copy the stacked parameters and buffers back to base estimators."""
+        with torch.no_grad():
+            for idx, estimator in enumerate(estimators):
+                states = dict(estimator.named_parameters())
+                states.update(dict(estimator.named_buffers()))
+                for name, value in zip(self.param_names, self.params):
+                    states[name].copy_(value[idx])
+                for name, value in zip(self.buffer_names, self.buffers):
+                    states[name].copy_(value[idx])
+
+        return estimators
+
+
+def stack_for_training(estimators):
+    """
+    Return the stacked base estimators used to fit all base estimators with
+    the vectorized forwarding and backwarding.
+
+    Base estimators with running statistics, e.g., batch normalization layers
+    with ``track_running_stats=True``, are not supported, since buffers are
+    not updated in-place under :func:`torch.func.vmap`.
+    """
+    estimators = list(estimators)
+    for module in estimators[0].modules():
+        if (isinstance(module, _BatchNorm)
+                and module.track_running_stats):
+            msg = ("Fitting base estimators with the vectorized training is"
+                   " not supported for base estimators with running"
+                   " statistics, but got {} instead.")
+            raise ValueError(msg.format(module))
+
+    return StackedEstimators(estimators)
+
+
+def stacked_loss(criterion, outputs, target):
+    """
+    Return the training loss of each base estimator on each sample, that is,
+    a tensor of shape ``(n_estimators, batch_size)``, given the stacked
+    outputs of base estimators and the shared target. The `criterion` should
+    be created with ``reduction="none"``.
+    """
+    n_estimators, batch_size = outputs.size(0), outputs.size(1)
+    targets = target.repeat(n_estimators, *([1] * (target.dim() - 1)))
+    losses = criterion(outputs.flatten(0, 1), targets)
+
+    return losses.view(n_estimators, batch_size, -1).mean(dim=2)
@@ -10,11 +10,15 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 import warnings
+import contextlib
+from functools import partial
 from joblib import Parallel, delayed
 
 from ._base import BaseModule, torchensemble_model_doc
 from .utils import io
+from .utils import parallel as par
 from .utils import set_module
+from .utils import vectorize as vec
 from .utils import operator as op
 
 
@@ -22,6 +26,45 @@ __all__ = ["VotingClassifier",
            "VotingRegressor"]
 
 
+def _fit_per_batch(data,
+                   target,
+                   estimator,
+                   optimizer,
+                   criterion,
+                   idx,
+                   epoch,
+                   batch_idx,
+                   log_interval,
+                   is_classification):
+    """Private function used to fit a base estimator on a batch of data."""
+
+    batch_size = data.size(0)
+
+    optimizer.zero_grad()
+    output = estimator(data)
+    loss = criterion(output, target)
+    loss.backward()
+    optimizer.step()
+
+    # Print training status
+    if batch_idx % log_interval == 0:
+
+        # Classification
+        if is_classification:
+            _, predicted = torch.max(output.data, 1)
+            correct = (predicted == target).sum().item()
+
+            msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
+                   " | Loss: {:.5f} | Correct: {:d}/{:d}")
+            print(msg.format(idx, epoch, batch_idx, loss,
+                             correct, batch_size))
+        # Regression
+        else:
+            msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
+                   " | Loss: {:.5f}")
+            print(msg.format(idx, epoch, batch_idx, loss))
+
+
 def _parallel_fit_per_epoch(train_loader,
                             estimator,
                             cur_lr,
@@ -43,36 +86,128 @@ def _parallel_fit_per_epoch(train_loader,
         # Parallelization corrupts the binding between optimizer and scheduler
         set_module.update_lr(optimizer, cur_lr)
 
+    for batch_idx, (data, target) in enumerate(train_loader):
+
+        data, target = data.to(device), target.to(device)
+        _fit_per_batch(data, target, estimator, optimizer, criterion,
+                       idx, epoch, batch_idx, log_interval, is_classification)
+
+    return estimator, optimizer
+
+
+def _shared_fit_per_epoch(train_loader,
+                          estimators,
+                          cur_lr,
+                          optimizers,
+                          criterion,
+                          epoch,
+                          log_interval,
+                          device,
+                          is_classification,
+                          indices=None):
+    """
+    Private function used to fit all base estimators with a single pass over
+    the training data, where each batch is fed to all base estimators.
+    """
+
+    if cur_lr:
+        for optimizer in optimizers:
+            set_module.update_lr(optimizer, cur_lr)
+
+    if indices is None:
+        indices = range(len(estimators))
+
+    for batch_idx, (data, target) in enumerate(train_loader):
+
+        data, target = data.to(device), target.to(device)
+        for idx, estimator, optimizer in zip(indices,
+                                             estimators,
+                                             optimizers):
+            _fit_per_batch(data, target, estimator, optimizer, criterion,
+                           idx, epoch, batch_idx, log_interval,
+                           is_classification)
+
+    return estimators, optimizers
+
+
+def _persistent_fit_per_epoch(estimators,
+                              optimizers,
+                              indices,
+                              cur_lr,
+                              epoch,
+                              train_loader,
+                              criterion,
+                              log_interval,
+                              device,
+                              is_classification,
+                              shared_batches):
+    """
+    Private function used to fit base estimators owned by a persistent
+    worker process for one epoch.
+    """
+
+    if shared_batches:
+        _shared_fit_per_epoch(train_loader, estimators, cur_lr,
+                              optimizers, criterion, epoch, log_interval,
+                              device, is_classification, indices)
+    else:
+        for idx, estimator, optimizer in zip(indices,
+                                             estimators,
+                                             optimizers):
+            _parallel_fit_per_epoch(train_loader, estimator, cur_lr,
+                                    optimizer, criterion, idx, epoch,
+                                    log_interval, device, is_classification)
+
+
+def _vectorized_fit_per_epoch(train_loader,
+                              stacked,
+                              cur_lr,
+                              optimizer,
+                              criterion,
+                              epoch,
+                              log_interval,
+                              device,
+                              is_classification):
+    """
+    Private function used to fit all base estimators in a single process,
+    with the vectorized forwarding and backwarding on their stacked
+    parameters, and a single step of the optimizer on all base estimators.
+    """
+
+    if cur_lr:
+        set_module.update_lr(optimizer, cur_lr)
+
     for batch_idx, (data, target) in enumerate(train_loader):
 
         batch_size = data.size(0)
         data, target = data.to(device), target.to(device)
 
         optimizer.zero_grad()
-        output = estimator(data)
-        loss = criterion(output, target)
-        loss.backward()
+        outputs = stacked(data)
+        loss = vec.stacked_loss(criterion, outputs, target).mean(dim=1)
+        loss.sum().backward()
         optimizer.step()
 
         # Print training status
         if batch_idx % log_interval == 0:
+            for idx in range(len(stacked)):
+
+                # Classification
+                if is_classification:
+                    _, predicted = torch.max(outputs.data[idx], 1)
+                    correct = (predicted == target).sum().item()
+
+                    msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch:"
+                           " {:03d} | Loss: {:.5f} | Correct: {:d}/{:d}")
+                    print(msg.format(idx, epoch, batch_idx, loss[idx],
+                                     correct, batch_size))
+                # Regression
+                else:
+                    msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch:"
+                           " {:03d} | Loss: {:.5f}")
+                    print(msg.format(idx, epoch, batch_idx, loss[idx]))
 
-            # Classification
-            if is_classification:
-                _, predicted = torch.max(output.data, 1)
-                correct = (predicted == target).sum().item()
-
-                msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
-                       " | Loss: {:.5f} | Correct: {:d}/{:d}")
-                print(msg.format(idx, epoch, batch_idx, loss,
-                                 correct, batch_size))
-            # Regression
-            else:
-                msg = ("Estimator: {:03d} | Epoch: {:03d} | Batch: {:03d}"
-                       " | Loss: {:.5f}")
-                print(msg.format(idx, epoch, batch_idx, loss))
-
-    return estimator, optimizer
+    return stacked, optimizer
 
 
 @torchensemble_model_doc("""Implementation on the VotingClassifier.""",
@@ -84,12 +219,29 @@ class VotingClassifier(BaseModule):
         "classifier_forward")
     def forward(self, x):
         # Take the average over class distributions from all base estimators.
-        outputs = [F.softmax(estimator(x), dim=1)
-                   for estimator in self.estimators_]
+        outputs = F.softmax(self._forward_estimators(x), dim=2)
         proba = op.average(outputs)
 
         return proba
 
+    @torchensemble_model_doc(
+        """Implementation on the data forwarding with the confidence cascade in VotingClassifier.""",  # noqa: E501
+        "classifier_forward_cascade")
+    def forward_cascade(self, X, threshold=None):
+        return self._forward_cascade(X, threshold, False)
+
+    @torchensemble_model_doc(
+        """Calibrate the confidence cascade in VotingClassifier.""",
+        "classifier_calibrate_cascade")
+    def calibrate_cascade(self,
+                          test_loader,
+                          tolerance=0.5,
+                          criterion="max_proba"):
+        return self._calibrate_cascade(test_loader,
+                                       tolerance,
+                                       criterion,
+                                       False)
+
     @torchensemble_model_doc(
         """Set the attributes on optimizer for VotingClassifier.""",
         "set_optimizer")
@@ -107,15 +259,23 @@ class VotingClassifier(BaseModule):
 
     @torchensemble_model_doc(
         """Implementation on the training stage of VotingClassifier.""",
-        "fit")
+        "parallel_fit")
     def fit(self,
             train_loader,
             epochs=100,
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            shared_batches=False,
+            vectorize=False,
+            persistent_workers=False,
+            batch_size=256):
 
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
+
+        self.unstack_estimators()
         self._validate_parameters(epochs, log_interval)
         self.n_outputs = self._decide_n_outputs(train_loader, True)
 
@@ -130,6 +290,11 @@ class VotingClassifier(BaseModule):
                                                        self.optimizer_name,
                                                        **self.optimizer_args))
 
+        if vectorize:
+            stacked = vec.stack_for_training(estimators)
+            stacked_optimizer = set_module.set_optimizer(
+                stacked, self.optimizer_name, **self.optimizer_args)
+
         if self.use_scheduler_:
             scheduler_ = set_module.set_scheduler(optimizers[0],
                                                   self.scheduler_name,
@@ -137,6 +302,7 @@ class VotingClassifier(BaseModule):
 
         # Utils
         criterion = nn.CrossEntropyLoss()
+        reduction_none_criterion = nn.CrossEntropyLoss(reduction="none")
         best_acc = 0.
 
         # Internal helper function on pesudo forward
@@ -147,8 +313,25 @@ class VotingClassifier(BaseModule):
 
             return proba
 
+        if persistent_workers and not vectorize:
+            workers = par.WorkerPool(
+                estimators,
+                optimizers,
+                partial(_persistent_fit_per_epoch,
+                        criterion=criterion,
+                        log_interval=log_interval,
+                        device=self.device,
+                        is_classification=True,
+                        shared_batches=shared_batches),
+                train_loader,
+                self.n_jobs,
+                broadcast=shared_batches
+            )
+        else:
+            workers = contextlib.nullcontext()
+
         # Maintain a pool of workers
-        with Parallel(n_jobs=self.n_jobs) as parallel:
+        with Parallel(n_jobs=self.n_jobs) as parallel, workers:
 
             # Training loop
             for epoch in range(epochs):
@@ -159,33 +342,63 @@ class VotingClassifier(BaseModule):
                 else:
                     cur_lr = None
 
-                if self.n_jobs and self.n_jobs > 1:
+                if (self.n_jobs and self.n_jobs > 1
+                        and not persistent_workers
+                        and not shared_batches and not vectorize):
                     msg = "Parallelization on the training epoch: {:03d}"
                     self.logger.info(msg.format(epoch))
 
-                rets = parallel(delayed(_parallel_fit_per_epoch)(
+                if vectorize:
+                    stacked, stacked_optimizer = _vectorized_fit_per_epoch(
                         train_loader,
-                        estimator,
+                        stacked.train(),
                         cur_lr,
-                        optimizer,
+                        stacked_optimizer,
+                        reduction_none_criterion,
+                        epoch,
+                        log_interval,
+                        self.device,
+                        True
+                    )
+                    stacked.unstack(estimators)
+                elif persistent_workers:
+                    workers.fit(epoch, cur_lr)
+                elif shared_batches:
+                    estimators, optimizers = _shared_fit_per_epoch(
+                        train_loader,
+                        estimators,
+                        cur_lr,
+                        optimizers,
                         criterion,
-                        idx,
                         epoch,
                         log_interval,
                         self.device,
                         True
                     )
-                    for idx, (estimator, optimizer) in enumerate(
-                            zip(estimators, optimizers))
-                )
+                else:
+                    rets = parallel(delayed(_parallel_fit_per_epoch)(
+                            train_loader,
+                            estimator,
+                            cur_lr,
+                            optimizer,
+                            criterion,
+                            idx,
+                            epoch,
+                            log_interval,
+                            self.device,
+                            True
+                        )
+                        for idx, (estimator, optimizer) in enumerate(
+                                zip(estimators, optimizers))
+                    )
 
-                estimators, optimizers = [], []
-                for estimator, optimizer in rets:
-                    estimators.append(estimator)
-                    optimizers.append(optimizer)
+                    estimators, optimizers = [], []
+                    for estimator, optimizer in rets:
+                        estimators.append(estimator)
+                        optimizers.append(optimizer)
 
                 # Validation
-                if test_loader:
+                if test_loader is not None:
                     self.eval()
                     with torch.no_grad():
                         correct = 0
@@ -222,28 +435,36 @@ class VotingClassifier(BaseModule):
 
         self.estimators_ = nn.ModuleList()
         self.estimators_.extend(estimators)
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of VotingClassifier.""",
         "classifier_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         correct = 0
         total = 0
 
-        for _, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            _, predicted = torch.max(output.data, 1)
-            correct += (predicted == target).sum().item()
-            total += target.size(0)
+        with torch.no_grad():
+            for _, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                _, predicted = torch.max(output.data, 1)
+                correct += (predicted == target).sum()
+                total += target.size(0)
 
-        acc = 100 * correct / total
+        acc = 100 * float(correct) / total
 
         return acc
 
+    @torchensemble_model_doc(
+        """Return the predicted class distributions of VotingClassifier.""",
+        "classifier_predict_proba")
+    def predict_proba(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)
+
 
 @torchensemble_model_doc("""Implementation on the VotingRegressor.""",
                          "model")
@@ -255,7 +476,7 @@ class VotingRegressor(BaseModule):
     def forward(self, x):
         # Take the average over predictions from all base estimators.
 
-        outputs = [estimator(x) for estimator in self.estimators_]
+        outputs = self._forward_estimators(x)
         pred = op.average(outputs)
 
         return pred
@@ -277,15 +498,23 @@ class VotingRegressor(BaseModule):
 
     @torchensemble_model_doc(
         """Implementation on the training stage of VotingRegressor.""",
-        "fit")
+        "parallel_fit")
     def fit(self,
             train_loader,
             epochs=100,
             log_interval=100,
             test_loader=None,
             save_model=True,
-            save_dir=None):
+            save_dir=None,
+            shared_batches=False,
+            vectorize=False,
+            persistent_workers=False,
+            batch_size=256):
 
+        train_loader = self._make_loader(train_loader, batch_size, True)
+        test_loader = self._make_loader(test_loader, batch_size)
+
+        self.unstack_estimators()
         self._validate_parameters(epochs, log_interval)
         self.n_outputs = self._decide_n_outputs(train_loader, False)
 
@@ -300,6 +529,11 @@ class VotingRegressor(BaseModule):
                                                        self.optimizer_name,
                                                        **self.optimizer_args))
 
+        if vectorize:
+            stacked = vec.stack_for_training(estimators)
+            stacked_optimizer = set_module.set_optimizer(
+                stacked, self.optimizer_name, **self.optimizer_args)
+
         if self.use_scheduler_:
             scheduler_ = set_module.set_scheduler(optimizers[0],
                                                   self.scheduler_name,
@@ -307,6 +541,7 @@ class VotingRegressor(BaseModule):
 
         # Utils
         criterion = nn.MSELoss()
+        reduction_none_criterion = nn.MSELoss(reduction="none")
         best_mse = float("inf")
 
         # Internal helper function on pesudo forward
@@ -316,8 +551,25 @@ class VotingRegressor(BaseModule):
 
             return pred
 
+        if persistent_workers and not vectorize:
+            workers = par.WorkerPool(
+                estimators,
+                optimizers,
+                partial(_persistent_fit_per_epoch,
+                        criterion=criterion,
+                        log_interval=log_interval,
+                        device=self.device,
+                        is_classification=False,
+                        shared_batches=shared_batches),
+                train_loader,
+                self.n_jobs,
+                broadcast=shared_batches
+            )
+        else:
+            workers = contextlib.nullcontext()
+
         # Maintain a pool of workers
-        with Parallel(n_jobs=self.n_jobs) as parallel:
+        with Parallel(n_jobs=self.n_jobs) as parallel, workers:
 
             # Training loop
             for epoch in range(epochs):
@@ -328,42 +580,74 @@ class VotingRegressor(BaseModule):
                 else:
                     cur_lr = None
 
-                if self.n_jobs and self.n_jobs > 1:
+                if (self.n_jobs and self.n_jobs > 1
+                        and not persistent_workers
+                        and not shared_batches and not vectorize):
                     msg = "Parallelization on the training epoch: {:03d}"
                     self.logger.info(msg.format(epoch))
 
-                rets = parallel(delayed(_parallel_fit_per_epoch)(
+                if vectorize:
+                    stacked, stacked_optimizer = _vectorized_fit_per_epoch(
                         train_loader,
-                        estimator,
+                        stacked.train(),
                         cur_lr,
-                        optimizer,
+                        stacked_optimizer,
+                        reduction_none_criterion,
+                        epoch,
+                        log_interval,
+                        self.device,
+                        False
+                    )
+                    stacked.unstack(estimators)
+                elif persistent_workers:
+                    workers.fit(epoch, cur_lr)
+                elif shared_batches:
+                    estimators, optimizers = _shared_fit_per_epoch(
+                        train_loader,
+                        estimators,
+                        cur_lr,
+                        optimizers,
                         criterion,
-                        idx,
                         epoch,
                         log_interval,
                         self.device,
                         False
                     )
-                    for idx, (estimator, optimizer) in enumerate(
-                            zip(estimators, optimizers))
-                )
+                else:
+                    rets = parallel(delayed(_parallel_fit_per_epoch)(
+                            train_loader,
+                            estimator,
+                            cur_lr,
+                            optimizer,
+                            criterion,
+                            idx,
+                            epoch,
+                            log_interval,
+                            self.device,
+                            False
+                        )
+                        for idx, (estimator, optimizer) in enumerate(
+                                zip(estimators, optimizers))
+                    )
 
-                estimators, optimizers = [], []
-                for estimator, optimizer in rets:
-                    estimators.append(estimator)
-                    optimizers.append(optimizer)
+                    estimators, optimizers = [], []
+                    for estimator, optimizer in rets:
+                        estimators.append(estimator)
+                        optimizers.append(optimizer)
 
                 # Validation
-                if test_loader:
+                if test_loader is not None:
                     self.eval()
                     with torch.no_grad():
                         mse = 0
+                        n_batches = 0
                         for _, (data, target) in enumerate(test_loader):
                             data = data.to(self.device)
                             target = target.to(self.device)
                             output = _forward(estimators, data)
                             mse += criterion(output, target)
-                        mse /= len(test_loader)
+                            n_batches += 1
+                        mse /= n_batches
 
                         if mse < best_mse:
                             best_mse = mse
@@ -385,20 +669,30 @@ class VotingRegressor(BaseModule):
 
         self.estimators_ = nn.ModuleList()
         self.estimators_.extend(estimators)
-        if save_model and not test_loader:
+        if save_model and test_loader is None:
             io.save(self, save_dir, self.logger)
 
     @torchensemble_model_doc(
         """Implementation on the evaluating stage of VotingRegressor.""",
         "regressor_predict")
-    def predict(self, test_loader):
+    def predict(self, test_loader, batch_size=256):
+        test_loader = self._make_loader(test_loader, batch_size)
         self.eval()
         mse = 0
+        n_batches = 0
         criterion = nn.MSELoss()
 
-        for batch_idx, (data, target) in enumerate(test_loader):
-            data, target = data.to(self.device), target.to(self.device)
-            output = self.forward(data)
-            mse += criterion(output, target)
+        with torch.no_grad():
+            for batch_idx, (data, target) in enumerate(test_loader):
+                data, target = data.to(self.device), target.to(self.device)
+                output = self.forward(data)
+                mse += criterion(output, target)
+                n_batches += 1
 
-        return mse / len(test_loader)
+        return mse / n_batches
+
+    @torchensemble_model_doc(
+        """Return the predicted values of VotingRegressor.""",
+        "regressor_predict_output")
+    def predict_output(self, X, batch_size=256, out=None):
+        return self._predict_output(X, batch_size, out)